@@ -7,18 +7,35 @@
 # begin imports
 
 # standard library imports
+import asyncio
+import atexit
 import base64
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import functools
+import itertools
 import json
+import logging
+import logging.handlers
+import multiprocessing
 import os
+import queue
 import traceback
 import sys
 import signal
+import threading
 import time
 import traceback
+import re
+import tempfile
 import urllib
+import weakref
 
 # third party imports
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 
 # attempt to import the MySQL connector library
@@ -43,7 +60,8 @@ except BaseException:
 try:
     import pymongo
     print('+++ MongoDB support will be available.')
-    from pymongo import InsertOne, DeleteOne, DeleteMany, UpdateOne, UpdateMany
+    from pymongo import DeleteMany, UpdateOne
+    from pymongo import ReplaceOne, ReturnDocument, ASCENDING
     DRIVER_AVAILABLE_MONGODB = True
 except BaseException:
     print('--- MongoDB support will not be available.')
@@ -61,6 +79,27 @@ except BaseException:
 # SQLite3 library is always available...
 import sqlite3
 
+# attempt to load the gunicorn server, for start_cindi_production()
+try:
+    import gunicorn.app.base
+    SERVER_AVAILABLE_GUNICORN = True
+except BaseException:
+    SERVER_AVAILABLE_GUNICORN = False
+
+# attempt to load the uvicorn server, for start_cindi_async()
+try:
+    import uvicorn
+    SERVER_AVAILABLE_UVICORN = True
+except BaseException:
+    SERVER_AVAILABLE_UVICORN = False
+
+# the write lock shared by worker processes, see prepare_for_worker_processes()
+try:
+    import fcntl
+    LOCK_AVAILABLE_FCNTL = True
+except BaseException:
+    LOCK_AVAILABLE_FCNTL = False
+
 # end imports
 # ------------------------------------------------------------------------------
 # begin constants delcarations section
@@ -75,6 +114,185 @@ ERROR__FIELDS_AND_VALUES_BAD_QUANTITY = """!! ERROR:
 The quantity of fields detected is not equal to the number of values detected.  
 Check the CINDI README."""
 
+# the order in which initialize_stores() connects to each store
+SUPPORTED_STORES = ('postgres', 'mysql', 'sqlite3', 'mongodb', 'redis')
+
+# each subsystem logs through its own logger under 'cindi', whose levels are
+# set by initialize_logging(). the native statements sent to a store are
+# logged at DEBUG, and each row read back at LOG__TRACE, which is lower, so
+# neither is formatted unless its level is enabled
+LOG__TRACE = 5
+logging.addLevelName(LOG__TRACE, 'TRACE')
+LOG = logging.getLogger('cindi')
+LOG__PARSER = logging.getLogger('cindi.parser')
+LOG__CACHE = logging.getLogger('cindi.cache')
+LOG__HTTP = logging.getLogger('cindi.http')
+LOG__SLOW = logging.getLogger('cindi.slow')
+LOG__STORES = {store_name: logging.getLogger('cindi.' + store_name) \
+               for store_name in SUPPORTED_STORES}
+LOG__REDIS = LOG__STORES['redis']
+LOG__MONGO = LOG__STORES['mongodb']
+LOG__SUBSYSTEMS = (LOG__PARSER, LOG__CACHE, LOG__HTTP, LOG__SLOW) \
+    + tuple(LOG__STORES.values())
+
+ERROR__STORE_CONNECTION_FAILED = {
+    'postgres': 'Failed to initialize PostgreSQL connection.',
+    'mysql': 'Failed to initialize MySQL connection.',
+    'sqlite3': 'Failed to initialize sqlite3 connection, file not found?',
+    'mongodb': 'Failed to initialize MongoDB connection.',
+    'redis': 'Failed to initialize redis connection.' }
+
+# defaults for the optional 'config/settings.txt' file
+SETTINGS__DEFAULTS = {
+    'parallel_stores': True,      # evaluate a statement on every store at once
+    'parallel_max_workers': 16,   # threads shared by all parallel evaluations
+    'async_max_workers': 64,      # threads shared by all coroutines
+    'log_level': 'INFO',          # of every logger, such as 'DEBUG'
+    'log_levels': {},             # logger name -> level, such as 'cindi.redis'
+    'log_format': '%(asctime)s %(levelname)s %(message)s',
+    'log_queue': True,            # log to stdout from a thread of its own
+    'metrics': True,              # measure for /metrics, see compose_metrics()
+    'trace_slow_seconds': None,   # slower statements are logged, None never
+    'trace_export_path': None,    # OTLP JSON file of every trace, None none
+    'sql_group_commit_seconds': 0, # writes wait to commit together, 0 never
+    'sql_group_commit_size': 100, # the most writes committed together
+    'journal_directory': 'logs/', # of the INDI journal, None for no journal
+    'journal_fsync': 'os',        # 'always', 'os', or seconds between fsyncs
+    'journal_segment_bytes': 64 * 1024 * 1024, # then a new segment begins
+    'cache_max_entries': 10000,   # cached READs, None for no limit
+    'cache_max_bytes': 64 * 1024 * 1024, # estimated size, None for no limit
+    'cache_policy': 'lru',        # which cached READ to evict, see below
+    'cache_ttl_seconds': None,    # a cached READ expires, None for never
+    'cache_table_quotas': {},     # INDI table name -> most cached READs
+    'server_workers': 4,          # start_cindi_production() processes
+    'server_threads': 8,          # statements in flight per process
+    'server_keepalive_seconds': 5, # an idle HTTP connection is kept open
+    'server_timeout_seconds': 120, # a stuck process is restarted
+    'server_graceful_timeout_seconds': 30 } # to finish statements on shutdown
+
+# 'lru' evicts the least recently used cached READ, 'lfu' evicts the least
+# frequently used among the CACHE__LFU_CANDIDATES least recently used.
+CACHE__POLICIES = ('lru', 'lfu')
+CACHE__LFU_CANDIDATES = 16
+
+# seconds to wait for one store to answer during a parallel evaluation, this
+# may be overridden per store in stores.txt with the 'timeout' key.
+STORE__DEFAULT_TIMEOUT = None # wait forever
+
+# the most keys sent to redis in one MGET (or similar) command
+REDIS__BATCH_SIZE = 1000
+
+# the most rows sent in one executemany() by a bulk CREATE into SQL
+SQL__BULK_BATCH_SIZE = 1000
+
+# the most prepared statements kept by each SQL connection, the plan of each
+# is reused by the later statements with the same text
+SQL__PREPARED_STATEMENTS = 128
+
+# the values allowed for 'journal_mode' and 'synchronous' under 'sqlite3' in
+# stores.txt, when given each is set with a PRAGMA on every connection
+SQLITE3__JOURNAL_MODES = ('delete', 'truncate', 'persist', 'memory', 'wal', \
+                          'off')
+SQLITE3__SYNCHRONOUS_LEVELS = ('off', 'normal', 'full', 'extra')
+
+# the most failed group commits remembered for the writes waiting on them,
+# see group_commit_execute()
+SQL__GROUP_COMMIT_FAILURES = 100
+
+# the LIMIT of an SQL SELECT with an OFFSET but no INDI LIMIT, the largest
+# signed 64-bit integer, which MySQL, PostgreSQL and SQLite3 all accept
+SQL__NO_LIMIT = 9223372036854775807
+
+# the most rows read from a store at a time by a streamed READ, which is also
+# the most rows sent in one chunk of an /evaluate-stream response
+STREAM__BATCH_SIZE = 1000
+
+# how the redis driver stores rows, chosen by 'layout' in stores.txt.
+# 'cell' (the default) is one key per cell, 'hash' is one hash per row.
+REDIS__LAYOUTS = ('cell', 'hash')
+
+# how the mongodb driver stores rows, chosen by 'layout' in stores.txt.
+# 'cell' (the default) is one document per cell, 'row' is one per row.
+MONGO__LAYOUTS = ('cell', 'row')
+
+# the most rows moved at a time by migrate_mongo_to_row_layout()
+MONGO__BATCH_SIZE = 1000
+
+# how many distinct INDI statement strings parse_indi() remembers
+INDI__PARSE_CACHE_SIZE = 4096
+
+# the 'journal_fsync' settings other than a number of seconds, see the INDI
+# journal section
+JOURNAL__FSYNC_POLICIES = ('always', 'os')
+
+# the name of each segment of the journal, after its first sequence number
+JOURNAL__SEGMENT_FORMAT = 'indi_{:020d}.ndjson'
+JOURNAL__SEGMENT_REGEX = re.compile(r'indi_([0-9]{20})\.ndjson\Z')
+
+# how much of the end of a segment is read at first to find its last record
+JOURNAL__TAIL_BYTES = 64 * 1024
+
+# the most journal records read and planned by replay_journal() at a time
+REPLAY__BATCH_SIZE = 1000
+
+# the measurements shown by /metrics, name -> (Prometheus type, help, label
+# names), see the metrics section
+METRICS__DEFINITIONS = {
+    'cindi_statements_total': ('counter', \
+        'INDI statements evaluated.', ('verb', 'table')),
+    'cindi_statement_errors_total': ('counter', \
+        'INDI statements which raised an exception.', ('verb', 'table')),
+    'cindi_statement_seconds': ('histogram', \
+        'Seconds to evaluate INDI statements, cache included.', \
+        ('verb', 'table')),
+    'cindi_store_seconds': ('histogram', \
+        'Seconds for one store to evaluate an operation.', \
+        ('store', 'operation')),
+    'cindi_native_commands_total': ('counter', \
+        'Native statements sent to a store.', ('store', 'command')),
+    'cindi_consistency_failures_total': ('counter', \
+        'Results from one store not like the others.', ('function',)) }
+
+# seconds between each worker process writing its measurements for the
+# others, see share_metrics()
+METRICS__SHARE_SECONDS = 1
+
+# the upper bounds of the buckets of each histogram, in seconds
+METRICS__LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, \
+                            0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# the kinds of span of the OpenTelemetry protocol, see compose_otlp_trace()
+TRACE__KIND_INTERNAL = 1
+TRACE__KIND_SERVER = 2
+TRACE__KIND_CLIENT = 3
+
+# the most native statements, and characters of each, kept by a span
+TRACE__NATIVE_STATEMENTS = 100
+TRACE__STATEMENT_CHARS = 1000
+
+# the measurements of get_cache_stats() shown by /metrics, per INDI table
+METRICS__CACHE = (
+    ('hits', 'counter', 'READs answered by the cache.'),
+    ('misses', 'counter', 'READs not answered by the cache.'),
+    ('projections', 'counter', 'Hits selecting FIELDS of a cached READ.'),
+    ('evictions', 'counter', 'Cached READs evicted to make room.'),
+    ('expirations', 'counter', 'Cached READs expired by their TTL.'),
+    ('invalidations', 'counter', 'Cached READs forgotten after a write.'),
+    ('entries', 'gauge', 'READs cached now.'),
+    ('bytes', 'gauge', 'Estimated bytes of the READs cached now.'))
+
+# connection pool defaults, each may be overridden per store in stores.txt
+POOL__DEFAULT_SETTINGS = {
+    'pool_min_size': 1,        # connections kept open even when idle
+    'pool_max_size': 8,        # connections open at once, idle or borrowed
+    'pool_idle_seconds': 300,  # idle connections above the minimum close
+    'pool_check_seconds': 30,  # idle longer than this? check before lending
+    'pool_timeout': 30 }       # seconds to wait for a connection to free up
+
+# these client libraries are thread-safe and maintain their own socket pools,
+# so one client per process is lent to every borrower at the same time.
+POOL__SHARED_STORES = ('mongodb', 'redis')
+
 # end constants declarations section
 # ------------------------------------------------------------------------------
 # begin domain-inspecific functions
@@ -89,22 +307,6 @@ def try_int(x):
     except:
         return x
 
-def format_str_or_int(x):
-    """
-    Wrap str argument with quotes, unless is an int. Always returns a string.
-
-    SQL and Redis statements should be given strings wrapped in quotes, and
-    should be given integers without quotes. If this argument is given a string,
-    then it will return the string with single-quotes padded; else, the integer
-    will be returned as a string.
-    """
-    result_str = ''
-    if isinstance(x, int):
-        result_str = str(x)
-    elif isinstance(x, str):
-        result_str = "\'" + x + "\'"
-    return result_str
-
 def pairlis(list_a, list_b):
     """
     Similar to the Common Lisp pairlis function. Returns a list of tuples.
@@ -190,8 +392,8 @@ def fprint(string, label_prefix='', sub_directory='logs/', exit_on_fail=True):
             f.write(string + '\n')
         f.close()
     except BaseException:
-        print('fprint failed to print to file: ' + filename)
-        print('fprint failed to print to file: ' + string)
+        LOG.error('fprint failed to print to file: %s', filename)
+        LOG.error('fprint failed to print to file: %s', string)
         if exit_on_fail:
             exit(5) # 'input/output error'
 
@@ -200,52 +402,387 @@ def fprint(string, label_prefix='', sub_directory='logs/', exit_on_fail=True):
 # begin lower-order domain-specific functions
 # (which apply to no particular driver)
 
+# the INDI grammar, keywords are not case sensitive:
+#
+#   CREATE IN <table> FIELDS <list> VALUES <list> [, <list> ...]
+#   READ   IN <table> ALL RECORDS FIELDS <list> [<page>]
+#   READ   IN <table> <field> <value> FIELDS <list> [<page>]
+#   UPDATE IN <table> <field> <value> FIELDS <list> VALUES <list>
+#   DELETE IN <table> <field> <value>
+#
+# where a <list> is either a single item, or items separated by commas within
+# parentheses. a <value> (and each VALUES item) is either a bare word, or a
+# string within single or double quotes, in which a backslash escapes the
+# next character. bare words may not contain spaces, commas or parentheses.
+# a CREATE may give several VALUES lists separated by commas, one per row.
+#
+# a <table>, a <field> and each FIELDS item is a name: letters, digits and
+# underscores, not starting with a digit. names are spliced into the SQL
+# statements (only values may be sent as parameters), and into the keys of
+# redis and the field paths of mongodb, so nothing else is allowed.
+#
+# a <page> is any of `AFTER id <n>`, `LIMIT <n>` and `OFFSET <n>`, in that
+# order, where each <n> is a whole number. the rows of a READ are in the
+# order of their ids, AFTER keeps the rows with a greater id, OFFSET skips
+# that many of those, and LIMIT keeps at most that many of the rest. a row
+# only counts if it holds at least one of the FIELDS, as with any READ.
+
+# one token per match, the groups are: string, punctuation, bare word, garbage
+INDI__TOKEN_REGEX = re.compile(r"""\s*(?:"""
+                               r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')"""
+                               r"""|([(),])"""
+                               r"""|([^\s(),"'][^\s(),]*)"""
+                               r"""|(\S))""")
+
+INDI__VERBS = ('CREATE', 'READ', 'UPDATE', 'DELETE')
+
+INDI__NAME_REGEX = re.compile(r'[A-Za-z_][A-Za-z0-9_]*\Z')
+
+# the parsed form of an INDI statement, it is immutable so it may be shared.
+# 'field' and 'value' are the predicate (None for CREATE, or ALL RECORDS),
+# 'fields' and 'values' are tuples of strings, 'text' is the original string.
+# 'rows' is a tuple of every VALUES tuple of a CREATE ('values' is the first).
+# 'after', 'limit' and 'offset' are the <page> of a READ as integers, or None.
+IndiStatement = collections.namedtuple('IndiStatement', \
+    ['verb', 'table', 'all_records', 'field', 'value', \
+     'fields', 'values', 'rows', 'after', 'limit', 'offset', 'text'])
+
+def tokenize_indi(c):
+    """
+    Split an INDI statement c into tokens. Returns a list of tuples.
+
+    Each tuple is a (kind, text) pair, where the kind is 'string' for quoted
+    text (the quotes and escapes are removed), 'word' for bare words, and
+    the punctuation itself for '(' ')' and ','. Raises ValueError for an
+    unterminated quote.
+    """
+    tokens = []
+    for match in INDI__TOKEN_REGEX.finditer(c):
+        quoted, punctuation, word, garbage = match.groups()
+        if quoted is not None:
+            tokens.append(('string', re.sub(r'\\(.)', r'\1', quoted[1:-1])))
+        elif punctuation is not None:
+            tokens.append((punctuation, punctuation))
+        elif word is not None:
+            tokens.append(('word', word))
+        elif garbage is not None:
+            raise ValueError('Unterminated quote in INDI statement: ' + c)
+    return tokens
+
+def parse_indi__keyword(tokens, i, keyword):
+    """
+    Check the i'th token is the bare word keyword. Returns the next index.
+    """
+    if i < len(tokens) and tokens[i][0] == 'word' \
+       and tokens[i][1].upper() == keyword:
+        return i + 1
+    raise ValueError('Expected ' + keyword + ' in INDI statement.')
+
+def parse_indi__item(tokens, i, allow_strings=True):
+    """
+    Read one word (or string, if allowed) at the i'th token. Returns 2 values.
+
+    The first value returned is the item text, the second is the next index.
+    """
+    if i < len(tokens) and (tokens[i][0] == 'word' \
+                            or (allow_strings and tokens[i][0] == 'string')):
+        return tokens[i][1], i + 1
+    raise ValueError('Expected a name or value in INDI statement.')
+
+def parse_indi__check_name(name):
+    """
+    Check a table or field name matches INDI__NAME_REGEX. Returns the name.
+
+    Raises ValueError if it does not.
+    """
+    if INDI__NAME_REGEX.match(name) is None:
+        raise ValueError('Invalid name ' + name + ' in INDI statement.')
+    return name
+
+def parse_indi__name(tokens, i):
+    """
+    Read a table or field name at the i'th token. Returns 2 values.
+
+    The first value returned is the name, the second is the next index.
+    """
+    name, i = parse_indi__item(tokens, i, False)
+    return parse_indi__check_name(name), i
+
+def parse_indi__list(tokens, i, allow_strings=True):
+    """
+    Read a FIELDS or VALUES list at the i'th token. Returns 2 values.
+
+    The first value returned is a tuple of the items, the second is the next
+    index. The list is either one item, or items in parentheses.
+    """
+    if not (i < len(tokens) and tokens[i][0] == '('):
+        item, i = parse_indi__item(tokens, i, allow_strings)
+        return (item,), i
+
+    items = []
+    i += 1
+    while True:
+        item, i = parse_indi__item(tokens, i, allow_strings)
+        items.append(item)
+        if i < len(tokens) and tokens[i][0] == ',':
+            i += 1
+        elif i < len(tokens) and tokens[i][0] == ')':
+            return tuple(items), i + 1
+        else:
+            raise ValueError('Expected , or ) in INDI statement.')
+
+def parse_indi__page(tokens, i):
+    """
+    Read the optional <page> of a READ at the i'th token. Returns 4 values.
+
+    The values returned are the AFTER id, the LIMIT and the OFFSET (each an
+    integer, or None if not given), and the next index.
+    """
+    page = {'AFTER': None, 'LIMIT': None, 'OFFSET': None}
+    for keyword in ('AFTER', 'LIMIT', 'OFFSET'):
+        if not (i < len(tokens) and tokens[i][0] == 'word' \
+                and tokens[i][1].upper() == keyword):
+            continue
+        i += 1
+        if keyword == 'AFTER':
+            field, i = parse_indi__item(tokens, i, False)
+            if field.lower() != 'id':
+                raise ValueError('Only AFTER id is supported in INDI.')
+        number, i = parse_indi__item(tokens, i, False)
+        if not number.isdigit():
+            raise ValueError('Expected a whole number after ' + keyword \
+                             + ' in INDI statement.')
+        page[keyword] = int(number)
+    return page['AFTER'], page['LIMIT'], page['OFFSET'], i
+
+@functools.lru_cache(maxsize=INDI__PARSE_CACHE_SIZE)
+def parse_indi__cached(c):
+    """
+    Parse the INDI statement string c. Returns an IndiStatement.
+
+    This is the memoized worker behind parse_indi(), please call that instead.
+    """
+    LOG__PARSER.debug('parsing %s', c) # only once, until it is evicted
+    tokens = tokenize_indi(c)
+    verb, i = parse_indi__item(tokens, 0, False)
+    verb = verb.upper()
+    if not verb in INDI__VERBS:
+        raise ValueError('Unknown INDI verb ' + verb + '.')
+    i = parse_indi__keyword(tokens, i, 'IN')
+    table, i = parse_indi__name(tokens, i)
+
+    all_records = False
+    field = None
+    value = None
+    fields = ()
+    values = ()
+    rows = ()
+    after = None
+    limit = None
+    offset = None
+
+    if verb == 'READ' and i + 1 < len(tokens) \
+       and tokens[i][0] == 'word' and tokens[i][1].upper() == 'ALL' \
+       and tokens[i + 1][0] == 'word' and tokens[i + 1][1].upper() == 'RECORDS':
+        all_records = True
+        i += 2
+    elif verb != 'CREATE':
+        field, i = parse_indi__name(tokens, i)
+        value, i = parse_indi__item(tokens, i)
+
+    if verb != 'DELETE':
+        i = parse_indi__keyword(tokens, i, 'FIELDS')
+        fields, i = parse_indi__list(tokens, i, False)
+        fields = tuple(map(parse_indi__check_name, fields))
+
+    if verb == 'CREATE' or verb == 'UPDATE':
+        i = parse_indi__keyword(tokens, i, 'VALUES')
+        values, i = parse_indi__list(tokens, i)
+
+    if verb == 'CREATE':
+        rows = [values]
+        while i < len(tokens) and tokens[i][0] == ',':
+            this_row, i = parse_indi__list(tokens, i + 1)
+            rows.append(this_row)
+        rows = tuple(rows)
+
+    if verb == 'READ':
+        after, limit, offset, i = parse_indi__page(tokens, i)
+
+    if i < len(tokens):
+        raise ValueError('Unexpected ' + tokens[i][1] + ' in INDI statement.')
+
+    return IndiStatement(verb, table, all_records, field, value, \
+                         fields, values, rows, after, limit, offset, c)
+
+def parse_indi(c):
+    """
+    Parse an INDI statement. Returns an IndiStatement.
+
+    The argument is either the INDI statement string, or an IndiStatement
+    which had already been parsed (and is returned as-is). Parsed statements
+    are kept in a LRU cache keyed by the statement string, so repeating a
+    statement does not tokenize it again. Raises ValueError if the statement
+    does not follow the INDI grammar.
+    """
+    if isinstance(c, IndiStatement):
+        return c
+    return parse_indi__cached(c)
+
 def get_indi_fields(c):
     """
     Given an INDI statement c, return a list of the user supplied FIELDS.
     """
-    if c.find('(') > 0 and c.find(')') > 0:
-        result = c[(1 + c.find('(')):c.find(')')]
-        result = result.split(', ')
-        return result
-    else:
-        return [c.split()[-1]]
+    return list(parse_indi(c).fields)
 
-# requires the VALUES clause to have strings within double quotes,
-# with a comma and space between elements. it specifically checks for a ", "
-# between elements, so an input string is not allowed to contain this, or
-# else it will trigger an ERROR__FIELDS_AND_VALUES_BAD_QUANTITY
 def get_indi_values(c):
     """
     Given an INDI statement c, return a list of the user supplied VALUES.
     """
-    first_l_parenthesis_index = c.find('(') + 1
-    first_r_parenthesis_index = c.find(')') + 1
-    values = c[(c.find('(', first_l_parenthesis_index)
-                + 1):c.find(')', first_r_parenthesis_index)]
-    values = values.split("\", \"")
-    values[0] = values[0].strip('\"')
-    values[-1] = values[-1].strip('\"')
-    return values
+    return list(parse_indi(c).values)
+
+def is_indi_page(indi):
+    """
+    Does an IndiStatement READ only a page of its rows? Returns a boolean.
+    """
+    return indi.after is not None or indi.limit is not None \
+        or indi.offset is not None
+
+def page_indi_rows(indi, rows):
+    """
+    Keep the rows of the <page> of an INDI READ. Returns a generator.
+
+    The first argument is the IndiStatement, the second is an iterable of
+    its rows in the order of their ids, all after its AFTER id. The OFFSET
+    and LIMIT are applied, and the rows beyond the LIMIT are not read. The
+    rows are closed, if they can be, when the generator is.
+    """
+    offset = indi.offset or 0
+    stop = None if indi.limit is None else offset + indi.limit
+    try:
+        yield from itertools.islice(rows, offset, stop)
+    finally:
+        if hasattr(rows, 'close'):
+            rows.close()
 
 def get_indi_query(c):
     """
-    Remove single/double quotes from an INDI query, if they exist. Returns str.
+    Given an INDI statement c, return the value searched for. Returns str.
+
+    Any single/double quotes around the value are removed. Returns None for a
+    CREATE or an ALL RECORDS query, since they do not search by a value.
+    """
+    return parse_indi(c).value
+
+def compose_indi_create(table_name, fields, rows):
     """
-    result = None
-    
-    if c.find('\"') > -1 and c.find('\"') < c.find('FIELDS'):
-        result = c.split('\"')[1]
-    elif c.find('\'') > -1 and c.find('\'') < c.find('FIELDS'):
-        result = c.split('\'')[1]
-    else:
-        result = c.split()[4]
-        
-    return result
+    Compose a CREATE of many rows, without parsing it. Returns IndiStatement.
+
+    The first argument is the INDI table name, the second is the list of
+    FIELDS, and the third is a list of rows, each a list of VALUES (which are
+    converted to strings). This is the same as parsing `CREATE IN <table>
+    FIELDS (...) VALUES (...), (...), ...`, but does not tokenize the rows.
+    Raises ValueError if a name is not a bare word, or a row is not as long as
+    the FIELDS.
+    """
+    for name in [table_name] + list(fields):
+        if tokenize_indi(name) != [('word', name)]:
+            raise ValueError('Not a valid INDI name: ' + repr(name))
+    fields = tuple(fields)
+    rows = tuple(tuple(str(value) for value in row) for row in rows)
+    if len(rows) == 0:
+        raise ValueError('A CREATE needs at least one row of VALUES.')
+    for row in rows:
+        if len(row) != len(fields):
+            raise ValueError('FIELDS and VALUES differ in quantity.')
+
+    def quote(value):
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+    text = 'CREATE IN ' + table_name \
+        + ' FIELDS (' + ', '.join(fields) + ') VALUES ' \
+        + ', '.join('(' + ', '.join(map(quote, row)) + ')' for row in rows)
+    return IndiStatement('CREATE', table_name, False, None, None, \
+                         fields, rows[0], rows, None, None, None, text)
 
 # end lower-order domain-specific functions
 # ------------------------------------------------------------------------------
 # begin Redis driver
+# each INDI 'cell' is stored in its own key, `<schema>-<table>_<pk>_<field>`,
+# and the next primary key for a table in `<schema>-<table>-NEXTPK`.
+#
+# each (table, field, value) also has a set of the primary keys holding that
+# value, `<schema>-<table>-INDEX:<field>:<value>`, so that searching by a
+# field other than 'id' does not need to visit every row. the index of a
+# table is only trusted once `<schema>-<table>-INDEXED` exists, which is set
+# by the first CREATE into an empty table, or by rebuild_redis_index().
+#
+# with 'layout': 'hash' under 'redis' in stores.txt, each row is instead one
+# hash, `<schema>-<table>-ROW:<pk>`, holding every field (including 'id'),
+# and the sorted set `<schema>-<table>-PKS` holds the primary keys of the
+# rows which exist. the NEXTPK key and the index are the same for both
+# layouts. migrate_redis_to_hash_layout() converts a table between them.
+
+def convert_to_redis__layout(stores):
+    """
+    Find which layout the redis store uses. Returns a string.
+
+    The argument is the stores dictionary. The result is one of REDIS__LAYOUTS.
+    """
+    return stores['info']['redis'].get('layout', 'cell')
+
+def convert_to_redis__table_prefix(schema, table_name):
+    """
+    Compose the prefix of every cell key in an INDI table. Returns a string.
+    """
+    return schema + '-' + table_name + '_'
+
+def convert_to_redis__index_key(schema, table_name, field, value):
+    """
+    Compose the key of the set of pks holding a value. Returns a string.
+
+    The first argument is the prefix for the redis key, the second is the INDI
+    table name, the third is the field, and the fourth is the value (which is
+    converted with str()) held in that field.
+    """
+    return schema + '-' + table_name + '-INDEX:' + field + ':' + str(value)
+
+def convert_to_redis__indexed_key(schema, table_name):
+    """
+    Compose the key which marks a table's index as trusted. Returns a string.
+    """
+    return schema + '-' + table_name + '-INDEXED'
+
+def convert_to_redis__fields_key(schema, table_name):
+    """
+    Compose the key of the set of fields of a 'cell' table. Returns a string.
+    """
+    return schema + '-' + table_name + '-FIELDS'
+
+def convert_to_redis__row_key(schema, table_name, pk):
+    """
+    Compose the key of the hash holding one row. Returns a string.
+    """
+    return schema + '-' + table_name + '-ROW:' + str(pk)
+
+def convert_to_redis__pks_key(schema, table_name):
+    """
+    Compose the key of the sorted set of live primary keys. Returns a string.
+    """
+    return schema + '-' + table_name + '-PKS'
+
+def convert_to_redis__split_cell_key(schema, table_name, key):
+    """
+    Split a cell key into its primary key and field. Returns multiple values.
+
+    The first value returned is the primary key (a string), the second is the
+    field name. The key may be bytes, as returned from the redis library.
+    """
+    if isinstance(key, bytes):
+        key = key.decode('ASCII')
+    pk, field = key[len(convert_to_redis__table_prefix(schema, table_name)):] \
+        .split('_', 1)
+    return pk, field
 
 # the following function is not actually used anywhere, but may come in handy.
 def convert_to_redis__find_last_pk(read_only_redis, schema, table_name):
@@ -267,10 +804,11 @@ def convert_to_redis__find_last_pk(read_only_redis, schema, table_name):
     result = 0
     primary_keys = []
     entire_table = read_only_redis.keys(schema + '-' + table_name + '_*_*')
-    print(DEBUG_PRINT_PREFIX__REDIS
-          + "KEYS " + (schema + '-' + table_name + '_*_*'))
+    LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS + 'KEYS %s', \
+                     schema + '-' + table_name + '_*_*')
     for row_col in entire_table:
-        this_key = int(row_col.decode('ASCII').split('_')[1])
+        this_key = int(convert_to_redis__split_cell_key(schema, table_name, \
+                                                        row_col)[0])
         if this_key not in primary_keys:
             primary_keys.append(this_key)
 
@@ -299,47 +837,210 @@ def convert_to_redis__get_next_pk(read_only_redis, schema, table_name):
     argument is the INDI table name.
     """
     result = read_only_redis.get(schema + '-' + table_name + '-NEXTPK')
-    print(DEBUG_PRINT_PREFIX__REDIS
-          + "GET " + (schema + '-' + table_name + '-NEXTPK'))
+    LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS + 'GET %s', \
+                     schema + '-' + table_name + '-NEXTPK')
     if result is None:
         result = 1
     return int(result)
 
-def convert_to_redis__set_next_pk(schema, table_name, last_used_pk):
+def convert_to_redis__create_new_pks(redis_connection, schema, table_name, \
+                                     quantity):
+    """
+    Allocate primary keys for new rows of a redis table. Returns the first.
+
+    The first three arguments are the same as convert_to_redis__get_next_pk(),
+    except that this function writes to redis, and the fourth is how many
+    primary keys to allocate. The first of them is returned as an integer.
+
+    The counter is created at 1 with SET NX, if missing, and moved with
+    INCRBY, both sent in one round-trip. INCRBY is atomic, so concurrent
+    CREATEs are never given the same primary keys.
+    """
+    next_pk_key = schema + '-' + table_name + '-NEXTPK'
+    LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS + 'INCRBY %s %s', next_pk_key, \
+                     quantity)
+    pipeline = redis_connection.pipeline(transaction=False)
+    pipeline.set(next_pk_key, 1, nx=True)
+    pipeline.incrby(next_pk_key, quantity)
+    return int(pipeline.execute()[-1]) - quantity
+
+def convert_to_redis__find_primary_keys(read_only_redis, schema, table_name, \
+                                        search_by_field, search_by_value, \
+                                        layout='cell'):
+    """
+    Find the primary keys holding a value in a field. Returns a sorted list.
+
+    The first argument is a redis connection (only read from), the second is
+    the prefix for the redis key, the third is the INDI table name, the fourth
+    is the field to search by and the fifth is the value to search for. The
+    optional sixth is the layout of the redis store. The primary keys are
+    returned as strings, in numerical order.
+
+    If the table's index is trusted, this is one round-trip to redis.
+    Otherwise, every cell of the field is visited (with SCAN and a GET per
+    row), so please run rebuild_redis_index() on tables created before the
+    index existed.
+    """
+    pipeline = read_only_redis.pipeline(transaction=False)
+    pipeline.exists(convert_to_redis__indexed_key(schema, table_name))
+    pipeline.smembers(convert_to_redis__index_key( \
+                        schema, table_name, search_by_field, search_by_value))
+    LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS + 'SMEMBERS %s', \
+                     convert_to_redis__index_key( \
+                         schema, table_name, search_by_field, search_by_value))
+    is_indexed, matching_pks = pipeline.execute()
+
+    if is_indexed:
+        results = [pk.decode('ASCII') for pk in matching_pks]
+    elif layout == 'hash':
+        results = []
+        live_pks = [pk.decode('ASCII') for pk in read_only_redis.zrange( \
+            convert_to_redis__pks_key(schema, table_name), 0, -1)]
+        LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS + 'table %s is not ' \
+                         + 'indexed, scanning %s rows', table_name, \
+                         len(live_pks))
+        pipeline = read_only_redis.pipeline(transaction=False)
+        for pk in live_pks:
+            pipeline.hget(convert_to_redis__row_key(schema, table_name, pk), \
+                          search_by_field)
+        for pk, this_value in pairlis(live_pks, pipeline.execute()):
+            if this_value is not None \
+               and this_value.decode('ASCII') == search_by_value:
+                results.append(pk)
+    else:
+        results = []
+        matching_keys = list(read_only_redis.scan_iter( \
+            match=convert_to_redis__table_prefix(schema, table_name) \
+            + '*_' + search_by_field, count=REDIS__BATCH_SIZE))
+        LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS + 'table %s is not ' \
+                         + 'indexed, scanned %s keys', table_name, \
+                         len(matching_keys))
+        for m in matching_keys:
+            pk, field = convert_to_redis__split_cell_key(schema, table_name, m)
+            this_value = read_only_redis.get(m)
+            # the pattern also matches fields ending with '_<search_by_field>'
+            # and tables named like '<table_name>_<something>'
+            if pk.isdigit() and field == search_by_field \
+               and this_value is not None \
+               and this_value.decode('ASCII') == search_by_value:
+                results.append(pk)
+
+    results.sort(key=int) # may be out-of-order numerically
+    return results
+
+def convert_to_redis__find_fields(read_only_redis, schema, table_name):
     """
-    Compose the redis statement to SET the next primary key. Returns a string.
+    Find every field used in a 'cell' table. Returns a sorted list.
 
-    Note that this function only returns a string, it does not perform the
-    operation. The result of this function is used in execute_redis.
+    The first argument is a redis connection (only read from), the second is
+    the prefix for the redis key, the third is the INDI table name.
 
-    The first argument is the prefix for the redis key, and is the same value
-    keyed by the 'db' key in stores.txt (under 'redis'). The second argument is
-    the INDI table name. The third argument is the last used primary key.
+    If the table's index is trusted, so is its set of fields, and this is one
+    round-trip to redis. Otherwise, the cells of the table are visited with
+    SCAN, see rebuild_redis_index().
     """
-    return 'SET ' \
-        + schema + '-' + table_name + '-NEXTPK ' + str(int(last_used_pk) + 1)
+    pipeline = read_only_redis.pipeline(transaction=False)
+    pipeline.exists(convert_to_redis__indexed_key(schema, table_name))
+    pipeline.smembers(convert_to_redis__fields_key(schema, table_name))
+    is_indexed, table_fields = pipeline.execute()
+
+    if is_indexed:
+        results = [field.decode('ASCII') for field in table_fields]
+    else:
+        results = set()
+        for key in read_only_redis.scan_iter( \
+                match=convert_to_redis__table_prefix(schema, table_name) \
+                + '*_*', count=REDIS__BATCH_SIZE):
+            pk, field = convert_to_redis__split_cell_key(schema, table_name, \
+                                                         key)
+            # the pattern also matches tables named like
+            # '<table_name>_<something>'
+            if pk.isdigit():
+                results.add(field)
+        LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS + 'table %s is not ' \
+                         + 'indexed, scanned for %s fields', table_name, \
+                         len(results))
+
+    return sorted(results)
+
+def convert_to_redis__read_rows(schema, table_name, pks, fields, layout):
+    """
+    Compose the redis statements to read rows. Returns a list of tuples.
+
+    The first argument is the prefix for the redis key, the second is the
+    INDI table name, the third is the primary keys of the rows to read, the
+    fourth is the FIELDS to read from each, and the fifth is the layout of
+    the redis store. Each row is read with one GET per field, or one HMGET.
+    """
+    results = []
+    if len(fields) == 0:
+        return results
+    table_prefix = convert_to_redis__table_prefix(schema, table_name)
+    for pk in pks:
+        if layout == 'hash':
+            results.append(('HMGET', convert_to_redis__row_key( \
+                schema, table_name, pk)) + tuple(fields))
+        else:
+            for field in fields:
+                results.append(('GET', table_prefix + str(pk) + '_' + field))
+    return results
 
 # `stores` (from which `read_only_redis` is derived) is necessary in order to
 # emulate sub-queries -- in particular, an INDI DELETE, because redis does not
 # support the deletion of keys via wild-cards.
 #
-# => !!! PLEASE, only KEYS and GET commands with read_only_redis !!!!!!!!! <=
+# => !!! PLEASE, only reading commands with read_only_redis !!!!!!!!!!!!!! <=
 # => !!! any SET commands are supposed to happen later in execute_redis !! <=
 # => !!! append any SET commands to the list returned by this function !!! <=
+def convert_to_redis__create_row(schema, table_name, fields, values, \
+                                 layout):
+    """
+    Compose the redis statements to write one new row. Returns a list.
+
+    The first argument is the prefix for the redis key, the second is the INDI
+    table name. The third and fourth are the FIELDS and VALUES of the row,
+    with 'id' and the new primary key among them. The fifth is the layout of
+    the redis store. The primary key counter is not moved.
+    """
+    results = []
+    pk = str(values[list(fields).index('id')])
+
+    if layout == 'hash':
+        this_hset = ('HSET', convert_to_redis__row_key(schema, table_name, pk))
+        for field, value in pairlis(fields, values):
+            this_hset += (field, value)
+            if field != 'id':
+                results.append(('SADD', convert_to_redis__index_key( \
+                    schema, table_name, field, value), pk))
+        results.append(this_hset)
+        results.append(('ZADD', convert_to_redis__pks_key(schema, table_name), \
+                        pk, pk))
+    else:
+        table_prefix = convert_to_redis__table_prefix(schema, table_name)
+        for field, value in pairlis(fields, values):
+            results.append(('SET', table_prefix + pk + '_' + field, value))
+            if field != 'id':
+                results.append(('SADD', convert_to_redis__index_key( \
+                    schema, table_name, field, value), pk))
+        results.append(('SADD', convert_to_redis__fields_key( \
+            schema, table_name)) + tuple(fields))
+
+    return results
+
 def convert_to_redis(c, stores):
     """
     Convert an INDI statement to redis statements. Returns multiple values.
 
-    The first value returned is a list of strings which contain the resulting
-    redis statements. The second value is a list of strings which contain the
-    FIELDS from the original INDI statement.
+    The first value returned is a list of tuples which contain the resulting
+    redis statements, such as `('SET', key, value)`. The second value is a
+    list of strings which contain the FIELDS from the original INDI statement.
 
     More than likely, it will take many redis statements to emulate a single
     INDI statement. This function returns the list of equivalent redis code. 
     
-    The first argument is the INDI statement (a string) to convert.
-    The second argument is the stores dictionary, which is the result of
-    initialize_stores().
+    The first argument is the INDI statement (a string, or an IndiStatement
+    from parse_indi()) to convert. The second argument is the stores
+    dictionary, which is the result of initialize_stores().
 
     The stores are passed as an argument in order to emulate sub-queries. The
     stores are not supposed to be written/mutated/modified from within this
@@ -347,216 +1048,622 @@ def convert_to_redis(c, stores):
     """
     read_only_redis = stores['redis'] # no way to enforce 'read only'
     schema = stores['info']['redis']['db']
+    layout = convert_to_redis__layout(stores)
     results = []
-    c_array = c.split()
+    indi = parse_indi(c)
+    table_prefix = convert_to_redis__table_prefix(schema, indi.table)
     fields = None
     matching_pk_list = [] # used for the single-depth subquery 
     
-    if c_array[0].upper() == 'DELETE':
-        fields = [''] # convertToRedis_getFields probably crashes for a DELETE
+    if indi.verb == 'DELETE':
+        fields = [''] # a DELETE has no FIELDS, but one 'column' of results
     else:
-        fields = get_indi_fields(c) 
+        fields = list(indi.fields)
 
     # *** "FIRST",    
     # in order to support querying by more than just the ID integer
     # we need to do a sub-query, in order
     # to find the ID, this way we do not have to modify any code we wrote,
     # and instead we will substitute the query
-    if c_array[0].upper() != 'CREATE' \
-       and (c_array[3].lower() != 'id' and c_array[3].upper() != 'ALL'): 
-        search_by_field = c_array[3]
-        search_by_value = get_indi_query(c)
-
-        # need to update the next line so c_array[3] is search_by_value
-        # because otherwise the quotes will be passed in
-        matching_keys = read_only_redis.keys((schema + '-' +
-                                              c_array[2]) +
-                                             '_*_' + c_array[3])
-
-        print(DEBUG_PRINT_PREFIX__REDIS +
-              "matching key length: " + str(len(matching_keys)))
-        # this returns every row in the table,
-        # only the ID and search_by_field columns...use the redis SCAN command
-        for m in matching_keys: 
-            print(DEBUG_PRINT_PREFIX__REDIS + "GET " + m.decode('ASCII'))
-            this_value = read_only_redis.get(m)
-            print(DEBUG_PRINT_PREFIX__REDIS +
-                  this_value.decode('ASCII') +
-                  " compared to " + search_by_value)
-            if this_value.decode('ASCII') == search_by_value:
-                matching_pk_list.append(m.decode('ASCII').split('_')[1])
+    if indi.verb != 'CREATE' and not indi.all_records \
+       and indi.field.lower() != 'id':
+        matching_pk_list = convert_to_redis__find_primary_keys( \
+            read_only_redis, schema, indi.table, indi.field, indi.value, \
+            layout)
+
+        LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS \
+                         + 'matching primary keys: %s', matching_pk_list)
 
         if(len(matching_pk_list) == 0):
             return [], fields # the record was not found
-        else:
-            matching_pk_list.sort() # may be out-of-order numerically
 
     # *** "SECOND",
     # evaluate the INDI statement 
-    if c_array[0].upper() == 'READ':
+    if indi.verb == 'CREATE':
+        for row in indi.rows:
+            if len(fields) != len(row):
+                return ERROR__FIELDS_AND_VALUES_BAD_QUANTITY, fields
+        fields.append('id')
+        # the same for one row as for many, and for either layout
+        for converted_to_redis in convert_to_redis__bulk_create([indi], \
+                                                                stores):
+            results.extend(converted_to_redis)
+
+    elif layout == 'hash':
+        results = convert_to_redis__hash_layout(read_only_redis, schema, \
+                                                indi, fields, matching_pk_list)
+
+    elif indi.verb == 'READ':
         # pulling all records
-        if c_array[3] == 'ALL' and c_array[4] == 'RECORDS':
+        if indi.all_records:
             max_pk = convert_to_redis__get_next_pk(read_only_redis,
-                                             schema, c_array[2])
-            print(DEBUG_PRINT_PREFIX__REDIS + "max_pk is: " + str(max_pk))
-            for i in range(1, max_pk):
-                for field in fields:
-                    results.append('GET ' + (schema + '-' + c_array[2])
-                                   + '_' + str(i) + '_' + field)
+                                             schema, indi.table)
+            LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS + 'max_pk is: %s', \
+                             max_pk)
+            matching_pk_list = range(1, max_pk)
                     
         # pulling records which match a query
-        else:
-            if len(matching_pk_list) == 0:
-                matching_pk_list.append(c_array[4])
-                
-            for pk in matching_pk_list:
-                for field in fields:
-                    results.append('GET ' + (schema + '-' + c_array[2])
-                               + '_' + pk + '_' + field)
+        elif len(matching_pk_list) == 0:
+            matching_pk_list.append(indi.value)
+
+        results = convert_to_redis__read_rows(schema, indi.table, \
+                                              matching_pk_list, fields, layout)
                 
-    elif c_array[0].upper() == 'UPDATE':
-        values = get_indi_values(c)
-        # the string tokenization ought to be replaced with regex
-        # or maybe the user submitted an invalid DML statement
+    elif indi.verb == 'UPDATE':
+        values = list(indi.values)
         if len(fields) != len (values): 
             return ERROR__FIELDS_AND_VALUES_BAD_QUANTITY
 
         # if the DML is to update just one thing by the pk, then
         # matching_pk_list is empty so far
         if len(matching_pk_list) == 0:
-            matching_pk_list.append(c_array[4])
-            
+            matching_pk_list.append(indi.value)
+
+        # the old values must be known, to move the pks between index sets.
+        # 'id' is not in the index, so its old value is not needed.
+        old_keys = [table_prefix + pk + '_' + field \
+                    for pk in matching_pk_list for field in fields \
+                    if field != 'id']
+        old_values = {}
+        if len(old_keys) > 0:
+            old_values = dict(pairlis(old_keys, read_only_redis.mget(old_keys)))
+
+        if len(fields) > 0:
+            results.append(('SADD', convert_to_redis__fields_key( \
+                schema, indi.table)) + tuple(fields))
         for pk in matching_pk_list:
             for i in range(0, len(fields)):
-                results.append('SET ' + (schema + '-' + c_array[2]) + '_'
-                           + pk + '_' + fields[i] + ' '
-                           + format_str_or_int(values[i])) 
-
-    elif c_array[0].upper() == 'CREATE':
-        values = get_indi_values(c)
-        # if a user stores a string in here in a certain format, maybe errors?
-        if len(fields) != len(values): 
-            return ERROR__FIELDS_AND_VALUES_BAD_QUANTITY
-
-        this_new_pk = convert_to_redis__get_next_pk(read_only_redis,
-                                             schema, c_array[2])
-        fields.append('id')
-        values.append(this_new_pk)
-
-        results.append(
-                convert_to_redis__set_next_pk(schema, c_array[2], this_new_pk))
-        
-        for i in range(0, len(fields)):
-            results.append('SET ' + (schema + '-' + c_array[2]) + '_'
-                           + str(this_new_pk) + '_' + fields[i] + ' '
-                           + format_str_or_int(values[i]))
-
-    elif c_array[0].upper() == 'DELETE':
+                results.append(('SET', table_prefix + pk + '_' + fields[i], \
+                                values[i]))
+                if fields[i] == 'id':
+                    continue
+                old_value = old_values[table_prefix + pk + '_' + fields[i]]
+                if old_value is not None:
+                    results.append(('SREM', convert_to_redis__index_key( \
+                        schema, indi.table, fields[i], \
+                        old_value.decode('ASCII')), pk))
+                results.append(('SADD', convert_to_redis__index_key( \
+                    schema, indi.table, fields[i], values[i]), pk))
+
+    elif indi.verb == 'DELETE':
         matching_keys = []
 
         # the query may have specified the pk, so matching_pk_list
         # would be empty (because there was no subquery search)
-        if len(matching_pk_list) == 0 and c_array[3] == 'id':
-            matching_pk_list.append(c_array[4])
+        if len(matching_pk_list) == 0 and indi.field.lower() == 'id':
+            matching_pk_list.append(indi.value)
             
-        for pk in matching_pk_list: 
-            these_matching_keys = read_only_redis.keys((schema + '-'
-                                                    + c_array[2])
-                                                    + '_' + pk
-                                                    + '_*')
-            # need to 'flatten the list'
-            for k in these_matching_keys:
-                matching_keys.append(k)
+        # every cell the rows may have, rather than searching for their keys
+        table_fields = convert_to_redis__find_fields(read_only_redis, schema, \
+                                                     indi.table)
+        for pk in matching_pk_list:
+            for field in table_fields:
+                matching_keys.append(table_prefix + pk + '_' + field)
+
+        # the values must be known, to remove the pks from their index sets
+        matching_values = []
+        if len(matching_keys) > 0:
+            matching_values = read_only_redis.mget(matching_keys)
                 
-        for m in matching_keys:
-            results.append('DEL ' + m.decode('ASCII'))
-            print(DEBUG_PRINT_PREFIX__REDIS + 'DEL ' + m.decode('ASCII'))
+        for m, this_value in pairlis(matching_keys, matching_values):
+            if this_value is None:
+                continue # the row has no such cell
+            results.append(('DEL', m))
+            LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS + 'DEL %s', m)
+            pk, field = convert_to_redis__split_cell_key(schema, indi.table, m)
+            if field != 'id' and this_value is not None:
+                results.append(('SREM', convert_to_redis__index_key( \
+                    schema, indi.table, field, this_value.decode('ASCII')), pk))
 
     # "THIRD",
     # return the list of INDI statements converted to redis commands,
     # and the INDI FIELDS specified from the original INDI statement.
     return results, fields
 
+def convert_to_redis__hash_layout(read_only_redis, schema, indi, fields, \
+                                  matching_pk_list):
+    """
+    Convert an INDI statement for the 'hash' layout. Returns a list of tuples.
+
+    This is the second half of convert_to_redis(), for a redis store with
+    'layout': 'hash' in stores.txt, and the arguments are as prepared there:
+    a redis connection (only read from), the prefix for the redis key, the
+    IndiStatement, its FIELDS as a list, and the primary keys found by the
+    sub-query, if there was one. A CREATE is converted by
+    convert_to_redis__bulk_create() instead.
+
+    A row is read with one HMGET, and deleted with one DEL, rather than one
+    command per cell. Only rows in the sorted set of live primary keys are
+    updated.
+    """
+    results = []
+    pks_key = convert_to_redis__pks_key(schema, indi.table)
+    matching_pk_list = list(matching_pk_list)
+
+    if indi.verb == 'READ':
+        # pulling all records, in the order of their primary keys
+        if indi.all_records:
+            LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS + 'ZRANGE %s 0 -1', \
+                             pks_key)
+            matching_pk_list = [pk.decode('ASCII') for pk in \
+                                read_only_redis.zrange(pks_key, 0, -1)]
+        elif len(matching_pk_list) == 0:
+            matching_pk_list.append(indi.value)
+
+        results = convert_to_redis__read_rows(schema, indi.table, \
+                                              matching_pk_list, fields, 'hash')
+
+    elif indi.verb == 'UPDATE':
+        values = list(indi.values)
+        if len(fields) != len (values): 
+            return ERROR__FIELDS_AND_VALUES_BAD_QUANTITY
+        if len(fields) == 0:
+            return results
+
+        if len(matching_pk_list) == 0:
+            matching_pk_list.append(indi.value)
+
+        # which rows exist, and their old values (to move the pks between
+        # index sets), in one round-trip
+        pipeline = read_only_redis.pipeline(transaction=False)
+        for pk in matching_pk_list:
+            pipeline.zscore(pks_key, pk)
+            pipeline.hmget(convert_to_redis__row_key(schema, indi.table, pk), \
+                           fields)
+        replies = pipeline.execute()
+
+        for i in range(0, len(matching_pk_list)):
+            pk = matching_pk_list[i]
+            if replies[2 * i] is None:
+                continue # there is no such row
+            row_key = convert_to_redis__row_key(schema, indi.table, pk)
+            this_hset = ('HSET', row_key)
+            for field, value, old_value in \
+                    zip(fields, values, replies[2 * i + 1]):
+                this_hset += (field, value)
+                if field == 'id':
+                    continue
+                if old_value is not None:
+                    results.append(('SREM', convert_to_redis__index_key( \
+                        schema, indi.table, field, \
+                        old_value.decode('ASCII')), pk))
+                results.append(('SADD', convert_to_redis__index_key( \
+                    schema, indi.table, field, value), pk))
+            results.append(this_hset)
+
+    elif indi.verb == 'DELETE':
+        if len(matching_pk_list) == 0 and indi.field.lower() == 'id':
+            matching_pk_list.append(indi.value)
+
+        # the values must be known, to remove the pks from their index sets
+        pipeline = read_only_redis.pipeline(transaction=False)
+        for pk in matching_pk_list:
+            pipeline.hgetall(convert_to_redis__row_key(schema, indi.table, pk))
+
+        for pk, row in pairlis(matching_pk_list, pipeline.execute()):
+            if len(row) == 0:
+                continue # there is no such row
+            results.append(('DEL', \
+                convert_to_redis__row_key(schema, indi.table, pk)))
+            results.append(('ZREM', pks_key, pk))
+            for field, value in row.items():
+                field = field.decode('ASCII')
+                if field != 'id':
+                    results.append(('SREM', convert_to_redis__index_key( \
+                        schema, indi.table, field, value.decode('ASCII')), pk))
+
+    return results
+
 def execute_redis(indi_statement, stores):
     """
     Execute an INDI statement against redis. Returns a multi-dimensional list.
 
-    The first argument is the indi_statement, as a string. The second argument
-    is the stores dictionary as created by initialize_stores().  
+    The first argument is the indi_statement, as a string or IndiStatement.
+    The second argument is the stores dictionary as created by
+    initialize_stores().
     
     The only time the result should have any real values in it would be from
     an INDI read statement. Any CREATE, UPDATE, DELETE INDI statement should
     return an empty list.
+
+    The statements from convert_to_redis() are not sent one at a time. The
+    GETs (or HMGETs) of a READ are sent in one pipeline, with the GETs batched
+    into MGETs, and the writes of a CREATE, UPDATE or DELETE are sent as one
+    MULTI/EXEC transaction, so the statement costs one round-trip on top of
+    the look-ups needed to convert it. A CREATE of many rows is sent by
+    execute_redis__bulk_create() instead, and a page of a READ is read by
+    execute_redis__stream().
     """
-    results = []
-    converted_to_redis, fields = convert_to_redis(indi_statement, stores)
+    indi = parse_indi(indi_statement)
+    if indi.verb == 'CREATE' and len(indi.rows) > 1:
+        return execute_redis__bulk_create([indi], stores)
+    if indi.verb == 'READ' and is_indi_page(indi):
+        # only as many rows are read as the page needs
+        return list(execute_redis__stream(indi, stores))
 
-    # the string tokenization may have failed, a better solution
-    # might involve the use of regular expressions? 
+    converted_to_redis, fields = convert_to_redis(indi, stores)
+
+    # the user submitted a different quantity of FIELDS and VALUES
     if converted_to_redis == ERROR__FIELDS_AND_VALUES_BAD_QUANTITY:
-        print(ERROR__FIELDS_AND_VALUES_BAD_QUANTITY)
+        LOG__REDIS.error(ERROR__FIELDS_AND_VALUES_BAD_QUANTITY)
         exit(52) # 'common linux error: invalid exchange'
     
-    set_length = len(fields) # only need the quantity of fields
-    this_built_set = []
+    # only need the quantity of fields
+    return execute_redis__statements(converted_to_redis, len(fields), stores)
+
+def execute_redis__statements(converted_to_redis, set_length, stores):
+    """
+    Send converted redis statements to redis. Returns a multi-dimensional list.
+
+    The first argument is the list of redis statements from convert_to_redis()
+    (or convert_to_redis__bulk_create()), the second is the quantity of FIELDS
+    in each row read, and the third is the stores dictionary. See
+    execute_redis() for how the statements are sent.
+    """
+    results = []
     redis_connection = stores['redis']
-    
+    read_keys = []
+    read_rows = []
+    reads = []
+    writes = []
+
+    metrics_count_commands('redis', \
+                           [statement[0] for statement in converted_to_redis])
+    debug = LOG__REDIS.isEnabledFor(logging.DEBUG)
     for statement in converted_to_redis:
-        # there is a lack-of-ability in the python redis client library,
-        # it is unable to 'raw parse' a full redis statement, but it as been
-        # added to future features 'maybe', so perhaps then the code here
-        # may be simplified...pertaining to redis_command and redis_key.  
-        # see https://github.com/redis/redis-py/issues/1659
-        print(DEBUG_PRINT_PREFIX__REDIS + statement)
-        redis_command = statement.split()[0].upper()
-        redis_key = statement.split()[1]
-        if "\"" in statement or "'" in statement:
-            redis_value = statement[len(redis_command) + len(redis_key) \
-                                   + 3 : len(statement)-1]
+        if debug:
+            LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS \
+                             + ' '.join(map(str, statement)))
+        if statement[0] == 'GET':
+            read_keys.append(statement[1])
+            reads.append(statement)
+        elif statement[0] == 'HMGET':
+            read_rows.append(statement)
+            reads.append(statement)
         else:
-            redis_value = statement[len(redis_command) + len(redis_key) \
-                                   + 2 : len(statement)] 
-            this_result = None
-
-        if statement.split()[0].upper() == 'SET':
-            print(DEBUG_PRINT_PREFIX__REDIS + redis_key + " " + redis_value)
-            if redis_connection.set(redis_key, redis_value):
-                this_result = None
-            else:
-                this_result = "Redis SET failed. Check the CINDI README."
-                print(DEBUG_PRINT_PREFIX__REDIS + this_result)
-                print(DEBUG_PRINT_PREFIX__REDIS +
-                      'This was the statement to evaluate: ')
-                print(DEBUG_PRINT_PREFIX__REDIS + statement)
+            writes.append(statement)
+
+    # every write of the INDI statement is applied, or none of them are
+    if len(writes) > 0:
+        start = time.time_ns()
+        pipeline = redis_connection.pipeline(transaction=True)
+        for statement in writes:
+            pipeline.execute_command(*statement)
+        written = pipeline.execute()
+        trace_native('redis', writes, start)
+        for statement, this_result in pairlis(writes, written):
+            if statement[0] == 'SET' and not this_result:
+                LOG__REDIS.error(DEBUG_PRINT_PREFIX__REDIS \
+                                 + 'Redis SET failed. Check the CINDI README.' \
+                                 + ' This was the statement to evaluate: %s', \
+                                 ' '.join(map(str, statement)))
                 exit(29) # 'cannot write to specified device' 
-        else:
-            this_result = redis_connection.execute_command(statement)
-            # a 'DEL' will return a 1 into this_result, desire 'None'
-            if statement.startswith('DEL'):
-                this_result = None
-
-        if not this_result is None:
-            if isinstance(this_result, int):
-                this_built_set.append(this_result)
-            else:
-                maybeAnInt = try_int(this_result.decode('ASCII'))
-                this_built_set.append(maybeAnInt)
-        else:
-            this_built_set.append(None)
 
-        print(DEBUG_PRINT_PREFIX__REDIS +
-              "redis this built set length: " + str(len(this_built_set)))
-        for x in this_built_set:
-            print(DEBUG_PRINT_PREFIX__REDIS +
-                  "redis set element: " + str(x))
-            
-        if len(this_built_set) == set_length:
+    # the GETs are batched into MGETs, which are all sent in one round-trip.
+    # a READ is either all GETs, or all HMGETs of one row each.
+    if len(read_keys) > 0 or len(read_rows) > 0:
+        start = time.time_ns()
+        pipeline = redis_connection.pipeline(transaction=False)
+        for i in range(0, len(read_keys), REDIS__BATCH_SIZE):
+            pipeline.mget(read_keys[i:i + REDIS__BATCH_SIZE])
+        for statement in read_rows:
+            pipeline.execute_command(*statement)
+        read_values = []
+        for these_values in pipeline.execute():
+            read_values.extend(these_values)
+        trace_native('redis', reads, start)
+
+        # each row is set_length consecutive values
+        for i in range(0, len(read_values), set_length):
+            this_built_set = []
+            for this_result in read_values[i:i + set_length]:
+                if this_result is None:
+                    this_built_set.append(None)
+                else:
+                    this_built_set.append(try_int(this_result.decode('ASCII')))
+            LOG__REDIS.log(LOG__TRACE, DEBUG_PRINT_PREFIX__REDIS \
+                           + 'redis row: %s', this_built_set)
             if not is_list_all_nones(this_built_set):
                 results.append(this_built_set)
-            this_built_set = []
         
     return results
 
+def convert_to_redis__bulk_create(statements, stores):
+    """
+    Convert INDI CREATE statements of one table to redis. Returns a list.
+
+    The first argument is the list of IndiStatements, which must all be
+    CREATEs into the same INDI table, the second is the stores dictionary.
+    The primary keys of every row of every statement are allocated as one
+    block, by moving the counter once, in the order of the rows. Since the
+    keys of each row depend on its primary key, the counter is moved here,
+    with convert_to_redis__create_new_pks(), rather than by the result.
+
+    The result is a list of lists of redis statements, each holding at most
+    REDIS__BATCH_SIZE rows, so that a large load is not one MULTI/EXEC which
+    blocks redis until it is done.
+    """
+    schema = stores['info']['redis']['db']
+    layout = convert_to_redis__layout(stores)
+    table_name = statements[0].table
+    rows = [(indi.fields, row) for indi in statements for row in indi.rows]
+    results = []
+
+    first_new_pk = convert_to_redis__create_new_pks(stores['redis'], schema, \
+                                                    table_name, len(rows))
+
+    # an empty table is trivially indexed, from its first row onwards
+    if first_new_pk == 1:
+        results.append(('SET', \
+            convert_to_redis__indexed_key(schema, table_name), '1'))
+
+    transactions = [results]
+    for i, (fields, values) in enumerate(rows):
+        if i > 0 and i % REDIS__BATCH_SIZE == 0:
+            transactions.append([])
+        transactions[-1].extend(convert_to_redis__create_row( \
+            schema, table_name, list(fields) + ['id'], \
+            list(values) + [first_new_pk + i], layout))
+
+    return transactions
+
+def execute_redis__bulk_create(statements, stores):
+    """
+    Execute INDI CREATE statements of one table on redis. Returns a list.
+
+    The arguments are the same as convert_to_redis__bulk_create(), each of
+    its transactions is sent in turn. A CREATE has no rows, so the result is
+    an empty list.
+    """
+    for indi in statements:
+        for row in indi.rows:
+            if len(indi.fields) != len(row):
+                LOG__REDIS.error(ERROR__FIELDS_AND_VALUES_BAD_QUANTITY)
+                exit(52) # 'common linux error: invalid exchange'
+
+    for converted_to_redis in convert_to_redis__bulk_create(statements, \
+                                                            stores):
+        execute_redis__statements(converted_to_redis, 0, stores)
+    return []
+
+def convert_to_redis__stream_live_pks(read_only_redis, schema, table_name, \
+                                      after=None, batch_size=None):
+    """
+    Read the live primary keys of a 'hash' table. Returns a generator.
+
+    The first three arguments are the same as convert_to_redis__get_next_pk().
+    The optional fourth is the primary key to start after, by default the
+    first is read. The primary keys are read the optional fifth at a time (by
+    default STREAM__BATCH_SIZE), each batch starting after the last primary
+    key of the one before, so that rows deleted in the meantime do not move
+    the rest.
+    """
+    pks_key = convert_to_redis__pks_key(schema, table_name)
+    if batch_size is None:
+        batch_size = STREAM__BATCH_SIZE
+    after = '-inf' if after is None else '(' + str(after)
+    while True:
+        LOG__REDIS.debug(DEBUG_PRINT_PREFIX__REDIS + 'ZRANGEBYSCORE %s %s ' \
+                         + '+inf LIMIT 0 %s', pks_key, after, batch_size)
+        these_pks = read_only_redis.zrangebyscore( \
+            pks_key, after, '+inf', start=0, num=batch_size)
+        if len(these_pks) == 0:
+            return
+        for pk in these_pks:
+            yield pk.decode('ASCII')
+        after = '(' + these_pks[-1].decode('ASCII')
+
+def execute_redis__stream(indi_statement, stores):
+    """
+    Read the rows of an INDI READ from redis. Returns a generator.
+
+    The arguments are the same as execute_redis(), and each row is the same
+    as in its result. The rows are read STREAM__BATCH_SIZE primary keys at a
+    time, each batch in one pipeline, so they are never all held at once.
+
+    A page of a READ starts from its AFTER id, with a range of the sorted set
+    of live primary keys in the 'hash' layout, and stops once the page is
+    full, reading no more than the page's OFFSET and LIMIT at a time.
+    """
+    read_only_redis = stores['redis']
+    schema = stores['info']['redis']['db']
+    layout = convert_to_redis__layout(stores)
+    indi = parse_indi(indi_statement)
+    fields = list(indi.fields)
+    batch_size = STREAM__BATCH_SIZE
+    if indi.limit is not None:
+        batch_size = max(1, min(batch_size, (indi.offset or 0) + indi.limit))
+
+    if indi.all_records and layout == 'hash':
+        matching_pks = convert_to_redis__stream_live_pks( \
+            read_only_redis, schema, indi.table, indi.after, batch_size)
+    elif indi.all_records:
+        matching_pks = range((indi.after or 0) + 1, \
+                             convert_to_redis__get_next_pk( \
+                                 read_only_redis, schema, indi.table))
+    else:
+        if indi.field.lower() == 'id':
+            matching_pks = [indi.value]
+        else:
+            matching_pks = convert_to_redis__find_primary_keys( \
+                read_only_redis, schema, indi.table, indi.field, indi.value, \
+                layout)
+        if indi.after is not None:
+            matching_pks = [pk for pk in matching_pks \
+                            if pk.isdigit() and int(pk) > indi.after]
+
+    def read_rows(matching_pks):
+        matching_pks = iter(matching_pks)
+        while True:
+            these_pks = list(itertools.islice(matching_pks, batch_size))
+            if len(these_pks) == 0:
+                return
+            yield from execute_redis__statements(convert_to_redis__read_rows( \
+                schema, indi.table, these_pks, fields, layout), len(fields), \
+                stores)
+
+    yield from page_indi_rows(indi, read_rows(matching_pks))
+
+def rebuild_redis_index(stores, table_name, layout=None):
+    """
+    Rebuild the field value index of an INDI table in redis. Returns an int.
+
+    The first argument is the stores dictionary, the second is the INDI table
+    name. The optional third is the layout the table is stored in, by default
+    the 'layout' of the redis store in stores.txt. The result is the quantity
+    of cells which were indexed. For the 'cell' layout, the set of fields used
+    in the table is rebuilt too, see convert_to_redis__find_fields().
+
+    Tables which held data before the index was introduced must be rebuilt
+    once, until then searching them falls back to visiting every row. The
+    keys are visited with SCAN, so redis is not blocked while rebuilding, but
+    no INDI statements should write to the table at the same time.
+    """
+    redis_connection = stores['redis']
+    schema = stores['info']['redis']['db']
+    if layout is None:
+        layout = convert_to_redis__layout(stores)
+    result = 0
+
+    # forget the old index first, so that stale entries do not survive
+    redis_connection.delete(convert_to_redis__indexed_key(schema, table_name))
+    old_index_keys = list(redis_connection.scan_iter( \
+        match=schema + '-' + table_name + '-INDEX:*', count=REDIS__BATCH_SIZE))
+    for i in range(0, len(old_index_keys), REDIS__BATCH_SIZE):
+        redis_connection.delete(*old_index_keys[i:i + REDIS__BATCH_SIZE])
+
+    if layout == 'hash':
+        live_pks = [pk.decode('ASCII') for pk in redis_connection.zrange( \
+            convert_to_redis__pks_key(schema, table_name), 0, -1)]
+        for i in range(0, len(live_pks), REDIS__BATCH_SIZE):
+            these_pks = live_pks[i:i + REDIS__BATCH_SIZE]
+            pipeline = redis_connection.pipeline(transaction=False)
+            for pk in these_pks:
+                pipeline.hgetall( \
+                    convert_to_redis__row_key(schema, table_name, pk))
+            these_rows = pipeline.execute()
+            for pk, row in pairlis(these_pks, these_rows):
+                for field, this_value in row.items():
+                    field = field.decode('ASCII')
+                    if field == 'id':
+                        continue
+                    pipeline.sadd(convert_to_redis__index_key(schema, \
+                        table_name, field, this_value.decode('ASCII')), pk)
+                    result += 1
+            pipeline.execute()
+    else:
+        cell_keys = []
+        table_fields = set()
+        for key in redis_connection.scan_iter( \
+                match=convert_to_redis__table_prefix(schema, table_name) \
+                + '*_*', count=REDIS__BATCH_SIZE):
+            pk, field = convert_to_redis__split_cell_key(schema, table_name, \
+                                                         key)
+            # the pattern also matches tables named like
+            # '<table_name>_<something>'
+            if pk.isdigit():
+                table_fields.add(field)
+            if pk.isdigit() and field != 'id':
+                cell_keys.append(key)
+
+        fields_key = convert_to_redis__fields_key(schema, table_name)
+        redis_connection.delete(fields_key)
+        if len(table_fields) > 0:
+            redis_connection.sadd(fields_key, *table_fields)
+
+        for i in range(0, len(cell_keys), REDIS__BATCH_SIZE):
+            these_keys = cell_keys[i:i + REDIS__BATCH_SIZE]
+            pipeline = redis_connection.pipeline(transaction=False)
+            for key, this_value in pairlis(these_keys, \
+                                           redis_connection.mget(these_keys)):
+                if this_value is None:
+                    continue
+                pk, field = convert_to_redis__split_cell_key(schema, \
+                                                             table_name, key)
+                pipeline.sadd(convert_to_redis__index_key( \
+                    schema, table_name, field, this_value.decode('ASCII')), pk)
+                result += 1
+            pipeline.execute()
+
+    redis_connection.set(convert_to_redis__indexed_key(schema, table_name), '1')
+    LOG__REDIS.info(DEBUG_PRINT_PREFIX__REDIS + 'indexed %s cells of table ' \
+                    + '%s', result, table_name)
+    return result
+
+def migrate_redis_to_hash_layout(stores, table_name):
+    """
+    Move an INDI table from the 'cell' to the 'hash' layout. Returns an int.
+
+    The first argument is the stores dictionary, the second is the INDI table
+    name. The result is the quantity of rows which were moved.
+
+    The cells of each row are copied into the row's hash, the primary key is
+    added to the sorted set of live primary keys, and the cells are deleted,
+    in one MULTI/EXEC transaction per batch of rows. The index is rebuilt
+    afterwards. Nothing should write to the table while it is migrated. Once
+    every table in tables.txt is migrated, set 'layout' to 'hash' under
+    'redis' in stores.txt. Migrating a table again moves nothing.
+    """
+    redis_connection = stores['redis']
+    schema = stores['info']['redis']['db']
+    pks_key = convert_to_redis__pks_key(schema, table_name)
+    cell_keys = {} # the cell keys of each primary key
+
+    for key in redis_connection.scan_iter( \
+            match=convert_to_redis__table_prefix(schema, table_name) + '*_*', \
+            count=REDIS__BATCH_SIZE):
+        pk, field = convert_to_redis__split_cell_key(schema, table_name, key)
+        # the pattern also matches tables named like '<table_name>_<something>'
+        if pk.isdigit():
+            cell_keys.setdefault(pk, []).append(key)
+
+    primary_keys = sorted(cell_keys.keys(), key=int)
+    for i in range(0, len(primary_keys), REDIS__BATCH_SIZE):
+        these_keys = []
+        for pk in primary_keys[i:i + REDIS__BATCH_SIZE]:
+            these_keys.extend(cell_keys[pk])
+        rows = {}
+        for key, this_value in pairlis(these_keys, \
+                                       redis_connection.mget(these_keys)):
+            if this_value is None:
+                continue
+            pk, field = convert_to_redis__split_cell_key(schema, \
+                                                         table_name, key)
+            rows.setdefault(pk, {})[field] = this_value
+
+        pipeline = redis_connection.pipeline(transaction=True)
+        for pk, row in rows.items():
+            pipeline.hset(convert_to_redis__row_key(schema, table_name, pk), \
+                          mapping=row)
+            pipeline.zadd(pks_key, {pk: int(pk)})
+        pipeline.delete(*these_keys)
+        pipeline.execute()
+
+    LOG__REDIS.info(DEBUG_PRINT_PREFIX__REDIS + 'moved %s rows of table %s ' \
+                    + 'to the hash layout', len(primary_keys), table_name)
+    rebuild_redis_index(stores, table_name, 'hash')
+    return len(primary_keys)
+
 # end redis driver
 # ------------------------------------------------------------------------------
 # begin generic SQL driver
@@ -579,138 +1686,226 @@ def convert_to_sql__fields_merger(field_list):
 
 # there is a one-to-one mapping between INDI and SQL statements
 # to keep it consistent, it still returns a list (containing one statement)
-def convert_to_sql(c):
+def convert_to_sql(c, placeholder='?'):
     """
-    Convert an INDI statement into an SQL statement. Returns a string in a list.
+    Convert an INDI statement into an SQL statement. Returns a tuple in a list.
 
     This process is simple, because the INDI language is nearly a subset of SQL
-    with the statement sub-components ordered differently. 
+    with the statement sub-components ordered differently. The first argument
+    is the INDI statement, as a string or an IndiStatement from parse_indi(),
+    the optional second is the parameter placeholder of the SQL driver, see
+    convert_to_sql__placeholder().
+
+    The statement is a (statement, parameters) tuple. Every value is sent as
+    a parameter rather than spliced in, so statements which only differ by
+    their values have the same text, and the store reuses the plan it has
+    prepared for it. The table and field names are spliced in, parse_indi()
+    only allows plain names.
     """
     results = []
-    c_array = c.split()
+    indi = parse_indi(c)
 
-    SQL__PK_COLUMN_NAME = c_array[3]
+    SQL__PK_COLUMN_NAME = indi.field
     
-    if c_array[0].upper() == 'READ':
-        fields = get_indi_fields(c)
+    if indi.verb == 'READ' and is_indi_page(indi):
+        results.append(convert_to_sql__page(indi, placeholder))
 
-        if c_array[3].upper() == 'ALL' and c_array[4].upper() == 'RECORDS':
-            results.append('SELECT ' + convert_to_sql__fields_merger(fields)
-                           + ' FROM ' + (c_array[2])
-                           + ' ORDER BY id ASC;')
+    elif indi.verb == 'READ':
+        fields = indi.fields
+
+        if indi.all_records:
+            results.append(('SELECT ' + convert_to_sql__fields_merger(fields)
+                            + ' FROM ' + (indi.table)
+                            + ' ORDER BY id ASC', ()))
             
         else:
-            query_by_value = get_indi_query(c)
-            #if c.find("\"") > -1 and c.find("\"") < c.find('FIELDS'):
-            #    query_by_value = c.split("\"")[1]
-            #elif c.find("\'") > -1 and c.find("\'") < c.find('FIELDS'):
-            #    query_by_value = c.split("\'")[1] 
-
-            results.append('SELECT ' +  convert_to_sql__fields_merger(fields) \
-                           + ' FROM ' + (c_array[2]) \
-                           + ' WHERE ' + SQL__PK_COLUMN_NAME + ' = ' \
-                           + format_str_or_int(try_int(query_by_value))
-                           + ' ORDER BY id ASC;')
-
-    elif c_array[0].upper() == 'CREATE':
-        fields = get_indi_fields(c)
-        values = get_indi_values(c)
-        # the string tokenization used might not be perfect, so need to check
+            results.append(('SELECT ' + convert_to_sql__fields_merger(fields) \
+                            + ' FROM ' + (indi.table) \
+                            + ' WHERE ' + SQL__PK_COLUMN_NAME + ' = ' \
+                            + placeholder + ' ORDER BY id ASC', \
+                            (try_int(indi.value),)))
+
+    elif indi.verb == 'CREATE' and len(indi.rows) > 1:
+        # the rows are sent with executemany(), see execute_sql__indi()
+        raise ValueError('A CREATE of many rows has no single SQL statement.')
+
+    elif indi.verb == 'CREATE':
+        fields = indi.fields
+        values = indi.values
         if len(fields) != len(values):
             return ERROR__FIELDS_AND_VALUES_BAD_QUANTITY
 
-        result_str = 'INSERT INTO ' + (c_array[2]) + ' ('
-        for i in range(0, len(fields)-1):
-            result_str += fields[i] + ', '
-
-        result_str += fields[-1] + ')'
+        result_str = 'INSERT INTO ' + (indi.table) + ' (' \
+            + convert_to_sql__fields_merger(fields) + ') VALUES (' \
+            + ', '.join([placeholder] * len(values)) + ')'
+        results.append((result_str, tuple(values)))
 
-        result_str += ' VALUES ('
-        for i in range(0, len(values)-1):
-            result_str += format_str_or_int(values[i]) + ', '
-
-        result_str += format_str_or_int(values[-1])
-        result_str += ');'
-
-        results.append(result_str)
-    elif c_array[0].upper() == 'UPDATE':
-        fields = get_indi_fields(c)
-        values = get_indi_values(c)
+    elif indi.verb == 'UPDATE':
+        fields = indi.fields
+        values = indi.values
         
-        # the string tokenization used might not be perfect, so double check
         if len(fields) != len(values): 
             return ERROR__FIELDS_AND_VALUES_BAD_QUANTITY
 
-        query_by_value = get_indi_query(c)
-        #if c.find("\"") > -1 and c.find("\"") < c.find('FIELDS'):
-        #    query_by_value = c.split("\"")[1]
-        #elif c.find("\'") > -1 and c.find("\'") < c.find('FIELDS'):
-        #    query_by_value = c.split("\'")[1]
-            
-        result_str = 'UPDATE ' + (c_array[2]) + ' SET '
-        for i in range(0, len(values) - 1):
-            result_str += fields[i] + ' = ' + format_str_or_int(values[i]) \
-                + ', '
-
-        result_str += fields[-1] + ' = ' + format_str_or_int(values[-1])        
-        result_str += ' WHERE ' + SQL__PK_COLUMN_NAME + ' = ' \
-            + format_str_or_int(try_int(query_by_value)) + ';'
-        results.append(result_str)
-
-    elif c_array[0].upper() == 'DELETE':
-        query_by_value = get_indi_query(c)
-#        if c.find("\"") > -1 and c.find("\"") < c.find('FIELDS'):
-#            query_by_value = c.split("\"")[1]
-#        elif c.find("\'") > -1 and c.find("\'") < c.find('FIELDS'):
-#            query_by_value = c.split("\'")[1]
-#        else: # the next line did a forced cast to int() previously...
-#            queryByvalue = try_int(query_by_value)
-            
-        result_str = 'DELETE FROM ' + (c_array[2]) + ' WHERE ' \
-            + SQL__PK_COLUMN_NAME + ' = ' \
-            + format_str_or_int(try_int(query_by_value))
-        results.append(result_str)
+        result_str = 'UPDATE ' + (indi.table) + ' SET ' \
+            + ', '.join([field + ' = ' + placeholder for field in fields]) \
+            + ' WHERE ' + SQL__PK_COLUMN_NAME + ' = ' + placeholder
+        results.append((result_str, tuple(values) + (try_int(indi.value),)))
+
+    elif indi.verb == 'DELETE':
+        result_str = 'DELETE FROM ' + (indi.table) + ' WHERE ' \
+            + SQL__PK_COLUMN_NAME + ' = ' + placeholder
+        results.append((result_str, (try_int(indi.value),)))
         
     return results
 
-def execute_sql(statements, stores, DEBUG_PREFIX):
+def convert_to_sql__page(indi, placeholder='?'):
+    """
+    Convert a page of an INDI READ into an SQL SELECT. Returns a tuple.
+
+    The first argument is the IndiStatement, see is_indi_page(), the
+    optional second is the same as convert_to_sql(), and so is the result.
+    The rows which hold none of the FIELDS are left out by the SELECT,
+    rather than afterwards, so that they do not count towards the LIMIT and
+    OFFSET.
+    """
+    conditions = []
+    parameters = []
+    if not indi.all_records:
+        conditions.append(indi.field + ' = ' + placeholder)
+        parameters.append(try_int(indi.value))
+    if indi.after is not None:
+        conditions.append('id > ' + placeholder)
+        parameters.append(indi.after)
+    if not 'id' in indi.fields:
+        conditions.append('(' + ' OR '.join( \
+            [field + ' IS NOT NULL' for field in indi.fields]) + ')')
+
+    result_str = 'SELECT ' + convert_to_sql__fields_merger(indi.fields) \
+        + ' FROM ' + indi.table
+    if len(conditions) > 0:
+        result_str += ' WHERE ' + ' AND '.join(conditions)
+    result_str += ' ORDER BY id ASC'
+    # an OFFSET needs a LIMIT in MySQL and SQLite3
+    if indi.limit is not None or indi.offset is not None:
+        result_str += ' LIMIT ' + placeholder
+        parameters.append(SQL__NO_LIMIT if indi.limit is None else indi.limit)
+    if indi.offset is not None:
+        result_str += ' OFFSET ' + placeholder
+        parameters.append(indi.offset)
+    return result_str, tuple(parameters)
+
+def convert_to_sql__placeholder(driver_name):
+    """
+    Find the query parameter placeholder of an SQL driver. Returns a string.
+
+    The sqlite3 module uses the 'qmark' style, mysql.connector and psycopg
+    use the 'format' style.
+    """
+    return '?' if driver_name == 'sqlite3' else '%s'
+
+def execute_sql__cursor(sql_connection, driver_name, statement, parameters):
+    """
+    Execute an SQL statement with its parameters. Returns the cursor.
+
+    The first argument is the SQL connection, the second is the store name,
+    the third is the SQL statement, with a placeholder for each parameter,
+    and the fourth is the tuple of parameters. The statement is prepared by
+    the store once, and the plan is reused by every later statement with the
+    same text: PostgreSQL with prepare=True, MySQL through a prepared cursor
+    kept for each statement (see execute_sql__prepared_cursor()), and
+    SQLite3 through the statement cache of its connection. Hand the cursor
+    to execute_sql__close_cursor() once its rows are read.
+    """
+    if driver_name == 'postgres':
+        this_cursor = sql_connection.cursor()
+        this_cursor.execute(statement, parameters, prepare=True)
+    elif driver_name == 'mysql':
+        this_cursor, statement = execute_sql__prepared_cursor( \
+            sql_connection, statement)
+        this_cursor.execute(statement, parameters)
+    else:
+        this_cursor = sql_connection.cursor()
+        this_cursor.execute(statement, parameters)
+    return this_cursor
+
+def execute_sql__prepared_cursor(sql_connection, statement):
+    """
+    Find the prepared cursor of a MySQL statement. Returns 2 values.
+
+    The first argument is the MySQL connection, the second is the SQL
+    statement. The values returned are the cursor and the statement to
+    execute with it. mysql.connector prepares the statement on the server
+    the first time a prepared cursor executes it, and again whenever the
+    cursor is given another statement, so each connection keeps a cursor for
+    each of its SQL__PREPARED_STATEMENTS most recently used statements. The
+    cursors are kept on the connection, and closed along with it.
+    """
+    cursors = getattr(sql_connection, 'cindi_prepared_cursors', None)
+    if cursors is None:
+        cursors = collections.OrderedDict()
+        sql_connection.cindi_prepared_cursors = cursors
+    if statement in cursors:
+        cursors.move_to_end(statement)
+        return cursors[statement]
+
+    # the very same string is executed again, mysql.connector may compare by
+    # identity whether the statement changed
+    cursors[statement] = (sql_connection.cursor(prepared=True), statement)
+    if len(cursors) > SQL__PREPARED_STATEMENTS:
+        victim, unused = cursors.popitem(last=False)[1]
+        victim.close() # deallocates the statement on the server
+    return cursors[statement]
+
+def execute_sql__close_cursor(driver_name, this_cursor):
+    """
+    Close a cursor from execute_sql__cursor(). Returns void.
+
+    The prepared cursors of MySQL are kept open for the next statement with
+    the same text.
+    """
+    if driver_name != 'mysql':
+        this_cursor.close()
+
+def execute_sql(statements, stores, DEBUG_PREFIX, sql_connection=None):
     """
     Execute SQL statements. Returns a multi-dimensional list of query results.
 
-    The first argument should be a list of valid SQL strings. The second
+    The first argument should be a list of (statement, parameters) tuples, as
+    from convert_to_sql(). The second
     argument is the dictionary of connections created by initialize_stores().
     The third argument is very important, it's how this function determines
     which driver to use in stores, and is also used to print debug messages.
     See the DEBUG_PRINT_PREFIX variables in the constant declarations section
-    above.
+    above. The fourth optional argument is the connection of a group commit,
+    which the statements are evaluated on without committing them, see
+    group_commit_execute().
 
     Due to the homoiconicity of the various SQL implementations available in
     python, this function may be regarded as a generic function.
     """
     driver_name = DEBUG_PREFIX.split(">")[0].lower()
-    sql_connection = stores[driver_name]
+    log = LOG__STORES[driver_name]
+    group_commit = sql_connection is not None
+    if not group_commit:
+        sql_connection = stores[driver_name]
     results = []
-    for statement in statements:
-        print(DEBUG_PREFIX + statement)
-
-        this_cursor = sql_connection.cursor()
-        this_cursor.execute(statement)
-        print(DEBUG_PREFIX \
-              + "result row count " + str(this_cursor.rowcount))
+    metrics_count_commands(driver_name, \
+                           [statement.split(None, 1)[0] \
+                            for statement, parameters in statements])
+    for statement, parameters in statements:
+        log.debug(DEBUG_PREFIX + '%s -- %s', statement, parameters)
+
+        start = time.time_ns()
+        this_cursor = execute_sql__cursor(sql_connection, driver_name, \
+                                          statement, parameters)
+        log.debug(DEBUG_PREFIX + 'result row count %s', this_cursor.rowcount)
         
         # no .fetchAll() because that might slow us down...
         try:
             for row in this_cursor:
-                this_row_result = []
-                for column in row:
-                    if not isinstance(column, int):
-                        try:
-                            column = column.decode('ASCII')
-                        except AttributeError:
-                            column = column
-
-                    print(DEBUG_PREFIX + str(column))
-                    this_row_result.append(column)
+                this_row_result = execute_sql__decode_row(row, DEBUG_PREFIX)
+                log.log(LOG__TRACE, DEBUG_PREFIX + '%s', this_row_result)
                 if not is_list_all_nones(this_row_result):
                     results.append(this_row_result)
         
@@ -723,29 +1918,353 @@ def execute_sql(statements, stores, DEBUG_PREFIX):
         except:
             results = []
         
-        this_cursor.close()
-        sql_connection.commit()
+        execute_sql__close_cursor(driver_name, this_cursor)
+        if not group_commit:
+            sql_connection.commit()
+        trace_native(driver_name, [statement], start)
 
     return results
 
-# end generic SQL driver 
-# ------------------------------------------------------------------------------
-# begin MySQL driver 
-
-def execute_mysql(statement, stores):
+def execute_sql__decode_row(row, DEBUG_PREFIX):
     """
-    Run an INDI statement on a MySQL store. Returns a multi-dimensional list.
+    Convert a row from an SQL cursor to a list. Returns a list.
 
-    The first argument is the INDI statement as a string, the second is the
-    python dictionary of stores.
+    The first argument is the row as the driver returned it, the second is
+    the same as execute_sql(). Byte strings are decoded.
+    """
+    this_row_result = []
+    for column in row:
+        if not isinstance(column, int):
+            try:
+                column = column.decode('ASCII')
+            except AttributeError:
+                column = column
+
+        this_row_result.append(column)
+    return this_row_result
+
+def execute_sql__stream(statement, stores, DEBUG_PREFIX):
+    """
+    Read the rows of an INDI READ from an SQL store. Returns a generator.
+
+    The first argument is the INDI READ statement as a string (or
+    IndiStatement), the second and third are the same as execute_sql(). Each
+    row is the same as in the result of execute_sql(), and the rows are read
+    from the cursor STREAM__BATCH_SIZE at a time, so they are never all held
+    at once. PostgreSQL is read through a server-side (named) cursor, since
+    psycopg otherwise receives every row when the statement is executed.
+    """
+    driver_name = DEBUG_PREFIX.split(">")[0].lower()
+    sql_connection = stores[driver_name]
+    sql_statement, parameters = convert_to_sql(parse_indi(statement), \
+        convert_to_sql__placeholder(driver_name))[0]
+    flush_group_commit(driver_name) # the READ must see every write before it
+    log = LOG__STORES[driver_name]
+    log.debug(DEBUG_PREFIX + '%s -- %s', sql_statement, parameters)
+
+    # a stream is not read to its end before the next statement, so it has
+    # its own cursor rather than a kept one
+    if driver_name == 'postgres':
+        this_cursor = sql_connection.cursor(name='cindi_stream')
+    elif driver_name == 'mysql':
+        this_cursor = sql_connection.cursor(prepared=True)
+    else:
+        this_cursor = sql_connection.cursor()
+    try:
+        this_cursor.execute(sql_statement, parameters)
+        while True:
+            rows = this_cursor.fetchmany(STREAM__BATCH_SIZE)
+            if len(rows) == 0:
+                break
+            for row in rows:
+                this_row_result = execute_sql__decode_row(row, DEBUG_PREFIX)
+                log.log(LOG__TRACE, DEBUG_PREFIX + '%s', this_row_result)
+                if not is_list_all_nones(this_row_result):
+                    yield this_row_result
+        this_cursor.close()
+        sql_connection.commit()
+    except BaseException:
+        this_cursor.close()
+        sql_connection.rollback()
+        raise
+
+def execute_sql__indi(statement, stores, DEBUG_PREFIX):
+    """
+    Run an INDI statement on an SQL store. Returns a multi-dimensional list.
+
+    The first argument is the INDI statement as a string (or IndiStatement),
+    the second and third are the same as execute_sql(). A CREATE of many rows
+    is sent by execute_sql__bulk_insert(), anything else is converted by
+    convert_to_sql() and sent by execute_sql(), or by group_commit_execute()
+    when the 'sql_group_commit_seconds' setting is more than 0.
+    """
+    indi = parse_indi(statement)
+    if indi.verb == 'CREATE' and len(indi.rows) > 1:
+        return execute_sql__bulk_insert([indi], stores, DEBUG_PREFIX)
+    driver_name = DEBUG_PREFIX.split(">")[0].lower()
+    statements = convert_to_sql(indi, convert_to_sql__placeholder(driver_name))
+    if indi.verb == 'READ':
+        flush_group_commit(driver_name) # the READ must see every write
+    elif is_group_commit_enabled():
+        return group_commit_execute(driver_name, statements, stores, \
+                                    DEBUG_PREFIX)
+    return execute_sql(statements, stores, DEBUG_PREFIX)
+
+def execute_sql__bulk_insert(statements, stores, DEBUG_PREFIX):
+    """
+    Insert the rows of INDI CREATE statements into SQL. Returns an empty list.
+
+    The first argument is the list of IndiStatements, which must all be
+    CREATEs into the same INDI table with the same FIELDS. The second and
+    third arguments are the same as execute_sql().
+
+    The rows are sent with executemany(), SQL__BULK_BATCH_SIZE rows at a
+    time, and committed once at the end, so the store assigns their primary
+    keys in the order of the rows, and either every row is inserted or none.
+    """
+    driver_name = DEBUG_PREFIX.split(">")[0].lower()
+    sql_connection = stores[driver_name]
+    indi = statements[0]
+    placeholder = convert_to_sql__placeholder(driver_name)
+    # the rows are committed on their own, after the writes before them
+    flush_group_commit(driver_name)
+    rows = [row for this_indi in statements for row in this_indi.rows]
+    statement = 'INSERT INTO ' + indi.table \
+        + ' (' + convert_to_sql__fields_merger(indi.fields) + ')' \
+        + ' VALUES (' + ', '.join([placeholder] * len(indi.fields)) + ')'
+    LOG__STORES[driver_name].debug(DEBUG_PREFIX + '%s -- %s rows', \
+                                   statement, len(rows))
+
+    this_cursor = sql_connection.cursor()
+    try:
+        for i in range(0, len(rows), SQL__BULK_BATCH_SIZE):
+            metrics_count_commands(driver_name, ['INSERT'])
+            start = time.time_ns()
+            this_cursor.executemany(statement, \
+                                    rows[i:i + SQL__BULK_BATCH_SIZE])
+            trace_native(driver_name, [statement], start)
+        sql_connection.commit()
+    except BaseException:
+        sql_connection.rollback()
+        raise
+    finally:
+        this_cursor.close()
+
+    return []
+
+# a commit of MySQL or PostgreSQL is a round-trip to the store, and a commit of
+# SQLite3 syncs the disk, so with the 'sql_group_commit_seconds' setting more
+# than 0, the writes to an SQL store are evaluated on one connection of its
+# group commit, and committed together by the group's committer thread, once
+# the first of them has waited that long or once 'sql_group_commit_size' of
+# them are waiting. a commit ends a generation of the group. whoever wrote
+# waits (see hold_write_lock()) for the generation of its write to end, and
+# is given the error if its commit failed, so every write is only
+# acknowledged once it is durable.
+global_group_commits = {}
+global_group_commits_lock = threading.Lock()
+
+# the writes of another process are only seen once committed, so group
+# commits are turned off by prepare_for_worker_processes()
+global_group_commit_allowed = True
+
+def is_group_commit_enabled():
+    """
+    Check whether SQL writes are committed together. Returns a boolean.
+    """
+    return global_group_commit_allowed \
+        and global_settings['sql_group_commit_seconds'] > 0
+
+def get_group_commit(driver_name, stores):
+    """
+    Find the group commit of an SQL store. Returns a dictionary.
+
+    The first argument is the store name, the second is the stores
+    dictionary, whose 'info' is used to open the group's connection. The
+    group and its committer thread are started by the first write.
+    """
+    with global_group_commits_lock:
+        group = global_group_commits.get(driver_name)
+        if group is None:
+            group = {'driver_name': driver_name, 'conns': stores['info'], \
+                     'connection': None, 'condition': threading.Condition(), \
+                     'pending': 0, 'since': 0, 'generation': 0, \
+                     'failures': collections.OrderedDict()}
+            threading.Thread(target=group_commit_loop, args=(group,), \
+                             name='cindi-commit-' + driver_name, \
+                             daemon=True).start()
+            global_group_commits[driver_name] = group
+    return group
+
+def group_commit_loop(group):
+    """
+    Commit the writes of a group commit when they are due. Returns never.
+    """
+    with group['condition']:
+        while True:
+            if group['pending'] == 0:
+                group['condition'].wait()
+                continue
+            due = group['since'] + global_settings['sql_group_commit_seconds']
+            if time.monotonic() < due and group['pending'] \
+               < global_settings['sql_group_commit_size']:
+                group['condition'].wait(due - time.monotonic())
+                continue
+            group_commit_now(group)
+
+def group_commit_now(group):
+    """
+    Commit the writes of a group commit. Returns void.
+
+    The group's condition must be held. The generation of the writes ends
+    either way, see group_commit__end().
+    """
+    try:
+        group['connection'].commit()
+    except BaseException as err:
+        group_commit__end(group, err)
+    else:
+        group_commit__end(group)
+
+def group_commit__end(group, failure=None):
+    """
+    End the generation of a group commit. Returns void.
+
+    The first argument is the group, whose condition must be held, and the
+    second is the exception if its writes were not committed. Then the writes
+    are rolled back, the exception is kept for whoever waits on them, and the
+    connection is replaced if it is no longer usable.
+    """
+    if failure is not None:
+        LOG__STORES[group['driver_name']].error( \
+            group['driver_name'] + '> group commit of %s writes failed: %s', \
+            group['pending'], failure)
+        group['failures'][group['generation']] = failure
+        if len(group['failures']) > SQL__GROUP_COMMIT_FAILURES:
+            group['failures'].popitem(last=False)
+        connection = group['connection']
+        if connection is not None and (not is_store_connection_healthy( \
+                group['driver_name'], connection) or not \
+                group_commit__rollback(connection)):
+            close_store_connection(group['driver_name'], connection)
+            group['connection'] = None # opened again by the next write
+    group['pending'] = 0
+    group['generation'] += 1
+    group['condition'].notify_all()
+
+def group_commit__rollback(connection):
+    """
+    Roll back the writes of a failed group commit. Returns a boolean.
+    """
+    try:
+        connection.rollback()
+        return True
+    except BaseException:
+        return False
+
+def group_commit_execute(driver_name, statements, stores, DEBUG_PREFIX, \
+                         write=True):
+    """
+    Evaluate SQL statements in a group commit. Returns a list, as execute_sql().
+
+    The first argument is the store name, the second to fourth are the same
+    as execute_sql(). The fifth optional argument is False for statements
+    which only read, and see the writes not yet committed, such as
+    find_affected_primary_keys(). The writes are committed later, once the
+    store's group is due, so the caller must wait for them, see
+    group_commit_tickets(). If a statement fails, every write not yet
+    committed is rolled back, since PostgreSQL refuses the rest of a
+    transaction once a statement has failed.
+    """
+    group = get_group_commit(driver_name, stores)
+    with group['condition']:
+        if group['connection'] is None:
+            group['connection'] = connect_store(driver_name, group['conns'])
+        try:
+            result = execute_sql(statements, stores, DEBUG_PREFIX, \
+                                 group['connection'])
+        except BaseException as err:
+            group_commit__end(group, err)
+            raise
+        if write:
+            if group['pending'] == 0:
+                group['since'] = time.monotonic()
+            group['pending'] += 1
+            group['condition'].notify_all()
+        elif group['pending'] == 0:
+            # MySQL would otherwise keep reading the same snapshot
+            group['connection'].rollback()
+    return result
+
+def flush_group_commit(driver_name):
+    """
+    Commit the waiting writes of an SQL store now. Returns void.
+
+    Another connection only sees the writes once committed, so a READ
+    commits them first.
+    """
+    group = global_group_commits.get(driver_name)
+    if group is None:
+        return
+    with group['condition']:
+        if group['pending'] > 0:
+            group_commit_now(group)
+
+def group_commit_tickets():
+    """
+    Find the generations of the writes not yet committed. Returns a list.
+
+    Each ticket is a (group, generation) tuple, for wait_for_group_commit().
+    Taken while global_write_lock is held, the tickets include every write
+    evaluated meanwhile.
+    """
+    tickets = []
+    with global_group_commits_lock:
+        groups = list(global_group_commits.values())
+    for group in groups:
+        with group['condition']:
+            if group['pending'] > 0:
+                tickets.append((group, group['generation']))
+    return tickets
+
+def wait_for_group_commit(tickets):
+    """
+    Wait for the writes of group_commit_tickets() to commit. Returns void.
+
+    Raises BaseException if the writes of a ticket were not committed.
+    """
+    for group, generation in tickets:
+        with group['condition']:
+            while group['generation'] == generation:
+                group['condition'].wait()
+            failure = group['failures'].get(generation)
+        if failure is not None:
+            raise BaseException('Group commit failed on ' \
+                                + group['driver_name'] + ': ' \
+                                + str(failure)) from failure
+
+# end generic SQL driver 
+# ------------------------------------------------------------------------------
+# begin MySQL driver 
+
+def execute_mysql(statement, stores):
+    """
+    Run an INDI statement on a MySQL store. Returns a multi-dimensional list.
 
-    This function subcontracts nearly all the work to convert_to_sql and
-    execute_sql.
+    The first argument is the INDI statement as a string (or IndiStatement),
+    the second is the python dictionary of stores.
+
+    This function subcontracts nearly all the work to execute_sql__indi.
+    """
+    return execute_sql__indi(statement, stores, DEBUG_PRINT_PREFIX__MYSQL)
+
+def execute_mysql__stream(statement, stores):
+    """
+    Read the rows of an INDI READ from MySQL. Returns a generator.
+
+    See execute_sql__stream().
     """
-    converted_statements = convert_to_sql(statement)
-    return \
-        execute_sql(converted_statements, stores, \
-                             DEBUG_PRINT_PREFIX__MYSQL)
+    return execute_sql__stream(statement, stores, DEBUG_PRINT_PREFIX__MYSQL)
 
 # end MySQL driver
 # ------------------------------------------------------------------------------
@@ -756,16 +2275,20 @@ def execute_postgres(statement, stores):
     """
     Run an INDI statement on a PostgreSQL store. Returns multi-dimensional list.
 
-    The first argument is the INDI statement as a string, the second is the
-    python dictionary of stores.
+    The first argument is the INDI statement as a string (or IndiStatement),
+    the second is the python dictionary of stores.
+
+    This function subcontracts nearly all the work to execute_sql__indi.
+    """
+    return execute_sql__indi(statement, stores, DEBUG_PRINT_PREFIX__POSTGRES)
+
+def execute_postgres__stream(statement, stores):
+    """
+    Read the rows of an INDI READ from PostgreSQL. Returns a generator.
 
-    This function subcontracts nearly all the work to convert_to_sql and
-    execute_sql.
+    See execute_sql__stream().
     """
-    converted_statements = convert_to_sql(statement)
-    return \
-        execute_sql(converted_statements, stores, \
-                               DEBUG_PRINT_PREFIX__POSTGRES)
+    return execute_sql__stream(statement, stores, DEBUG_PRINT_PREFIX__POSTGRES)
 
 # end PostgreSQL driver
 # ------------------------------------------------------------------------------
@@ -775,20 +2298,97 @@ def execute_sqlite3(statement, stores):
     """
     run an INDI statement on a Sqlite3 store. Returns a multi-dimensional list.
 
-    The first argument is the INDI statement as a string, the second is the
-    python dictionary of stores.
+    The first argument is the INDI statement as a string (or IndiStatement),
+    the second is the python dictionary of stores.
+
+    This function subcontracts nearly all the work to execute_sql__indi.
+    """
+    return execute_sql__indi(statement, stores, DEBUG_PRINT_PREFIX__SQLITE3)
+
+def execute_sqlite3__stream(statement, stores):
+    """
+    Read the rows of an INDI READ from Sqlite3. Returns a generator.
 
-    This function subcontracts nearly all the work to convert_to_sql and
-    execute_sql.
+    See execute_sql__stream().
     """
-    converted_statements = convert_to_sql(statement)
-    return \
-        execute_sql(converted_statements, stores, \
-                               DEBUG_PRINT_PREFIX__SQLITE3)
+    return execute_sql__stream(statement, stores, DEBUG_PRINT_PREFIX__SQLITE3)
 
 # end sqlite3 driver
 # ------------------------------------------------------------------------------
 # begin MongoDB driver
+# with the default 'cell' layout, each cell is one document of the 'objects'
+# collection, {'id': <pk as a string>, 'group': <table>, 'field', 'value'},
+# and each row has an 'id' cell. with 'layout': 'row' under 'mongodb' in
+# stores.txt, each row is instead one document of the 'rows' collection,
+# {'group': <table>, 'id': <pk as an int>, 'fields': {<field>: <value>}},
+# so a statement is one find(), update_many() or delete_many(). the 'rows'
+# collection has a unique index on (group, id), and an index on
+# (group, fields.<field>) for each field searched by. the next primary key
+# of each table is in the 'objects_pk' collection, for both layouts.
+# migrate_mongo_to_row_layout() converts a table between them.
+
+def convert_to_mongo__layout(stores):
+    """
+    Find which layout the mongodb store uses. Returns a string.
+
+    The argument is the stores dictionary. The result is one of MONGO__LAYOUTS.
+    """
+    return stores['info']['mongodb'].get('layout', 'cell')
+
+# the indexes which this process has already made sure of, as (database name,
+# field) tuples, the field is None for the index of the 'objects_pk' counters
+global_mongo_indexes = set()
+
+def convert_to_mongo__ensure_indexes(db, fields):
+    """
+    Create the indexes of the 'row' layout, if needed. Returns void.
+
+    The first argument is the mongo database object, the second is a list of
+    fields. For 'id' the index is the unique one on (group, id), and for any
+    other field it is the one on (group, fields.<field>). Each index is only
+    asked for once per process, and create_index() does nothing if the index
+    already exists, so the first statement to search by a field builds it.
+
+    The unique index on the primary key counters of 'objects_pk' is always
+    made sure of, both layouts count primary keys there.
+    """
+    if not (db.name, None) in global_mongo_indexes:
+        # one counter per group, see convert_to_mongo__create_new_pks()
+        db.objects_pk.create_index([('group', ASCENDING), \
+                                    ('primary-key-object', ASCENDING)], \
+                                   unique=True)
+        global_mongo_indexes.add((db.name, None))
+
+    for field in fields:
+        if (db.name, field) in global_mongo_indexes:
+            continue
+        if field == 'id':
+            db.rows.create_index([('group', ASCENDING), ('id', ASCENDING)], \
+                                 unique=True)
+        else:
+            db.rows.create_index([('group', ASCENDING), \
+                                  ('fields.' + field, ASCENDING)])
+        global_mongo_indexes.add((db.name, field))
+
+def convert_to_mongo__row_filter(db, group_name, search_by_field=None, \
+                                 search_by_value=None):
+    """
+    Compose the filter of the documents of some rows. Returns a dictionary.
+
+    The first argument is the mongo database object, the second is the group
+    (INDI table) name, and the optional third and fourth are the field and
+    value to search by, every row of the group is matched without them. The
+    filter is for the 'row' layout, and the field searched by is indexed.
+    """
+    query = {'group': group_name}
+    if search_by_field is None:
+        return query
+    convert_to_mongo__ensure_indexes(db, [search_by_field])
+    if search_by_field == 'id':
+        query['id'] = try_int(search_by_value)
+    else:
+        query['fields.' + search_by_field] = search_by_value
+    return query
 
 # returns the next primary key to be used, which is an integer
 # (so, if you are wondering what the 'highest used' pk is, then subtract one.)
@@ -815,32 +2415,42 @@ def convert_to_mongo__get_next_pk(db, group_name):
         return 1
 
 # this will mutate 'next_pk' in the database to increment by 1
-def convert_to_mongo__create_new_pk(db, c_array):
+def convert_to_mongo__create_new_pk(db, indi):
     """
     Increment the INDI table pk by one. Returns an integer.
 
     The first argument is the mongo database object. The second argument is the
-    tokenized INDI statement.
+    parsed INDI statement, an IndiStatement from parse_indi().
     """
-    objects_pk = db.objects_pk
-    group_name = c_array[2]
+    # things are easier during queries if this is a string
+    return str(convert_to_mongo__create_new_pks(db, indi.table, 1))
 
-    next_pk = convert_to_mongo__get_next_pk(db, group_name)
+def convert_to_mongo__create_new_pks(db, group_name, quantity):
+    """
+    Increment the INDI table pk by quantity. Returns the first one, an integer.
 
-    # increment the next_pk by 1, could have used $inc maybe?
-    db.objects_pk.bulk_write([UpdateOne( \
-                                    {'group': group_name, \
-                                     'primary-key-object': True}, \
-                                    {'$set': \
-                                     { 'next_pk': (next_pk + 1)}}, \
-                                       upsert=True)])
+    The first argument is the mongo database object, the second is the group
+    (INDI table) name, and the third is how many primary keys to allocate.
 
-    # things are easier during queries if this is a string
-    return str(next_pk)
+    The counter is moved and read back by one find_one_and_update(), which
+    is atomic, so concurrent CREATEs are never given the same primary keys.
+    The first CREATE into a group creates the counter in the same update, as
+    if it had been at 1, and the unique index on the counters (see
+    convert_to_mongo__ensure_indexes()) keeps concurrent first CREATEs from
+    creating two of them.
+    """
+    convert_to_mongo__ensure_indexes(db, [])
+    after = db.objects_pk.find_one_and_update( \
+        {'group': group_name, 'primary-key-object': True}, \
+        [{'$set': {'next_pk': \
+                   {'$add': [{'$ifNull': ['$next_pk', 1]}, quantity]}}}], \
+        upsert=True, return_document=ReturnDocument.AFTER)
+    return after['next_pk'] - quantity
 
 # added group_name, it might have broke it.
 def convert_to_mongo__find_primary_keys(\
-        db, group_name, search_by_field, search_by_value, return_ints=False):
+        db, group_name, search_by_field, search_by_value, return_ints=False, \
+        layout='cell'):
     """
     Find the primary keys associated with a field/value pair. Returns a list.
 
@@ -849,11 +2459,20 @@ def convert_to_mongo__find_primary_keys(\
     string containing the field to search by. The fourth argument is the value
     to search by. The fifth optional argument specifies whether or not to
     cast the results to integers befor appending to the result list, which
-    is False by default.
+    is False by default. The sixth optional argument is the layout of the
+    mongodb store.
     """
     objects = db.objects
     results = []
 
+    if layout == 'row':
+        for document in db.rows.find(convert_to_mongo__row_filter( \
+                db, group_name, search_by_field, search_by_value), \
+                {'_id': False, 'id': True}).sort('id', ASCENDING):
+            results.append(document['id'] if return_ints \
+                           else str(document['id']))
+        return results
+
     for row in objects.find({
             'group': group_name, \
             'field': search_by_field, \
@@ -874,99 +2493,37 @@ def convert_to_mongo(c, stores):
     The author accidentally wrote the entire process in this function, and the
     parent execute_mongo doesn't do much besides filter out results from
     CREATE/UPDATE/DELETE 
+
+    The first argument is the INDI statement, as a string or an IndiStatement
+    from parse_indi(). The second argument is the stores dictionary.
     """
     schema = stores['info']['mongodb']['db']
     results = []
-    c_array = c.split()
+    indi = parse_indi(c)
     
     db = stores['mongodb'][schema]
     objects = db.objects
-    group_name = c_array[2] # group_name is the 'table' (in SQL terms)
+    group_name = indi.table # group_name is the 'table' (in SQL terms)
+    layout = convert_to_mongo__layout(stores)
 
-    if c_array[0].upper() == 'READ':
-        fields_requested = get_indi_fields(c)
-        if c_array[3].upper() == 'ALL' and c_array[4].upper() == 'RECORDS':
-            matching_keys = range(1, \
-                                  convert_to_mongo__get_next_pk(db, group_name))
-        
-        # query for a specific value in a specific field
-        else:
-            group_name = c_array[2]
-            query_by_field = c_array[3]
-            query_by_value = get_indi_query(c)
-
-            # clean out any single or double quotes from the user
-#            if c.find("\"") > -1 and c.find("\"") < c.find('FIELDS'):
-#                query_by_value = c.split("\"")[1]
-#            elif c.find("\'") > -1 and c.find("\'") < c.find('FIELDS'):
-#                query_by_value = c.split("\'")[1]
-
-            # added group_name, it might have broke it
-            matching_keys = \
-                convert_to_mongo__find_primary_keys(\
-                    db, group_name, query_by_field, query_by_value)
-
-        for pk_index in matching_keys:
-            this_result = []
-            cursor = objects.find({'group': group_name, 'id': str(pk_index)})
-            for field in fields_requested:
-                this_start_length = len(this_result)
-                cursor.rewind() # recycling cursor for each field
-                for record in cursor:
-                    if record['field'] == field:
-                        this_result.append(try_int(record['value']))
-                # if the field's value was null, so to say...
-                if this_start_length == len(this_result):
-                    this_result.append(None)
-            # if a 'row' was hit, which had been previously deleted....
-            if len(this_result) > 0 and not is_list_all_nones(this_result):
-                results.append(this_result)
-
-    elif c_array[0].upper() == 'CREATE':
-        new_pk = convert_to_mongo__create_new_pk(db, c_array)
-        field_value_pairs = [('id', new_pk)]
-        for key_value_tuple in pairlis( \
-                                 get_indi_fields(c), \
-                                 get_indi_values(c)):
-            print(DEBUG_PRINT_PREFIX__MONGO \
-                  + "mongo queuing for insertion " + str(key_value_tuple))
-            field_value_pairs.append(key_value_tuple)
-
-        # both storing the id as a 'field', and,
-        # storing the id as a mongo field, is synonymous with
-        # what the redis driver does...
-        # (...it does things like `db0-nonsense_1_id`, that key would
-        # hold the value '1', even though the value is in the key name
-        
-        for field_value_pair in field_value_pairs:
-            print(DEBUG_PRINT_PREFIX__MONGO \
-                  + "mongo collection insertion " + str(field_value_pair))
-            results.append( \
-                        db.objects.bulk_write([ \
-                            InsertOne( \
-                                       { \
-                                         'id': new_pk, \
-                                         'group': group_name, \
-                                         'field': field_value_pair[0], \
-                                         'value': field_value_pair[1] })]))
-
-    elif c_array[0].upper() == 'UPDATE':
-        group_name = c_array[2]
-        field_to_search = c_array[3]
-        value_of_field_to_search = get_indi_query(c)
-
-        # clean out any single or double quotes from the user
-#        if c.find("\"") > -1 and c.find("\"") < c.find('FIELDS'):
-#            value_of_field_to_search = c.split("\"")[1]
-#        elif c.find("\'") > -1 and c.find("\'") < c.find('FIELDS'):
-#            value_of_field_to_search = c.split("\'")[1]
-
-        print(DEBUG_PRINT_PREFIX__MONGO + " UPDATE by " \
-              + value_of_field_to_search)
+    if indi.verb == 'READ':
+        results = list(convert_to_mongo__read_rows(db, indi, layout))
+
+    elif indi.verb == 'CREATE':
+        # the same for one row as for many, and for either layout
+        results = convert_to_mongo__bulk_create([indi], stores)
+
+    elif layout == 'row':
+        results = convert_to_mongo__row_layout(db, indi)
+
+    elif indi.verb == 'UPDATE':
+        field_to_search = indi.field
+        value_of_field_to_search = indi.value
+
+        LOG__MONGO.debug(DEBUG_PRINT_PREFIX__MONGO + 'UPDATE by %s', \
+                         value_of_field_to_search)
         
-        field_value_pairs = pairlis( \
-                                   get_indi_fields(c), \
-                                   get_indi_values(c))
+        field_value_pairs = pairlis(indi.fields, indi.values)
 
         if field_to_search == 'id':
             pk_list = [ value_of_field_to_search ]
@@ -976,10 +2533,10 @@ def convert_to_mongo(c, stores):
 
         # need upsert=True or else None fields will stay None!
         for pk in pk_list:
-            print(DEBUG_PRINT_PREFIX__MONGO + "UPDATE pk " + pk)
+            LOG__MONGO.debug(DEBUG_PRINT_PREFIX__MONGO + 'UPDATE pk %s', pk)
             for field_value_pair in field_value_pairs:
-                print(DEBUG_PRINT_PREFIX__MONGO + " pair " \
-                      + str(field_value_pair))
+                LOG__MONGO.log(LOG__TRACE, DEBUG_PRINT_PREFIX__MONGO \
+                               + 'pair %s', field_value_pair)
                 results.append( \
                     db.objects.bulk_write([ \
                         UpdateOne( \
@@ -989,10 +2546,10 @@ def convert_to_mongo(c, stores):
                             { '$set': \
                               { 'value': field_value_pair[1] }}, upsert=True)]))
                     
-    elif c_array[0].upper() == 'DELETE':
+    elif indi.verb == 'DELETE':
         # need to find primary key of the entry and delete all records
-        field_to_search = c_array[3]
-        value_of_field_to_search = get_indi_query(c)
+        field_to_search = indi.field
+        value_of_field_to_search = indi.value
 
         # if the primary key was the query, then delete just that 'row'
         if field_to_search == 'id':
@@ -1001,17 +2558,178 @@ def convert_to_mongo(c, stores):
                             DeleteMany({ \
                                 'id': value_of_field_to_search, \
                                 'group': group_name })]))
-        # if the query was anything else, there could be multiple rows
+        # if the query was anything else, there could be multiple rows, and
+        # every cell of each of them must go, not just the matching ones
         else:
+            pk_list = convert_to_mongo__find_primary_keys( \
+                db, group_name, field_to_search, value_of_field_to_search)
             results.append( \
                         db.objects.bulk_write([ \
                             DeleteMany({ \
                                 'group': group_name, \
-                                'field': field_to_search, \
-                                'value': value_of_field_to_search })]))
+                                'id': { '$in': pk_list }})]))
 
     return results
 
+def convert_to_mongo__row_layout(db, indi):
+    """
+    Evaluate an INDI UPDATE or DELETE in the 'row' layout. Returns a list.
+
+    The first argument is the mongo database object, the second is the
+    IndiStatement. Every row matched by the predicate is changed by one
+    update_many(), or removed by one delete_many().
+    """
+    query = convert_to_mongo__row_filter(db, indi.table, indi.field, \
+                                         indi.value)
+    if indi.verb == 'UPDATE':
+        changes = {}
+        for field, value in pairlis(indi.fields, indi.values):
+            changes['fields.' + field] = value
+        return [db.rows.update_many(query, {'$set': changes})]
+    return [db.rows.delete_many(query)]
+
+def convert_to_mongo__read_rows(db, indi, layout='cell'):
+    """
+    Read the rows of an INDI READ from MongoDB. Returns a generator.
+
+    The first argument is the mongo database object, the second is the
+    IndiStatement, and the optional third is the layout of the mongodb
+    store. Each row is read when the generator reaches it, in the order of
+    the primary keys, and a page of a READ stops once it is full.
+    """
+    if layout == 'row':
+        return convert_to_mongo__read_documents(db, indi)
+
+    group_name = indi.table
+    if indi.all_records:
+        matching_keys = range((indi.after or 0) + 1, \
+                              convert_to_mongo__get_next_pk(db, group_name))
+
+    # query for a specific value in a specific field
+    else:
+        query_by_field = indi.field
+        query_by_value = indi.value
+
+        # added group_name, it might have broke it
+        matching_keys = sorted(convert_to_mongo__find_primary_keys(\
+            db, group_name, query_by_field, query_by_value), key=int)
+        if indi.after is not None:
+            matching_keys = [pk for pk in matching_keys \
+                             if int(pk) > indi.after]
+
+    return page_indi_rows(indi, convert_to_mongo__read_pks( \
+        db, group_name, matching_keys, indi.fields))
+
+def convert_to_mongo__read_documents(db, indi):
+    """
+    Read the rows of an INDI READ from the 'row' layout. Returns a generator.
+
+    The first argument is the mongo database object, the second is the
+    IndiStatement. The rows are read with one find(), sorted by primary key,
+    and only the FIELDS are sent back. Like the SQL stores, the query leaves
+    out the rows which hold none of the FIELDS, so that MongoDB itself skips
+    and limits the rows of a page.
+    """
+    if indi.limit == 0: # to MongoDB, a limit of 0 is no limit at all
+        return
+    query = convert_to_mongo__row_filter(db, indi.table, indi.field, \
+                                         indi.value)
+    if indi.after is not None and 'id' in query:
+        query['id'] = {'$eq': query['id'], '$gt': indi.after}
+    elif indi.after is not None:
+        query['id'] = {'$gt': indi.after}
+    if not 'id' in indi.fields:
+        query['$or'] = [{'fields.' + field: {'$ne': None}} \
+                        for field in indi.fields]
+    projection = {'_id': False, 'id': True}
+    for field in indi.fields:
+        if field != 'id':
+            projection['fields.' + field] = True
+
+    cursor = db.rows.find(query, projection).sort('id', ASCENDING) \
+        .skip(indi.offset or 0).batch_size(STREAM__BATCH_SIZE)
+    if indi.limit is not None:
+        cursor = cursor.limit(indi.limit)
+    try:
+        for document in cursor:
+            values = document.get('fields', {})
+            yield [document['id'] if field == 'id' \
+                   else try_int(values.get(field)) for field in indi.fields]
+    finally:
+        cursor.close()
+
+def convert_to_mongo__read_pks(db, group_name, matching_keys, \
+                               fields_requested):
+    """
+    Read rows of an INDI table from MongoDB by pk. Returns a generator.
+
+    The first argument is the mongo database object, the second is the group
+    (INDI table) name, the third is the primary keys of the rows, and the
+    fourth is the FIELDS to read. The rows which hold none of the FIELDS
+    are left out.
+    """
+    objects = db.objects
+    for pk_index in matching_keys:
+        this_result = []
+        cursor = objects.find({'group': group_name, 'id': str(pk_index)})
+        for field in fields_requested:
+            this_start_length = len(this_result)
+            cursor.rewind() # recycling cursor for each field
+            for record in cursor:
+                if record['field'] == field:
+                    this_result.append(try_int(record['value']))
+            # if the field's value was null, so to say...
+            if this_start_length == len(this_result):
+                this_result.append(None)
+        # if a 'row' was hit, which had been previously deleted....
+        if len(this_result) > 0 and not is_list_all_nones(this_result):
+            yield this_result
+
+def convert_to_mongo__bulk_create(statements, stores):
+    """
+    Insert the rows of INDI CREATE statements into MongoDB. Returns a list.
+
+    The first argument is the list of IndiStatements, which must all be
+    CREATEs into the same INDI table, the second is the stores dictionary.
+    The primary keys of every row of every statement are allocated as one
+    block, with one update, and every document of every row is inserted with
+    one insert_many(). In the 'row' layout, each row is one document.
+    """
+    schema = stores['info']['mongodb']['db']
+    db = stores['mongodb'][schema]
+    group_name = statements[0].table
+    rows = [(indi.fields, row) for indi in statements for row in indi.rows]
+    layout = convert_to_mongo__layout(stores)
+    documents = []
+
+    # both storing the id as a 'field', and,
+    # storing the id as a mongo field, is synonymous with
+    # what the redis driver does...
+    first_new_pk = convert_to_mongo__create_new_pks(db, group_name, \
+                                                    len(rows))
+    for this_new_pk, (fields, values) in enumerate(rows, first_new_pk):
+        if layout == 'row':
+            documents.append({ 'group': group_name, \
+                               'id': this_new_pk, \
+                               'fields': dict(pairlis(fields, values)) })
+            continue
+        new_pk = str(this_new_pk)
+        for field, value in [('id', new_pk)] + pairlis(fields, values):
+            documents.append({ 'id': new_pk, \
+                               'group': group_name, \
+                               'field': field, \
+                               'value': value })
+
+    LOG__MONGO.debug(DEBUG_PRINT_PREFIX__MONGO + 'mongo collection ' \
+                     + 'insertion of %s documents', len(documents))
+    if len(documents) > 0 and layout == 'row':
+        convert_to_mongo__ensure_indexes(db, ['id'])
+        db.rows.insert_many(documents)
+    elif len(documents) > 0:
+        db.objects.insert_many(documents)
+
+    return []
+
 def execute_mongo(c, stores):
     """
     Evaluate the INDI statement into MongoDB. Returns a list.
@@ -1031,281 +2749,2137 @@ def execute_mongo(c, stores):
     change wouldn't be visible to the user anyway, and would only improve on
     code readability.
     """
-    c_array = c.split()
-    op_results = convert_to_mongo(c, stores)
+    indi = parse_indi(c)
+    op_results = convert_to_mongo(indi, stores)
     
-    if not c_array[0].upper() == 'READ':
+    if not indi.verb == 'READ':
         return []
     
     return op_results
 
+def execute_mongo__stream(c, stores):
+    """
+    Read the rows of an INDI READ from MongoDB. Returns a generator.
+
+    The arguments are the same as execute_mongo(), and each row is the same
+    as in its result.
+    """
+    schema = stores['info']['mongodb']['db']
+    return convert_to_mongo__read_rows(stores['mongodb'][schema], \
+                                       parse_indi(c), \
+                                       convert_to_mongo__layout(stores))
+
+def migrate_mongo_to_row_layout(stores, table_name):
+    """
+    Move an INDI table from the 'cell' to the 'row' layout. Returns an int.
+
+    The first argument is the stores dictionary, the second is the INDI table
+    name. The result is the quantity of rows which were moved.
+
+    The cells of each batch of rows are read with one find(), each row is
+    written as one document with an upsert, and then the cells are deleted,
+    so a migration which was interrupted may simply be run again. Nothing
+    should write to the table while it is migrated. Once every table in
+    tables.txt is migrated, set 'layout' to 'row' under 'mongodb' in
+    stores.txt. Migrating a table again moves nothing.
+    """
+    schema = stores['info']['mongodb']['db']
+    db = stores['mongodb'][schema]
+    convert_to_mongo__ensure_indexes(db, ['id'])
+    primary_keys = sorted(db.objects.distinct('id', {'group': table_name}), \
+                          key=int)
+
+    for i in range(0, len(primary_keys), MONGO__BATCH_SIZE):
+        these_pks = primary_keys[i:i + MONGO__BATCH_SIZE]
+        rows = {}
+        for cell in db.objects.find({'group': table_name, \
+                                     'id': {'$in': these_pks}}):
+            fields = rows.setdefault(cell['id'], {})
+            if cell['field'] != 'id':
+                fields[cell['field']] = cell['value']
+
+        db.rows.bulk_write([ReplaceOne( \
+            {'group': table_name, 'id': int(pk)}, \
+            {'group': table_name, 'id': int(pk), 'fields': fields}, \
+            upsert=True) for pk, fields in rows.items()])
+        db.objects.delete_many({'group': table_name, \
+                                'id': {'$in': these_pks}})
+
+    LOG__MONGO.info(DEBUG_PRINT_PREFIX__MONGO + 'moved %s rows of table %s ' \
+                    + 'to the row layout', len(primary_keys), table_name)
+    return len(primary_keys)
+
 # end MongoDB driver
 # ------------------------------------------------------------------------------
-# begin higher-order domain-specific functions
+# begin READ cache section
+# each INDI table has its own cache partition, a dictionary with:
+#   'table'       : the INDI table name
+#   'entries'     : cache key -> entry, least recently used first
+#   'by_pk'       : primary key -> set of cache keys depending on it
+#   'all_records' : set of cache keys of ALL RECORDS reads
+#   'by_predicate': predicate (the first 3 items of a cache key) -> its keys
+#   'bytes'       : the estimated size of every cached READ result
+#   'stats'       : counters, see get_cache_stats()
+#   'settings'    : the 'cache_...' settings from settings.txt
+#   'epoch'       : counts the writes to the table, see below
+#   'shared_epoch': None, or where other processes count writes to the table
+#   'budget'      : shared by every partition, see below
+#   'lock'        : guards all of the above, except the budget
+# so that a write only visits the cached READs it affects, and a busy table
+# never holds the lock of another table. each entry is a dictionary of
+# 'pks', 'result', 'bytes', 'hits', 'used' and 'expires'.
+#
+# a cache key is made by cache_key() from the parsed READ, so the spacing,
+# quoting and keyword case of the statement string do not matter.
+#
+# the budget holds the 'entries' and 'bytes' of all partitions together,
+# the list of 'partitions', and its own 'lock', which is only ever taken
+# while holding (at most) one partition lock.
+#
+# a READ result is not cached if the table was written to while it was being
+# read. once share_cache_between_processes() has been called, the epoch is
+# also kept in shared memory, and a partition which finds that another
+# process has written to its table forgets all of its cached READs.
 
-def execute_indi(statement, stores=None, which_store='all'):
+def cache_epoch(partition):
     """
-    Execute an INDI statement on the stores. Returns a multidimensional list.
+    Find how many writes a cache partition has seen. Returns an integer.
+    """
+    with partition['lock']:
+        cache_check_epoch(partition)
+        return partition['epoch']
 
-    First argument is the INDI statement. Second argument is the dictionary of
-    stores, generated by initialize_stores(). Third argument is which store to
-    apply the effect to.
+def cache_check_epoch(partition):
+    """
+    Forget the cached READs if another process wrote to the table. Returns void.
+    """
+    if partition['shared_epoch'] is None:
+        return
+    epochs, epochs_lock, i = partition['shared_epoch']
+    with partition['lock']:
+        if epochs[i] == partition['epoch']:
+            return
+        for key in list(partition['entries'].keys()):
+            if cache_forget(partition, key):
+                partition['stats']['invalidations'] += 1
+        partition['epoch'] = epochs[i]
+
+def cache_next_epoch(partition):
+    """
+    Count one more write to a cache partition's table. Returns void.
+    """
+    with partition['lock']:
+        if partition['shared_epoch'] is None:
+            partition['epoch'] += 1
+            return
+        epochs, epochs_lock, i = partition['shared_epoch']
+        with epochs_lock:
+            epochs[i] += 1
+            # if another process wrote first, cache_check_epoch() must notice
+            if epochs[i] == partition['epoch'] + 1:
+                partition['epoch'] = epochs[i]
+
+def share_cache_between_processes(caches, epochs_lock=None):
+    """
+    Keep the caches coherent across forked processes. Returns void.
 
-    Default second argument is None, and it will initialize the stores for
-    the user. Default third argument is 'all', which means to evaluate against
-    all stores if desired.
+    The first argument is the caches dictionary from initialize_cache(). This
+    must be called before forking, each process then keeps its own cached
+    READs, but a write in any process invalidates the table in every process.
+    The optional second argument is the lock held while counting a write, by
+    default a new multiprocessing.Lock().
+    """
+    epochs = multiprocessing.RawArray('q', len(caches))
+    if epochs_lock is None:
+        epochs_lock = multiprocessing.Lock()
+    for i, partition in enumerate(caches.values()):
+        with partition['lock']:
+            epochs[i] = partition['epoch']
+            partition['shared_epoch'] = (epochs, epochs_lock, i)
+
+def cache_sizeof(result):
+    """
+    Estimate the memory held by a READ result. Returns an integer of bytes.
+    """
+    size = sys.getsizeof(result)
+    if isinstance(result, (list, tuple)):
+        for x in result:
+            size += cache_sizeof(x)
+    return size
 
-    This system may be used against just one store if so desired, so that's why
-    it's possible to specify which_store to use. But, if the system is used
-    this way, it is not possible to go back to using 'all' stores without
-    manually executing past CREATE/UPDATE/DELETE statements against the
-    remaining stores. Else, the system will throw AssertionErrors.
+def cache_key(c):
     """
-    result = []
-    stores_was_none = False
-    if which_store.lower() == 'all':
-        # first, record the INDI statement to logs/, if is a DML/DQL statement
-        if not statement.split()[0] == 'READ':
-            fprint(statement, 'indi')
-        # second, begin evaluating the statement through each active store
-        for k in stores.keys():
-            if k.lower() == 'info':
-                continue
-            else:
-                result.append(execute_indi(statement, stores, k))
-    else:
-        # user is probably not invoking execute_indi with a None store
-        if stores == None: # but just in case...
-            stores = initialize_stores() # (user probably called quick_cindi)
-            stores_was_none = True
-        
-        if which_store.lower() == 'mysql':
-            result.append(execute_mysql(statement, stores))
-        elif which_store.lower() == 'redis':
-            result.append(execute_redis(statement, stores))
-        elif which_store.lower() == 'postgres':
-            result.append(execute_postgres(statement, stores))
-        elif which_store.lower() == 'mongodb':
-            result.append(execute_mongo(statement, stores))
-        elif which_store.lower() == 'sqlite3':
-            result.append(execute_sqlite3(statement, stores))
-        else:
-            result.append('invalid store specified in execute_indi()')
+    Compose the cache key of an INDI READ statement. Returns a tuple.
 
-    # this is a good time to check if any of the data stores are corrupted
-    if which_store.lower() == 'all' and not is_all_list_elements_equal(result):
-        print("execute_indi> result before AssertionError:\n")
-        print_3d_list(result)
-        raise AssertionError(\
-            "A result from one store is not like the others.")
-    elif which_store.lower() == 'all':
-        # verified that all stores returned the same data, so return one copy
-        result = result[0]
+    The argument is the INDI statement (a string, or an IndiStatement). The
+    key is (all_records, field, value, fields, after, limit, offset), the
+    table is implied by the cache partition, so each page of a READ is cached
+    on its own. Statements which only differ in white space, quoting or
+    keyword case have the same key.
+    """
+    indi = parse_indi(c)
+    return (indi.all_records, indi.field, indi.value, indi.fields, \
+            indi.after, indi.limit, indi.offset)
 
-    # if this function initialized the stores, then close them.
-    if stores_was_none:
-        close_stores(stores)
-    
-    return result
+def cache_project(result, from_fields, to_fields):
+    """
+    Select some FIELDS of a cached READ result. Returns a new READ result.
 
-# figure out which primary 'id' keys are affected by a statement
-# must not pass a None stores!
-def find_affected_primary_keys(statement, stores, which_store='all'):
+    The first argument is the READ result, the second is the FIELDS it was
+    read with, and the third is the FIELDS to select (each of which must be
+    in the second). Like every store, rows in which every selected field is
+    None are left out.
     """
-    Find the primary keys related to an INDI statement. Returns a list.
+    columns = [from_fields.index(field) for field in to_fields]
+    projected = []
+    for rows in result:
+        these_rows = []
+        for row in rows:
+            this_row = [row[i] for i in columns]
+            if not is_list_all_nones(this_row):
+                these_rows.append(this_row)
+        projected.append(these_rows)
+    return projected
+
+def cache_choose_victim(partition):
+    """
+    Choose which cached READ of a partition to evict next. Returns a key.
+
+    The result is None if the partition is empty.
+    """
+    entries = partition['entries']
+    if len(entries) == 0:
+        return None
+    if partition['settings']['cache_policy'] == 'lfu' and len(entries) > 1:
+        # the most recently used is left out, it may be the READ just cached,
+        # which has not had the chance to be used yet
+        candidates = itertools.islice(entries, \
+                                      min(CACHE__LFU_CANDIDATES, \
+                                          len(entries) - 1))
+        return min(candidates, key=lambda k: entries[k]['hits'])
+    return next(iter(entries))
+
+def cache_get__entry(partition, key):
+    """
+    Find a cached READ which has not expired. Returns an entry, or None.
+    """
+    entry = partition['entries'].get(key)
+    if entry is not None and entry['expires'] is not None \
+       and entry['expires'] <= time.monotonic():
+        cache_forget(partition, key)
+        partition['stats']['expirations'] += 1
+        entry = None
+    return entry
+
+def cache_get(partition, key, peek=False):
+    """
+    Look up a cached READ result. Returns the result, or None on a miss.
 
-    The first argument is an INDI statement (string), the second argument is
-    a dictionary containing the stores (from initialize_stores()), and the
-    third optional argument is which store to check.
+    The first argument is the table's cache partition, the second is the
+    cache key. If the optional third argument is True, then the look-up is
+    not counted in the stats and does not make the entry any more recently
+    or frequently used.
 
-    This system may be used against just one store if so desired, so that's
-    why it's possible to specify which_store to use. But, if the system is
-    used this way, it is not possible to go back to using 'all' stores without
-    manually executing past CREATE/UPDATE/DELETE statements against the
-    remaining stores. Else, the system will throw AssertionErrors.
+    If the key itself is not cached, but a READ with the same predicate and
+    more FIELDS is, then the result is selected from that READ instead. This
+    is not done for a page, since which rows are in a page depends on its
+    FIELDS.
     """
-    result = []
-    
-    if which_store.lower() == 'all':
-        for k in stores.keys():
-            if k.lower() == 'info':
-                continue
-            else:
-                result.append(find_affected_primary_keys(statement, stores, k))
-    else:
-        schema = stores['info'][which_store]['db']       
-        c_array = statement.split()
-        
-        query_by_value = get_indi_query(statement)
-#        if statement.find("\"") > -1 \
-#           and statement.find("\"") < statement.find('FIELDS'):
-#            query_by_value = statement.split("\"")[1]
-#        elif statement.find("\'") > -1 \
-#             and statement.find("\'") < statement.find('FIELDS'):
-#            query_by_value = statement.split("\'")[1] 
-        
-        if which_store.lower() == 'mysql':
-            search_cursor = stores['mysql'].cursor()
-            search_cursor.execute('SELECT id FROM ' + c_array[2] + ' WHERE ' \
-                                 + c_array[3] + ' = \'' + query_by_value \
-                                 + '\' ORDER BY id ASC')
-            for row in search_cursor:
-                result.append(row[0])
+    to_fields = key[3]
+    from_fields = None
+    with partition['lock']:
+        cache_check_epoch(partition)
+        entry = cache_get__entry(partition, key)
+        if entry is None and key[4:] == (None, None, None):
+            for superset_key in list(partition['by_predicate'].get( \
+                    key[:3], ())):
+                if superset_key[4:] != key[4:] \
+                   or not set(to_fields).issubset(superset_key[3]):
+                    continue
+                entry = cache_get__entry(partition, superset_key)
+                if entry is not None:
+                    key, from_fields = superset_key, superset_key[3]
+                    break
+        if entry is None:
+            if not peek:
+                partition['stats']['misses'] += 1
+            return None
+        if not peek:
+            partition['stats']['hits'] += 1
+            if from_fields is not None:
+                partition['stats']['projections'] += 1
+            entry['hits'] += 1
+            entry['used'] = time.monotonic()
+            partition['entries'].move_to_end(key)
+        result = entry['result']
+
+    if from_fields is None:
+        return result
+    return cache_project(result, from_fields, to_fields)
 
-        elif which_store.lower() == 'redis':
-            search_redis = stores['redis']
-            matching_keys = search_redis.keys((schema + '-' + c_array[2]) \
-                                        + '_*_' + c_array[3])
-            for k in matching_keys:
-                this_value = search_redis.get(k)
-                if this_value.decode('ASCII') == query_by_value:
-                    result.append(int(k.decode('ASCII').split('_')[1]))
-            result.sort()
-        elif which_store.lower() == 'postgres':
-            search_cursor = stores['postgres'].cursor()
-            search_cursor.execute('SELECT id FROM ' + c_array[2] + ' WHERE ' \
-                             + c_array[3] + ' = \'' + query_by_value \
-                             + '\' ORDER BY id ASC')
-            for row in search_cursor:
-                result.append(row[0])
-        elif which_store.lower() == 'mongodb':
-            result = \
-                convert_to_mongo__find_primary_keys(\
-                    stores['mongodb'][schema], c_array[2], c_array[3], \
-                        query_by_value, True)
-        elif which_store.lower() == 'sqlite3':
-            search_cursor = stores['sqlite3'].cursor()
-            search_cursor.execute('SELECT id FROM ' + c_array[2] + ' WHERE ' \
-                             + c_array[3] + ' = \'' + query_by_value \
-                             + '\' ORDER BY id ASC')
-            for row in search_cursor:
-                result.append(row[0])
-        else:
-            result.append('invalid store for find_affected_primary_keys()')
+def cache_put(partition, key, affected_pk_tuple, result, epoch=None):
+    """
+    Cache the result of a READ. Returns a boolean.
 
-    # this is a good time to check if any of the data stores are corrupted.
-    if which_store.lower() == 'all' and not is_all_list_elements_equal(result):
-        print("find_affected_primary_keys> result before AssertionError:\n" \
-              + str(result))
-        raise AssertionError(\
-            "A list of primary keys from one store is not like the others.")
-    elif which_store.lower() == 'all':
-        # verified that all stores returned the same thing, so return just
-        # one copy
-        result = result[0]
-    
-    # don't want downstream users modifying 
-    return tuple(result)
+    The first argument is the table's cache partition, the second is the
+    cache key, the third is the tuple of primary keys the READ depends on (or
+    (0,) for ALL RECORDS), and the fourth is the READ result. The optional
+    fifth is the cache_epoch() from before the READ was evaluated.
 
-# same thing as execute_indi except it caches the result in a dictionary
-# note this calls execute_indi to perform the DDL/DQL/DML action on the store
-def execute_then_cache_indi(statement, caches, stores, which_store='all'):
+    Least recently (or frequently) used entries are evicted to stay within
+    the limits in the settings. The result is False if the READ alone is
+    larger than the cache, or the table was written to since the epoch, and
+    so the READ was not cached.
     """
-    Execute and cache an INDI statement. Returns a multi-dimensional list.
+    settings = partition['settings']
+    budget = partition['budget']
+    max_bytes = settings['cache_max_bytes']
+    table_quota = settings['cache_table_quotas'].get(partition['table'])
+    entry_bytes = cache_sizeof(key) + cache_sizeof(result)
+    ttl = settings['cache_ttl_seconds']
+
+    with partition['lock']:
+        cache_check_epoch(partition)
+        cache_forget(partition, key)
+        if epoch is not None and epoch != partition['epoch']:
+            return False # the READ result may already be stale
+        if (max_bytes is not None and entry_bytes > max_bytes) \
+           or settings['cache_max_entries'] == 0 or table_quota == 0:
+            return False
+
+        while table_quota is not None \
+              and len(partition['entries']) >= table_quota:
+            cache_evict(partition, cache_choose_victim(partition))
+
+        now = time.monotonic()
+        partition['entries'][key] = {'pks': affected_pk_tuple, \
+                                     'result': result, \
+                                     'bytes': entry_bytes, \
+                                     'hits': 0, \
+                                     'used': now, \
+                                     'expires': None if ttl is None \
+                                         else now + ttl}
+        partition['bytes'] += entry_bytes
+        with budget['lock']:
+            budget['entries'] += 1
+            budget['bytes'] += entry_bytes
+        partition['by_predicate'].setdefault(key[:3], set()).add(key)
+        if affected_pk_tuple == (0,):
+            partition['all_records'].add(key)
+        else:
+            for pk in affected_pk_tuple:
+                partition['by_pk'].setdefault(pk, set()).add(key)
 
-    The first argument is the INDI statement as a string, the second argument is
-    the cache dictionary (as generated by initialize_cache()), the third
-    argument is the stores dictionary, and the fourth optional argument is
-    which store to evaluate the INDI statement on.
+    # the other partitions are only locked after this one is released
+    cache_shrink(budget, settings)
+    return True
 
-    This system may be used against just one store if so desired, so that's
+def cache_shrink(budget, settings):
+    """
+    Evict cached READs until every partition fits the limits. Returns void.
+
+    Each eviction is taken from the partition holding the least recently used
+    entry, so the limits are shared fairly between the INDI tables.
+    """
+    max_entries = settings['cache_max_entries']
+    max_bytes = settings['cache_max_bytes']
+    while True:
+        with budget['lock']:
+            if (max_entries is None or budget['entries'] <= max_entries) \
+               and (max_bytes is None or budget['bytes'] <= max_bytes):
+                return
+        oldest_partition, oldest_used = None, None
+        for partition in budget['partitions']:
+            with partition['lock']:
+                if len(partition['entries']) == 0:
+                    continue
+                used = next(iter(partition['entries'].values()))['used']
+            if oldest_used is None or used < oldest_used:
+                oldest_partition, oldest_used = partition, used
+        if oldest_partition is None:
+            return # nothing left to evict
+        with oldest_partition['lock']:
+            cache_evict(oldest_partition, \
+                        cache_choose_victim(oldest_partition))
+
+def cache_evict(partition, key):
+    """
+    Evict one cached READ to make room for another. Returns void.
+    """
+    with partition['lock']:
+        if cache_forget(partition, key):
+            partition['stats']['evictions'] += 1
+
+def cache_forget(partition, key):
+    """
+    Remove one cached READ, and its reverse index entries. Returns a boolean.
+
+    The result is True if the key was cached.
+    """
+    with partition['lock']:
+        entry = partition['entries'].pop(key, None)
+        if entry is None:
+            return False
+        partition['bytes'] -= entry['bytes']
+        with partition['budget']['lock']:
+            partition['budget']['entries'] -= 1
+            partition['budget']['bytes'] -= entry['bytes']
+        if entry['pks'] == (0,):
+            partition['all_records'].discard(key)
+        index_keys = [('by_predicate', key[:3])] \
+            + [('by_pk', pk) for pk in entry['pks']]
+        for index, index_key in index_keys:
+            dependents = partition[index].get(index_key)
+            if dependents is not None:
+                dependents.discard(key)
+                if len(dependents) == 0:
+                    del partition[index][index_key]
+        return True
+
+def cache_invalidate(partition, affected_pk_tuple=()):
+    """
+    Remove the cached READs affected by a write. Returns a list of cache keys.
+
+    The first argument is the table's cache partition, and the second is the
+    tuple of primary keys written to. Every ALL RECORDS read of the table is
+    removed, along with the reads which depend on any of the primary keys.
+    The cost is the quantity of entries removed, not the quantity cached.
+    """
+    with partition['lock']:
+        del_set = set(partition['all_records'])
+        for pk in affected_pk_tuple:
+            del_set.update(partition['by_pk'].get(pk, ()))
+        for key in del_set:
+            cache_forget(partition, key)
+        partition['stats']['invalidations'] += len(del_set)
+        cache_next_epoch(partition)
+    return list(del_set)
+
+def cache_flush(caches, table_name=None):
+    """
+    Remove every cached READ of one, or every, table. Returns an integer.
+
+    The first argument is the caches dictionary from initialize_cache(), the
+    optional second argument is the INDI table to flush, by default all of
+    them. The result is the quantity of cached READs removed.
+    """
+    result = 0
+    for name, partition in caches.items():
+        if table_name is not None and name != table_name:
+            continue
+        with partition['lock']:
+            for key in list(partition['entries'].keys()):
+                if cache_forget(partition, key):
+                    result += 1
+    return result
+
+def get_cache_stats(caches, table_name=None):
+    """
+    Measure the caches from initialize_cache(). Returns a dictionary.
+
+    The result has the 'hits', 'misses', 'evictions', 'expirations' and
+    'invalidations' counters, 'projections' (the hits answered by selecting
+    FIELDS from a cached READ of more FIELDS), and the 'entries' and 'bytes'
+    currently cached. If the optional second argument names an INDI table,
+    then only that table is measured, otherwise the result is the sum of all
+    tables, with the measurements of each table under 'tables'.
+    """
+    if table_name is not None:
+        partition = caches[table_name]
+        with partition['lock']:
+            result = dict(partition['stats'])
+            result['entries'] = len(partition['entries'])
+            result['bytes'] = partition['bytes']
+        return result
+
+    result = {'hits': 0, 'misses': 0, 'projections': 0, 'evictions': 0, \
+              'expirations': 0, 'invalidations': 0, 'entries': 0, 'bytes': 0, \
+              'tables': {}}
+    for name in caches.keys():
+        table_result = get_cache_stats(caches, name)
+        for measurement, value in table_result.items():
+            result[measurement] += value
+        result['tables'][name] = table_result
+    return result
+
+# end READ cache section
+# ------------------------------------------------------------------------------
+# begin INDI journal section
+
+# every INDI statement which writes to all the stores is appended to the
+# journal once it is evaluated, while global_write_lock is still held, so the
+# journal holds the writes in the order the stores saw them. the journal is a
+# directory of segments, each a file of newline-delimited JSON records, named
+# after the sequence number of its first record (see JOURNAL__SEGMENT_FORMAT).
+# a segment which has grown to the 'journal_segment_bytes' setting is never
+# appended to again. each record is like
+#    {"seq": 1, "time": 1700000000.5, "statement": "CREATE IN ...",
+#     "stores": {"sqlite3": "ok", "redis": "ok"}}
+# where "stores" holds the outcome of the statement in each store, "ok" or
+# the error (a store is missing if the statement was not evaluated there,
+# since another store failed first). the 'journal_fsync' setting is when the
+# segment is synced to the disk: 'always' after every append, 'os' whenever
+# the operating system does (a record survives the process dying, but not
+# the machine), or a number of seconds between syncs by a thread of the
+# journal.
+
+# the journal of this process, opened by the first append
+global_journal = None
+global_journal_lock = threading.Lock()
+
+def journal_segments(directory):
+    """
+    Find the segments of a journal, in order. Returns a list of tuples.
+
+    The argument is the journal directory. Each tuple is the first sequence
+    number of a segment, and the path of its file.
+    """
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    result = []
+    for name in names:
+        match = JOURNAL__SEGMENT_REGEX.match(name)
+        if match:
+            result.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(result)
+
+def journal__parse(line):
+    """
+    Parse a line of a segment. Returns a dictionary, or None if torn.
+    """
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or not 'seq' in record:
+        return None
+    return record
+
+def journal__last_seq(path):
+    """
+    Find the sequence number of the last record in a segment. Returns it.
+
+    Returns None if the segment has no record. Only the end of the segment
+    is read, more of it only if the last record is longer.
+    """
+    with open(path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        tail_bytes = JOURNAL__TAIL_BYTES
+        while True:
+            start = max(0, end - tail_bytes)
+            f.seek(start)
+            lines = f.read(end - start).split(b'\n')
+            if start > 0:
+                lines = lines[1:] # the first line may be cut short
+            for line in reversed(lines):
+                record = journal__parse(line)
+                if record is not None:
+                    return record['seq']
+            if start == 0:
+                return None
+            tail_bytes *= 2
+
+def open_journal(directory, settings=None):
+    """
+    Open a journal to append to. Returns a dictionary.
+
+    The first argument is the journal directory, which is created if missing,
+    the second optional argument is the settings dictionary, by default the
+    settings read from 'config/settings.txt'. Raises ValueError if the
+    'journal_fsync' setting is not valid.
+    """
+    if settings is None:
+        settings = global_settings
+    fsync = settings['journal_fsync']
+    if not fsync in JOURNAL__FSYNC_POLICIES and not ( \
+            isinstance(fsync, (int, float)) and fsync > 0):
+        raise ValueError('journal_fsync must be one of ' \
+                         + str(JOURNAL__FSYNC_POLICIES) \
+                         + ' or a number of seconds.')
+    os.makedirs(directory, exist_ok=True)
+    journal = {'directory': directory, 'fsync': fsync, \
+               'segment_bytes': settings['journal_segment_bytes'], \
+               'file': None, 'bytes': 0, 'seq': 0, 'dirty': False, \
+               'lock': threading.Lock()}
+    journal__resync(journal)
+    if not fsync in JOURNAL__FSYNC_POLICIES:
+        threading.Thread(target=journal__sync_loop, args=(journal,), \
+                         name='cindi-journal', daemon=True).start()
+    return journal
+
+def journal__resync(journal):
+    """
+    Reopen the last segment of a journal to append to. Returns void.
+
+    Another process may have appended to the journal, or begun a segment,
+    so the segment and the last sequence number are found again.
+    """
+    if journal['file'] is not None:
+        journal['file'].close()
+    segments = journal_segments(journal['directory'])
+    if len(segments) == 0:
+        journal__begin_segment(journal, 1)
+        return
+    first_seq, path = segments[-1]
+    last_seq = journal__last_seq(path)
+    journal['seq'] = first_seq - 1 if last_seq is None else last_seq
+    journal['file'] = open(path, 'ab')
+    journal['bytes'] = journal['file'].seek(0, os.SEEK_END)
+    if journal['bytes'] > 0:
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                # the last append was cut short, its line is left torn
+                journal['file'].write(b'\n')
+                journal['file'].flush()
+                journal['bytes'] += 1
+
+def journal__begin_segment(journal, first_seq):
+    """
+    Close the segment of a journal, and begin the next. Returns void.
+    """
+    if journal['file'] is not None:
+        if journal['fsync'] != 'os':
+            os.fsync(journal['file'].fileno())
+        journal['file'].close()
+    journal['file'] = open(os.path.join(journal['directory'], \
+        JOURNAL__SEGMENT_FORMAT.format(first_seq)), 'ab')
+    journal['bytes'] = journal['file'].seek(0, os.SEEK_END)
+    journal['seq'] = first_seq - 1
+    journal['dirty'] = False
+
+def journal__sync_loop(journal):
+    """
+    Sync the segment of a journal every so often. Returns once it is closed.
+    """
+    while True:
+        time.sleep(journal['fsync'])
+        with journal['lock']:
+            if journal['file'] is None:
+                return
+            if journal['dirty']:
+                os.fsync(journal['file'].fileno())
+                journal['dirty'] = False
+
+def get_journal():
+    """
+    Open the journal of this process, if needed. Returns it, or None.
+
+    Returns None if the 'journal_directory' setting is None.
+    """
+    global global_journal
+    with global_journal_lock:
+        if global_journal is None \
+           and global_settings['journal_directory'] is not None:
+            global_journal = open_journal(global_settings['journal_directory'])
+    return global_journal
+
+def append_journal(statements, outcomes, journal=None):
+    """
+    Append INDI statements to the journal. Returns the last sequence number.
+
+    The first argument is a list of IndiStatements, the second is the
+    dictionary of each store's outcome, the same for every statement. The
+    third optional argument is the journal, by default the one of this
+    process (see get_journal()), and if there is none, nothing is appended
+    and None is returned. Raises OSError if the journal can not be written.
+    """
+    if journal is None:
+        journal = get_journal()
+        if journal is None:
+            return None
+    with journal['lock']:
+        # the processes take turns appending (see prepare_for_worker_processes)
+        if os.fstat(journal['file'].fileno()).st_size != journal['bytes']:
+            journal__resync(journal)
+        now = time.time()
+        lines = []
+        for indi in statements:
+            journal['seq'] += 1
+            lines.append(json.dumps({'seq': journal['seq'], 'time': now, \
+                                     'statement': indi.text, \
+                                     'stores': outcomes}) + '\n')
+        data = ''.join(lines).encode('ascii')
+        journal['file'].write(data)
+        journal['file'].flush()
+        journal['bytes'] += len(data)
+        if journal['fsync'] == 'always':
+            os.fsync(journal['file'].fileno())
+        else:
+            journal['dirty'] = True
+        if journal['bytes'] >= journal['segment_bytes']:
+            journal__begin_segment(journal, journal['seq'] + 1)
+        return journal['seq']
+
+def close_journal(journal=None):
+    """
+    Sync and close a journal, by default this process's. Returns void.
+    """
+    global global_journal
+    if journal is None:
+        with global_journal_lock:
+            journal = global_journal
+            global_journal = None
+        if journal is None:
+            return
+    with journal['lock']:
+        if journal['file'] is None:
+            return
+        if journal['fsync'] != 'os':
+            os.fsync(journal['file'].fileno())
+        journal['file'].close()
+        journal['file'] = None
+
+def read_journal(directory=None, after_seq=0):
+    """
+    Read the records of a journal, in order. Returns a generator of dicts.
+
+    The first optional argument is the journal directory, by default the
+    'journal_directory' setting. The second is a sequence number, only the
+    records after it are read, and the segments before it are not read at
+    all. A line which is not a whole record, as left by a process dying part
+    way through an append, is skipped.
+    """
+    if directory is None:
+        directory = global_settings['journal_directory']
+    segments = journal_segments(directory)
+    for i, (first_seq, path) in enumerate(segments):
+        if i + 1 < len(segments) and segments[i + 1][0] <= after_seq + 1:
+            continue # every record of this segment is at most after_seq
+        with open(path, 'rb') as f:
+            for line in f:
+                if line.strip() == b'':
+                    continue
+                record = journal__parse(line)
+                if record is None:
+                    LOG.warning('Skipped a torn journal record in %s', path)
+                elif record['seq'] > after_seq:
+                    yield record
+
+# end INDI journal section
+# ------------------------------------------------------------------------------
+# begin metrics section
+
+# each counter of METRICS__DEFINITIONS is a number, and each histogram a list
+# of the counts of each of METRICS__LATENCY_BUCKETS, then of the count above
+# them, then of the sum, under the key (name, tuple of label values). they
+# are kept by this process, and the worker processes of
+# start_cindi_production() each write theirs to a file of a directory every
+# METRICS__SHARE_SECONDS, which compose_metrics() sums (see share_metrics()).
+global_metrics = {}
+global_metrics_lock = threading.Lock()
+
+# the directory, the caches, and the file of this process, when the
+# measurements are shared with other processes, see
+# prepare_for_worker_processes()
+global_metrics_sharing = None
+
+def metrics_count(name, labels, amount=1):
+    """
+    Add to a counter of METRICS__DEFINITIONS. Returns void.
+
+    The first argument is the name of the counter, the second is the tuple of
+    its label values, in the order of its label names, and the third is how
+    much to add. Nothing is counted if the 'metrics' setting is False.
+    """
+    if not global_settings['metrics']:
+        return
+    key = (name, labels)
+    with global_metrics_lock:
+        global_metrics[key] = global_metrics.get(key, 0) + amount
+
+def metrics_count_commands(store_name, commands):
+    """
+    Count the native statements sent to a store. Returns void.
+
+    The first argument is the store name, the second is a list of the command
+    of each statement sent, such as 'GET' or 'SELECT'.
+    """
+    if not global_settings['metrics'] or len(commands) == 0:
+        return
+    counts = collections.Counter(commands)
+    with global_metrics_lock:
+        for command, amount in counts.items():
+            key = ('cindi_native_commands_total', \
+                   (store_name, str(command).upper()))
+            global_metrics[key] = global_metrics.get(key, 0) + amount
+
+def metrics_observe(name, labels, seconds):
+    """
+    Count a duration in a histogram of METRICS__DEFINITIONS. Returns void.
+
+    The arguments are the same as metrics_count(), but the third is the
+    duration in seconds.
+    """
+    if not global_settings['metrics']:
+        return
+    key = (name, labels)
+    i = bisect.bisect_left(METRICS__LATENCY_BUCKETS, seconds)
+    with global_metrics_lock:
+        histogram = global_metrics.get(key)
+        if histogram is None:
+            histogram = [0] * (len(METRICS__LATENCY_BUCKETS) + 1) + [0.0]
+            global_metrics[key] = histogram
+        histogram[i] += 1
+        histogram[-1] += seconds
+
+@contextlib.contextmanager
+def metrics_timer(name, labels):
+    """
+    Time a block into a histogram. Returns a context manager.
+
+    The arguments are the same as the first two of metrics_observe(). The
+    block is timed whether or not it raises an exception.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics_observe(name, labels, time.perf_counter() - start)
+
+@contextlib.contextmanager
+def measure_statement(indi, quantity=1):
+    """
+    Count and time the evaluation of INDI statements. Returns a context manager.
+
+    The first argument is the IndiStatement, whose verb and table label the
+    measurements, the second is how many statements like it are evaluated
+    together, such as by execute_then_cache_indi_bulk_create().
+    """
+    labels = (indi.verb, indi.table)
+    metrics_count('cindi_statements_total', labels, quantity)
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        metrics_count('cindi_statement_errors_total', labels, quantity)
+        raise
+    finally:
+        metrics_observe('cindi_statement_seconds', labels, \
+                        time.perf_counter() - start)
+
+def compose_metrics__labels(label_names, labels):
+    """
+    Write the labels of a measurement for compose_metrics(). Returns a string.
+    """
+    if len(label_names) == 0:
+        return ''
+    result = []
+    for label_name, value in pairlis(label_names, labels):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"') \
+            .replace('\n', '\\n')
+        result.append(label_name + '="' + value + '"')
+    return '{' + ','.join(result) + '}'
+
+def metrics__snapshot(caches):
+    """
+    Copy the measurements of this process. Returns a tuple of two dicts.
+
+    The first is a copy of global_metrics, the second is the get_cache_stats()
+    of each INDI table of the caches.
+    """
+    with global_metrics_lock:
+        measurements = {}
+        for key, value in global_metrics.items():
+            measurements[key] = list(value) if isinstance(value, list) \
+                else value
+    return measurements, get_cache_stats(caches)['tables']
+
+def share_metrics(sharing=None):
+    """
+    Write the measurements of this process for the others. Returns void.
+
+    The optional argument is the sharing dictionary, by default
+    global_metrics_sharing, and nothing is written if there is none. The file
+    is only written if the measurements have changed, and is replaced at once,
+    so it is never read half-written.
+    """
+    if sharing is None:
+        sharing = global_metrics_sharing
+        if sharing is None:
+            return
+    measurements, tables = metrics__snapshot(sharing['caches'])
+    text = json.dumps({'metrics': [[key[0], list(key[1]), value] \
+                                   for key, value in measurements.items()], \
+                       'cache': tables}, sort_keys=True)
+    with sharing['lock']:
+        if text == sharing['text']:
+            return
+        path = os.path.join(sharing['directory'], sharing['file_name'])
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(path + '.tmp', path)
+        sharing['text'] = text
+
+def metrics__share_loop(sharing):
+    """
+    Share the measurements of this process every so often. Never returns.
+    """
+    while True:
+        time.sleep(METRICS__SHARE_SECONDS)
+        try:
+            share_metrics(sharing)
+        except OSError as err:
+            LOG.warning('Failed to share the measurements: %s', err)
+
+def metrics__is_alive(pid):
+    """
+    Is the process still running? Returns a boolean.
+    """
+    try:
+        os.kill(pid, 0) # signal 0 is not sent, the process is only looked up
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def metrics__merge(directory):
+    """
+    Sum the measurements shared by every process. Returns a tuple of two dicts.
+
+    The argument is the directory of the files written by share_metrics(),
+    the result is like metrics__snapshot(). The counters and histograms of
+    the processes which have exited are kept, so that they never go back,
+    but the gauges of the caches are only summed over the running processes.
+    """
+    measurements = {}
+    tables = {}
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, file_name), 'r', \
+                      encoding='utf-8') as f:
+                shared = json.load(f)
+        except (OSError, ValueError):
+            continue # replaced meanwhile
+        is_alive = metrics__is_alive(int(file_name.split('-')[0]))
+        for name, labels, value in shared['metrics']:
+            key = (name, tuple(labels))
+            if not isinstance(value, list):
+                measurements[key] = measurements.get(key, 0) + value
+            elif not key in measurements:
+                measurements[key] = value
+            else:
+                measurements[key] = [a + b for a, b \
+                                     in pairlis(measurements[key], value)]
+        for table_name, stats in shared['cache'].items():
+            if not table_name in tables:
+                tables[table_name] = {measurement: 0 for measurement, _, _ \
+                                      in METRICS__CACHE}
+            for measurement, kind, _ in METRICS__CACHE:
+                if kind == 'counter' or is_alive:
+                    tables[table_name][measurement] += stats[measurement]
+    return measurements, tables
+
+def compose_metrics(caches):
+    """
+    Write the measurements in the Prometheus text format. Returns a string.
+
+    The argument is the caches dictionary from initialize_cache(), whose
+    get_cache_stats() are shown per INDI table after the measurements of
+    METRICS__DEFINITIONS. This is the body served by /metrics. If the
+    measurements are shared (see prepare_for_worker_processes()), then they
+    are the sum of every worker process, this process's being written first.
+    """
+    measurements, tables = metrics__snapshot(caches)
+    if global_metrics_sharing is not None:
+        share_metrics(global_metrics_sharing)
+        measurements, tables = \
+            metrics__merge(global_metrics_sharing['directory'])
+
+    lines = []
+    for name, (kind, help_text, label_names) in METRICS__DEFINITIONS.items():
+        lines.append('# HELP ' + name + ' ' + help_text)
+        lines.append('# TYPE ' + name + ' ' + kind)
+        for key in sorted([k for k in measurements.keys() if k[0] == name]):
+            value = measurements[key]
+            labels = key[1]
+            if kind != 'histogram':
+                lines.append(name + compose_metrics__labels(label_names, \
+                                                            labels) \
+                             + ' ' + str(value))
+                continue
+
+            # the buckets of the Prometheus text format are cumulative
+            count = 0
+            for upper_bound, this_count in pairlis( \
+                    METRICS__LATENCY_BUCKETS + ('+Inf',), value[:-1]):
+                count += this_count
+                lines.append(name + '_bucket' + compose_metrics__labels( \
+                    label_names + ('le',), labels + (upper_bound,)) \
+                             + ' ' + str(count))
+            these_labels = compose_metrics__labels(label_names, labels)
+            lines.append(name + '_sum' + these_labels + ' ' + repr(value[-1]))
+            lines.append(name + '_count' + these_labels + ' ' + str(count))
+
+    for measurement, kind, help_text in METRICS__CACHE:
+        name = 'cindi_cache_' + measurement
+        if kind == 'counter':
+            name += '_total'
+        lines.append('# HELP ' + name + ' ' + help_text)
+        lines.append('# TYPE ' + name + ' ' + kind)
+        for table_name in sorted(tables.keys()):
+            lines.append(name + compose_metrics__labels(('table',), \
+                                                        (table_name,)) \
+                         + ' ' + str(tables[table_name][measurement]))
+
+    return '\n'.join(lines) + '\n'
+
+# end metrics section
+# ------------------------------------------------------------------------------
+# begin tracing section
+
+# the span being timed by this thread or coroutine, see trace_span(). the
+# threads evaluating a statement on each store are given a copy of the
+# context of the thread which handed it to them, see fan_out_stores().
+global_trace_span = contextvars.ContextVar('cindi_trace_span', default=None)
+
+# appending to the 'trace_export_path' file, see export_trace()
+global_trace_export_lock = threading.Lock()
+
+def is_tracing_enabled():
+    """
+    Are the statements traced, see the tracing section? Returns a boolean.
+    """
+    return global_settings['trace_slow_seconds'] is not None \
+        or global_settings['trace_export_path'] is not None
+
+def trace__new_span(trace, parent, name, kind, attributes):
+    """
+    Begin a span of a trace, now. Returns a dictionary.
+    """
+    return {'trace': trace, 'span_id': os.urandom(8).hex(), \
+            'parent_id': None if parent is None else parent['span_id'], \
+            'name': name, 'kind': kind, 'start': time.time_ns(), \
+            'end': None, 'attributes': dict(attributes or {}), 'error': None}
+
+def trace__end_span(span):
+    """
+    End a span now, and add it to its trace. Returns void.
+    """
+    span['end'] = time.time_ns()
+    with span['trace']['lock']:
+        span['trace']['spans'].append(span)
+
+@contextlib.contextmanager
+def trace_span(name, attributes=None, root=False, kind=TRACE__KIND_INTERNAL):
+    """
+    Time a block as a span of the current trace. Returns a context manager.
+
+    The first argument is the name of the span, the second is a dictionary
+    of its attributes, such as {'db.system': 'redis'}. The span is a child of
+    the span of the enclosing block. Outside of any span, nothing is timed,
+    unless the third argument is True and tracing is enabled, when a new
+    trace begins, and is handed to finish_trace() once the block ends. The
+    fourth argument is one of the TRACE__KIND constants.
+
+    The span (a dictionary, or None when nothing is timed) is given to the
+    block, which may add to its 'attributes'. If the block raises an
+    exception, the span records it as its 'error'.
+    """
+    parent = global_trace_span.get()
+    if parent is not None:
+        trace = parent['trace']
+    elif root and is_tracing_enabled():
+        trace = {'trace_id': os.urandom(16).hex(), 'spans': [], \
+                 'lock': threading.Lock()}
+    else:
+        yield None
+        return
+
+    span = trace__new_span(trace, parent, name, kind, attributes)
+    token = global_trace_span.set(span)
+    try:
+        yield span
+    except BaseException as err:
+        span['error'] = type(err).__name__ + ': ' + str(err)
+        raise
+    finally:
+        global_trace_span.reset(token)
+        trace__end_span(span)
+        if parent is None:
+            finish_trace(span)
+
+def trace_native(store_name, statements, start):
+    """
+    Record native statements sent to a store as a span. Returns void.
+
+    The first argument is the store name, the second is the list of the
+    statements sent together, each a string or a tuple such as ('GET', key),
+    and the third is when they were sent, from time.time_ns(). The span ends
+    now. Nothing is recorded outside of a span.
+    """
+    parent = global_trace_span.get()
+    if parent is None or len(statements) == 0:
+        return
+    texts = []
+    for statement in statements[:TRACE__NATIVE_STATEMENTS]:
+        if isinstance(statement, (tuple, list)):
+            statement = ' '.join(map(str, statement))
+        texts.append(str(statement)[:TRACE__STATEMENT_CHARS])
+    # named after the command, such as 'redis GET', or 'redis PIPELINE' when
+    # the statements are not all the same command
+    commands = set([(text.split() or [''])[0].upper() for text in texts])
+    command = commands.pop() if len(commands) == 1 else 'PIPELINE'
+    span = trace__new_span(parent['trace'], parent, \
+                           store_name + ' ' + command, TRACE__KIND_CLIENT, \
+                           {'db.system': store_name, \
+                            'db.statement': '\n'.join(texts), \
+                            'cindi.native_statements': len(statements)})
+    span['start'] = start
+    trace__end_span(span)
+
+@contextlib.contextmanager
+def measure_store(store_name, operation):
+    """
+    Time an operation of one store, for /metrics and as a span. Returns it.
+
+    The first argument is the store name, the second is the operation, such
+    as 'execute'. The context manager is the same as metrics_timer()'s.
+    """
+    with metrics_timer('cindi_store_seconds', (store_name, operation)), \
+         trace_span(store_name + ' ' + operation, {'db.system': store_name}):
+        yield
+
+def compare_store_results(results):
+    """
+    Are the results of every store the same? Returns a boolean.
+
+    The argument is the list of each store's result. The comparison is timed
+    as a span.
+    """
+    with trace_span('compare'):
+        return is_all_list_elements_equal(results)
+
+def finish_trace(root):
+    """
+    Log a slow trace, and export it, once its root span ends. Returns void.
+
+    A trace whose root span took at least the 'trace_slow_seconds' setting
+    is logged by the cindi.slow logger as one line of JSON, see
+    compose_slow_query(). Every trace is exported if the 'trace_export_path'
+    setting is a path, see export_trace().
+    """
+    trace = root['trace']
+    slow_seconds = global_settings['trace_slow_seconds']
+    if slow_seconds is not None \
+       and (root['end'] - root['start']) / 1e9 >= slow_seconds:
+        LOG__SLOW.warning('%s', json.dumps(compose_slow_query(trace, root)))
+    if global_settings['trace_export_path'] is not None:
+        export_trace(trace, global_settings['trace_export_path'])
+
+def compose_slow_query(trace, root):
+    """
+    Describe where the time of a trace went. Returns a dictionary.
+
+    The first argument is the trace, the second is its root span. The result
+    holds the 'trace_id', the 'name' and 'seconds' of the root span, and its
+    'spans', in the order they began, each with its 'span_id', 'parent_id',
+    'name', 'offset' (seconds after the root span began), 'seconds',
+    'attributes' and 'error', if any.
+    """
+    with trace['lock']:
+        spans = sorted(trace['spans'], key=lambda span: span['start'])
+    result = {'trace_id': trace['trace_id'], 'name': root['name'], \
+              'seconds': (root['end'] - root['start']) / 1e9, 'spans': []}
+    for span in spans:
+        this_span = {'span_id': span['span_id'], \
+                     'parent_id': span['parent_id'], 'name': span['name'], \
+                     'offset': (span['start'] - root['start']) / 1e9, \
+                     'seconds': (span['end'] - span['start']) / 1e9, \
+                     'attributes': span['attributes']}
+        if span['error'] is not None:
+            this_span['error'] = span['error']
+        result['spans'].append(this_span)
+    return result
+
+def compose_otlp_trace__value(value):
+    """
+    Write an attribute value as OpenTelemetry JSON. Returns a dictionary.
+    """
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def compose_otlp_trace(trace):
+    """
+    Write a trace in the JSON of the OpenTelemetry protocol. Returns a dict.
+
+    The result is one ExportTraceServiceRequest, as read from a file by the
+    'otlpjsonfile' receiver of the OpenTelemetry Collector.
+    """
+    with trace['lock']:
+        spans = list(trace['spans'])
+    otlp_spans = []
+    for span in spans:
+        attributes = []
+        for key, value in span['attributes'].items():
+            attributes.append({'key': key, \
+                               'value': compose_otlp_trace__value(value)})
+        otlp_span = {'traceId': trace['trace_id'], 'spanId': span['span_id'], \
+                     'name': span['name'], 'kind': span['kind'], \
+                     'startTimeUnixNano': str(span['start']), \
+                     'endTimeUnixNano': str(span['end']), \
+                     'attributes': attributes}
+        if span['parent_id'] is not None:
+            otlp_span['parentSpanId'] = span['parent_id']
+        if span['error'] is not None:
+            otlp_span['status'] = {'code': 2, 'message': span['error']}
+        otlp_spans.append(otlp_span)
+    return {'resourceSpans': [{ \
+        'resource': {'attributes': [{'key': 'service.name', \
+                                     'value': {'stringValue': 'cindi'}}]}, \
+        'scopeSpans': [{'scope': {'name': 'cindi'}, 'spans': otlp_spans}]}]}
+
+def export_trace(trace, path):
+    """
+    Append a trace to an OpenTelemetry JSON file. Returns void.
+
+    The first argument is the trace, the second is the path of the file,
+    which is given one line of compose_otlp_trace() per trace, and created
+    along with its directory if missing. A trace which can not be written is
+    logged, and the statement is not failed.
+    """
+    line = json.dumps(compose_otlp_trace(trace)) + '\n'
+    try:
+        with global_trace_export_lock:
+            directory = os.path.dirname(path)
+            if directory != '' and not os.path.isdir(directory):
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as export_file:
+                export_file.write(line)
+    except OSError as err:
+        LOG.warning('Could not export a trace to %s: %s', path, err)
+
+# end tracing section
+# ------------------------------------------------------------------------------
+# begin higher-order domain-specific functions
+
+# the threads which evaluate a statement on each store at the same time, they
+# are only started once the first parallel evaluation needs them
+global_fan_out_executor = None
+global_fan_out_executor_lock = threading.Lock()
+
+# the stores must see every CREATE/UPDATE/DELETE in the same order, or else
+# (for example) two concurrent CREATEs may be given different primary keys in
+# different stores. so statements which write are evaluated one at a time.
+global_write_lock = threading.RLock()
+
+# a multiprocessing lock stays locked forever if its owner dies, for example
+# when gunicorn kills a stuck worker process part way through a write, and
+# then every write in every process waits forever. an flock() is released by
+# the operating system once its owner's file is closed, which includes dying.
+class FileWriteLock:
+    """
+    A reentrant lock held across processes with flock() on a lock file.
+
+    The argument is the path of the lock file, which is created if missing.
+    Threads of one process take turns with a threading.RLock, and the file is
+    only locked by the outermost acquire() of a thread, so the lock may be
+    taken again by the thread holding it, as with threading.RLock. Each
+    process opens the lock file on its first acquire(), since an flock() is
+    shared by every process holding the same open file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+        self.file_pid = None
+
+    def acquire(self):
+        """
+        Wait until no other thread or process holds the lock. Returns True.
+        """
+        self.thread_lock.acquire()
+        try:
+            if self.depth == 0:
+                if self.file_pid != os.getpid():
+                    self.file = open(self.path, 'a')
+                    self.file_pid = os.getpid()
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            self.depth += 1
+        except BaseException:
+            self.thread_lock.release()
+            raise
+        return True
+
+    def release(self):
+        """
+        Release the lock, once per acquire(). Returns void.
+        """
+        self.depth -= 1
+        if self.depth == 0:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.thread_lock.release()
+
+    def reset_after_fork(self):
+        """
+        Forget the holder of the lock in the parent process. Returns void.
+        """
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+        self.file_pid = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+# how many times the thread holds global_write_lock, see hold_write_lock()
+global_write_lock_depth = threading.local()
+
+@contextlib.contextmanager
+def hold_write_lock(active=True):
+    """
+    Hold global_write_lock while writing. Returns a context manager.
+
+    The optional argument is False to hold nothing, such as for a READ. The
+    lock may be held again by the thread holding it, and by the threads of
+    fan_out_stores() evaluating its writes. Once the outermost holder has
+    released the lock, it waits for the SQL writes evaluated meanwhile to be
+    committed, see group_commit_execute().
+    """
+    depth = getattr(global_write_lock_depth, 'depth', 0)
+    if not active or depth > 0:
+        global_write_lock_depth.depth = depth + 1
+        try:
+            yield
+        finally:
+            global_write_lock_depth.depth = depth
+        return
+
+    with global_write_lock:
+        global_write_lock_depth.depth = 1
+        try:
+            yield
+        finally:
+            global_write_lock_depth.depth = 0
+            tickets = group_commit_tickets()
+    wait_for_group_commit(tickets)
+
+def get_fan_out_executor():
+    """
+    Start the thread pool for parallel evaluations, if needed. Returns it.
+    """
+    global global_fan_out_executor
+    with global_fan_out_executor_lock:
+        if global_fan_out_executor is None:
+            global_fan_out_executor = concurrent.futures.ThreadPoolExecutor( \
+                max_workers=global_settings['parallel_max_workers'], \
+                thread_name_prefix='cindi-store')
+    return global_fan_out_executor
+
+def abandon_store_connection(stores, store_name, future):
+    """
+    Stop lending a store's connection to a late evaluation. Returns void.
+
+    The first argument is the stores dictionary, the second is the store
+    which did not answer in time, and the third is the future of its
+    evaluation. Python threads can not be killed, so the straggling thread is
+    left to finish, after which its connection is closed. The stores
+    dictionary no longer holds the connection, so it is never re-used. The
+    thread-safe shared clients (see POOL__SHARED_STORES) are left alone.
+    """
+    if store_name in POOL__SHARED_STORES:
+        return
+    connection = stores[store_name]
+    stores[store_name] = None
+    future.add_done_callback(lambda f: \
+                             close_store_connection(store_name, connection))
+
+def fan_out_stores__write(function, statement, stores, store_name):
+    """
+    Evaluate a write on one store for fan_out_stores(). Returns its result.
+
+    The thread which called fan_out_stores() holds global_write_lock for this
+    thread, see hold_write_lock().
+    """
+    depth = getattr(global_write_lock_depth, 'depth', 0)
+    global_write_lock_depth.depth = depth + 1
+    try:
+        return function(statement, stores, store_name)
+    finally:
+        global_write_lock_depth.depth = depth
+
+def fan_out_stores__outcome(function, outcomes, statement, stores, \
+                            store_name):
+    """
+    Evaluate a statement on one store, noting its outcome. Returns its result.
+
+    The first argument is the function, as for fan_out_stores(), the second
+    is the dictionary of outcomes, where the store's outcome is set to 'ok',
+    or to the exception it raised. The rest are the same as the function.
+    """
+    try:
+        result = function(statement, stores, store_name)
+    except BaseException as err:
+        outcomes[store_name] = type(err).__name__ + ': ' + str(err)
+        raise
+    outcomes[store_name] = 'ok'
+    return result
+
+def fan_out_stores(function, statement, stores, timeouts=True):
+    """
+    Evaluate function on every store at the same time. Returns a list.
+
+    The first argument is the function, which is called as
+    function(statement, stores, store_name), such as execute_indi(). The
+    second argument is the INDI statement, the third is the stores dictionary.
+    The result holds each store's result, in the order of stores.keys().
+
+    If the 'parallel_stores' setting is False, the stores are evaluated one
+    after another instead. Otherwise, each store is given up to its 'timeout'
+    from stores.txt to answer (by default STORE__DEFAULT_TIMEOUT), and
+    TimeoutError is raised if any store did not. If any store raised an
+    exception, the first one is raised once all the stores have finished.
+
+    The fourth argument is False for writes, which wait for every store
+    however long it takes. A write that is given up on may still land after
+    global_write_lock is released, so the stores would see writes in a
+    different order.
+    """
+    store_names = []
+    for k in stores.keys():
+        if k.lower() != 'info':
+            store_names.append(k)
+    if not timeouts:
+        function = functools.partial(fan_out_stores__write, function)
+
+    if not global_settings['parallel_stores'] or len(store_names) < 2:
+        results = []
+        for k in store_names:
+            results.append(function(statement, stores, k))
+        return results
+
+    start = time.monotonic()
+    executor = get_fan_out_executor()
+    futures = []
+    for k in store_names:
+        # each thread's spans are children of this thread's span
+        futures.append(executor.submit(contextvars.copy_context().run, \
+                                       function, statement, stores, k))
+
+    results = []
+    first_error = None
+    late_stores = []
+    for k, future in pairlis(store_names, futures):
+        timeout = None
+        if timeouts:
+            timeout = stores['info'][k].get('timeout', STORE__DEFAULT_TIMEOUT)
+        if timeout is not None:
+            timeout = max(0, start + timeout - time.monotonic())
+        try:
+            results.append(future.result(timeout))
+        except concurrent.futures.TimeoutError:
+            late_stores.append(k)
+            if not future.cancel(): # it may not have started yet
+                abandon_store_connection(stores, k, future)
+        except BaseException as err:
+            if first_error is None:
+                first_error = err
+
+    if len(late_stores) > 0:
+        if isinstance(statement, list): # see execute_indi_bulk_create()
+            described = str(len(statement)) + ' CREATE statements'
+        else:
+            described = parse_indi(statement).text
+        raise TimeoutError('No answer in time from ' + ', '.join(late_stores) \
+                           + ' for ' + described)
+    if first_error is not None:
+        raise first_error
+
+    return results
+
+def execute_indi(statement, stores=None, which_store='all'):
+    """
+    Execute an INDI statement on the stores. Returns a multidimensional list.
+
+    First argument is the INDI statement. Second argument is the dictionary of
+    stores, generated by initialize_stores(). Third argument is which store to
+    apply the effect to.
+
+    Default second argument is None, and it will borrow the stores from the
+    process-wide connection pools for the user. Default third argument is
+    'all', which means to evaluate against all stores if desired. All the
+    stores are evaluated at the same time, see fan_out_stores().
+
+    This system may be used against just one store if so desired, so that's why
+    it's possible to specify which_store to use. But, if the system is used
+    this way, it is not possible to go back to using 'all' stores without
+    manually executing past CREATE/UPDATE/DELETE statements against the
+    remaining stores. Else, the system will throw AssertionErrors.
+    """
+    # user is probably not invoking execute_indi with a None store
+    if stores == None: # but just in case... (user probably called quick_cindi)
+        return call_with_borrowed_stores(execute_indi, statement, \
+                                         which_store=which_store)
+
+    # parse once here, every store below is handed the same IndiStatement
+    statement = parse_indi(statement)
+
+    # a CREATE of many rows is sent to each store in bulk
+    if statement.verb == 'CREATE' and len(statement.rows) > 1:
+        return execute_indi_bulk_create([statement], stores, which_store)[0]
+
+    result = []
+    if which_store.lower() == 'all' and not statement.verb == 'READ':
+        # the stores must all see writes in the same order
+        with hold_write_lock(), trace_span('execute_indi'):
+            outcomes = {}
+            try:
+                result = fan_out_stores(functools.partial( \
+                    fan_out_stores__outcome, execute_indi, outcomes), \
+                    statement, stores, False)
+            finally:
+                # recorded whether or not it failed, see append_journal()
+                with trace_span('append_journal'):
+                    append_journal([statement], outcomes)
+    elif which_store.lower() == 'all':
+        with trace_span('execute_indi'):
+            result = fan_out_stores(execute_indi, statement, stores)
+    else:
+        # a write is only answered once committed, see hold_write_lock()
+        with hold_write_lock(statement.verb != 'READ'), \
+             measure_store(which_store.lower(), 'execute'):
+            if which_store.lower() == 'mysql':
+                result.append(execute_mysql(statement, stores))
+            elif which_store.lower() == 'redis':
+                result.append(execute_redis(statement, stores))
+            elif which_store.lower() == 'postgres':
+                result.append(execute_postgres(statement, stores))
+            elif which_store.lower() == 'mongodb':
+                result.append(execute_mongo(statement, stores))
+            elif which_store.lower() == 'sqlite3':
+                result.append(execute_sqlite3(statement, stores))
+            else:
+                result.append('invalid store specified in execute_indi()')
+
+    # this is a good time to check if any of the data stores are corrupted
+    if which_store.lower() == 'all' and not compare_store_results(result):
+        LOG.error('execute_indi> result before AssertionError: %s', result)
+        metrics_count('cindi_consistency_failures_total', ('execute_indi',))
+        raise AssertionError(\
+            "A result from one store is not like the others.")
+    elif which_store.lower() == 'all':
+        # verified that all stores returned the same data, so return one copy
+        result = result[0]
+
+    return result
+
+def execute_indi_bulk_create(statements, stores=None, which_store='all'):
+    """
+    Execute many INDI CREATE statements at once. Returns a list of results.
+
+    The first argument is a list of INDI CREATE statements (strings or
+    IndiStatements), all into the same INDI table with the same FIELDS. The
+    second and third arguments are the same as execute_indi(). The result
+    holds the result of each statement, in order, as from execute_indi().
+
+    Each statement may hold many rows. Each SQL store is sent the rows with
+    executemany() and one commit, MongoDB with one insert_many(), and redis
+    with one MULTI/EXEC transaction, after the primary keys of every row are
+    allocated as one block. The rows are given the same primary keys as if
+    the statements had been evaluated one after another. Raises ValueError if
+    the statements are not alike as described.
+    """
+    if stores == None:
+        return call_with_borrowed_stores(execute_indi_bulk_create, \
+                                         statements, which_store=which_store)
+
+    statements = [parse_indi(c) for c in statements]
+    if len(statements) == 0:
+        return []
+    for indi in statements:
+        if indi.verb != 'CREATE' or indi.table != statements[0].table \
+           or indi.fields != statements[0].fields:
+            raise ValueError('Not a CREATE like the others: ' + indi.text)
+        for row in indi.rows:
+            if len(indi.fields) != len(row):
+                raise ValueError('FIELDS and VALUES differ in quantity: ' \
+                                 + indi.text)
+
+    result = []
+    if which_store.lower() == 'all':
+        # the stores must all see writes in the same order
+        with hold_write_lock(), trace_span('execute_indi_bulk_create'):
+            outcomes = {}
+            try:
+                result = fan_out_stores(functools.partial( \
+                    fan_out_stores__outcome, execute_indi_bulk_create, \
+                    outcomes), statements, stores, False)
+            finally:
+                with trace_span('append_journal'):
+                    append_journal(statements, outcomes)
+    else:
+        with measure_store(which_store.lower(), 'bulk_create'):
+            if which_store.lower() == 'mysql':
+                result.append(execute_sql__bulk_insert(statements, stores, \
+                    DEBUG_PRINT_PREFIX__MYSQL))
+            elif which_store.lower() == 'redis':
+                result.append(execute_redis__bulk_create(statements, stores))
+            elif which_store.lower() == 'postgres':
+                result.append(execute_sql__bulk_insert(statements, stores, \
+                    DEBUG_PRINT_PREFIX__POSTGRES))
+            elif which_store.lower() == 'mongodb':
+                result.append(convert_to_mongo__bulk_create(statements, \
+                                                            stores))
+            elif which_store.lower() == 'sqlite3':
+                result.append(execute_sql__bulk_insert(statements, stores, \
+                    DEBUG_PRINT_PREFIX__SQLITE3))
+            else:
+                result.append('invalid store specified in ' \
+                              + 'execute_indi_bulk_create()')
+
+    # this is a good time to check if any of the data stores are corrupted
+    if which_store.lower() == 'all' and not compare_store_results(result):
+        LOG.error('execute_indi_bulk_create> result before AssertionError: ' \
+                  + '%s', result)
+        metrics_count('cindi_consistency_failures_total', \
+                      ('execute_indi_bulk_create',))
+        raise AssertionError(\
+            "A result from one store is not like the others.")
+    elif which_store.lower() == 'all':
+        # each store's result is already one result per statement
+        return result[0]
+
+    # a CREATE has no rows, so every statement has the same result
+    return [result] * len(statements)
+
+# figure out which primary 'id' keys are affected by a statement
+# must not pass a None stores!
+def find_affected_primary_keys(statement, stores, which_store='all'):
+    """
+    Find the primary keys related to an INDI statement. Returns a list.
+
+    The first argument is an INDI statement (string or IndiStatement), the
+    second argument is a dictionary containing the stores (from
+    initialize_stores()), and the third optional argument is which store to
+    check.
+
+    This system may be used against just one store if so desired, so that's
+    why it's possible to specify which_store to use. But, if the system is
+    used this way, it is not possible to go back to using 'all' stores without
+    manually executing past CREATE/UPDATE/DELETE statements against the
+    remaining stores. Else, the system will throw AssertionErrors.
+    """
+    indi = parse_indi(statement)
+    
+    if which_store.lower() == 'all':
+        with trace_span('find_affected_primary_keys'):
+            result = fan_out_stores(find_affected_primary_keys, indi, stores)
+    else:
+        with measure_store(which_store.lower(), 'find_affected_primary_keys'):
+            result = find_affected_primary_keys__store(indi, stores, \
+                                                       which_store.lower())
+
+    # this is a good time to check if any of the data stores are corrupted.
+    if which_store.lower() == 'all' and not compare_store_results(result):
+        LOG.error('find_affected_primary_keys> result before AssertionError: ' \
+                  + '%s', result)
+        metrics_count('cindi_consistency_failures_total', \
+                      ('find_affected_primary_keys',))
+        raise AssertionError(\
+            "A list of primary keys from one store is not like the others.")
+    elif which_store.lower() == 'all':
+        # verified that all stores returned the same thing, so return just
+        # one copy
+        result = result[0]
+    
+    # don't want downstream users modifying 
+    return tuple(result)
+
+def find_affected_primary_keys__store(indi, stores, which_store):
+    """
+    Find the primary keys of an IndiStatement in one store. Returns a list.
+
+    The arguments are the same as find_affected_primary_keys(), but the
+    third is the name of one store, in lower case.
+    """
+    result = []
+    schema = stores['info'][which_store]['db']
+    query_by_value = indi.value
+
+    if which_store in ('mysql', 'postgres', 'sqlite3'):
+        # the same predicate value as convert_to_sql()
+        driver_name = which_store
+        placeholder = convert_to_sql__placeholder(driver_name)
+        statement = 'SELECT id FROM ' + indi.table + ' WHERE ' \
+            + indi.field + ' = ' + placeholder + ' ORDER BY id ASC'
+        parameters = (try_int(query_by_value),)
+        if is_group_commit_enabled():
+            # the writes not yet committed are only seen by the group
+            for row in group_commit_execute(driver_name, \
+                    [(statement, parameters)], stores, \
+                    driver_name + '> ', False):
+                result.append(row[0])
+        else:
+            metrics_count_commands(driver_name, ['SELECT'])
+            start = time.time_ns()
+            search_cursor = execute_sql__cursor(stores[driver_name], \
+                driver_name, statement, parameters)
+            for row in search_cursor:
+                result.append(row[0])
+            execute_sql__close_cursor(driver_name, search_cursor)
+            trace_native(driver_name, [statement], start)
+
+    elif which_store == 'redis':
+        search_redis = stores['redis']
+        layout = convert_to_redis__layout(stores)
+        # the 'id' field is not indexed, but each row has an 'id' cell
+        if indi.field.lower() == 'id' and layout == 'hash':
+            if search_redis.zscore(convert_to_redis__pks_key( \
+                    schema, indi.table), query_by_value) is not None:
+                result.append(int(query_by_value))
+        elif indi.field.lower() == 'id':
+            if search_redis.exists(convert_to_redis__table_prefix( \
+                    schema, indi.table) + query_by_value + '_id'):
+                result.append(int(query_by_value))
+        else:
+            for pk in convert_to_redis__find_primary_keys( \
+                    search_redis, schema, indi.table, indi.field, \
+                    query_by_value, layout):
+                result.append(int(pk))
+    elif which_store == 'mongodb':
+        result = \
+            convert_to_mongo__find_primary_keys(\
+                stores['mongodb'][schema], indi.table, indi.field, \
+                    query_by_value, True, convert_to_mongo__layout(stores))
+    else:
+        result.append('invalid store for find_affected_primary_keys()')
+
+    return result
+
+# same thing as execute_indi except it caches the result in a dictionary
+# note this calls execute_indi to perform the DDL/DQL/DML action on the store
+def execute_then_cache_indi(statement, caches, stores, which_store='all'):
+    """
+    Execute and cache an INDI statement. Returns a multi-dimensional list.
+
+    The first argument is the INDI statement as a string (or IndiStatement),
+    the second argument is the cache dictionary (as generated by
+    initialize_cache()), the third argument is the stores dictionary, and the
+    fourth optional argument is which store to evaluate the INDI statement
+    on. If the stores dictionary is
+    None, then the stores are borrowed from the process-wide connection pools,
+    but only if the statement can not be answered by the cache.
+
+    This system may be used against just one store if so desired, so that's
     why it's possible to specify which_store to use. But, if the system is
     used this way, it is not possible to go back to using 'all' stores without
     manually executing past CREATE/UPDATE/DELETE statements against the
     remaining stores. Else, the system will throw AssertionErrors.    
+
+    Each statement is counted and timed for /metrics, see measure_statement(),
+    and traced, see the tracing section.
+    """
+    with trace_span('parse'):
+        indi = parse_indi(statement)
+    with measure_statement(indi), \
+         trace_span('execute_then_cache_indi', {'cindi.statement': indi.text, \
+                                                'cindi.verb': indi.verb, \
+                                                'cindi.table': indi.table}):
+        return execute_then_cache_indi__evaluate(indi, caches, stores, \
+                                                 which_store)
+
+def execute_then_cache_indi__evaluate(indi, caches, stores, which_store='all'):
+    """
+    Execute and cache an IndiStatement. Returns a multi-dimensional list.
+
+    The same as execute_then_cache_indi(), which measures it.
     """
-    stores_was_none = False
-    
     result = None
-    c_array = statement.replace('"', "'").split()
+    statement = indi.text
 
-    # unpack the cache for this schema\table
-    command = c_array[0].upper()
-    table_name = c_array[2]
+    # unpack the cache partition for this schema\table
+    command = indi.verb
+    table_name = indi.table
     cache = caches[table_name]
-    
+    key = cache_key(indi) # the same for equivalent READ statements
+
     if command == 'READ':
-        if statement in cache:
-            print('+ Cache hit! Query is \n\t' + statement)
-            result = cache[statement][1] # "that was easy"
-        else:
-            print('+ Cache miss. Query is \n\t' + statement)
-            if stores == None:
-                stores = initialize_stores()
-                stores_was_none = True
-                
-            # the DQL is an "ALL RECORDS" query to dump the entire table
-            if c_array[3].upper() == 'ALL' and c_array[4].upper() == 'RECORDS':
-                affected_pk_tuple = (0,) # the entire table 
-            else:
-                affected_pk_tuple = \
-                    find_affected_primary_keys(statement, stores, which_store)
-            read_result = execute_indi(statement, stores, which_store)
-            cache[statement] = (affected_pk_tuple, read_result)
-            result = read_result
-    else:
-        del_list = []
+        with trace_span('cache_get') as span:
+            result = cache_get(cache, key)
+            if span is not None:
+                span['attributes']['cindi.cache_hit'] = result is not None
+        if result is not None:
+            LOG__CACHE.debug('+ Cache hit! Query is %s', statement)
+            return result
+        LOG__CACHE.debug('+ Cache miss. Query is %s', statement)
+
+        # a cache hit does not need any stores, so only borrow them for a miss
         if stores == None:
-            stores = initialize_stores()
-            stores_was_none = True
-        if command == 'CREATE':
-            print('+ Deleting cached ALL RECORDS statement, for ' + statement)
-            del_list = []
-            # search for DQL's with tables to be affected by this 'CREATE'
-            for dql in cache.keys():
-                if cache[dql][0] == (0,) and \
-                   table_name == dql.split()[2] : # an 'ALL RECORDS' statement?
-                    del_list.append(dql)
-            # run the CREATE
-            result = execute_indi(statement, stores, which_store)
-        elif command == 'UPDATE' or command == 'DELETE':
-            affected_pk_tuple = \
-                find_affected_primary_keys(statement, stores, which_store)
-            del_list = []
-            # expensive O(n^2), but there could be many cached READ's affected!
-            for affected_pk in affected_pk_tuple:
-                for dql in cache.keys():
-                    if (affected_pk in cache[dql][0] or cache[dql][0] == (0,)) \
-                       and dql.split()[2] == table_name:
-                        del_list.append(dql)     
-            # run the UPDATE
-            result = execute_indi(statement, stores, which_store)
-        else:
-            print('+ Invalid INDI command: ' + statement)
-            result = [ 'Invalid INDI command.', statement ]
-            
-        # ? if the execute_indi fails, the cache might not be deleted, keep
-        # this in mind when making CINDI fault-tolerant later!
-        if len(del_list) > 0:
-            # delete the found cached DQL's
+            return call_with_borrowed_stores(execute_then_cache_indi__miss, \
+                                             indi, cache, \
+                                             which_store=which_store)
+        return execute_then_cache_indi__miss(indi, cache, stores, which_store)
+
+    if stores == None:
+        return call_with_borrowed_stores(execute_then_cache_indi__evaluate, \
+                                         indi, caches, \
+                                         which_store=which_store)
+    else:
+        # the affected keys must not change before the write is evaluated
+        with hold_write_lock():
+            affected_pk_tuple = ()
+            if command == 'UPDATE' or command == 'DELETE':
+                affected_pk_tuple = \
+                    find_affected_primary_keys(indi, stores, which_store)
+            try:
+                result = execute_indi(indi, stores, which_store)
+            finally:
+                # a failed write may have landed in some of the stores.
+                # a CREATE only affects the cached ALL RECORDS statements.
+                del_list = cache_invalidate(cache, affected_pk_tuple)
+
             for dql in del_list:
-                if dql in cache: # it may have been deleted already
-                    print('+ Deleting cached DQL result \n\t ' \
-                      + dql + ' \n\tBecause it is affected by \n\t ' \
-                           + statement)
-                    del cache[dql]
+                LOG__CACHE.debug('+ Deleting cached DQL result %s because ' \
+                                 + 'it is affected by %s', dql, statement)
+
+    return result
+
+def execute_then_cache_indi_bulk_create(statements, caches, stores=None, \
+                                        which_store='all'):
+    """
+    Execute many INDI CREATE statements at once, and uncache. Returns a list.
+
+    The same as execute_indi_bulk_create(), with the cache dictionary as the
+    second argument, whose cached ALL RECORDS statements of the table are
+    forgotten.
+    """
+    if stores == None:
+        return call_with_borrowed_stores(execute_then_cache_indi_bulk_create, \
+                                         statements, caches, \
+                                         which_store=which_store)
+
+    with trace_span('parse'):
+        statements = [parse_indi(c) for c in statements]
+    if len(statements) == 0:
+        return []
+    table_name = statements[0].table
+
+    # the same as execute_then_cache_indi(), for many CREATEs at once
+    with measure_statement(statements[0], len(statements)), \
+         trace_span('execute_then_cache_indi_bulk_create', \
+                    {'cindi.statements': len(statements), \
+                     'cindi.table': table_name}), \
+         hold_write_lock():
+        try:
+            result = execute_indi_bulk_create(statements, stores, which_store)
+        finally:
+            del_list = cache_invalidate(caches[table_name])
+
+    for dql in del_list:
+        LOG__CACHE.debug('+ Deleting cached DQL result %s because it is ' \
+                         + 'affected by %s CREATEs into %s', dql, \
+                         len(statements), table_name)
+
+    return result
+
+def execute_indi_batch__plan(statements, ordered=True):
+    """
+    Group a batch of IndiStatements for evaluation. Returns a list of lists.
+
+    Each group is a list of indexes into statements, and the groups are in
+    the order to evaluate them. A group is either one statement, or CREATEs
+    into the same INDI table with the same FIELDS, see execute_indi_batch().
+    """
+    groups = []
+    open_groups = {} # (table, FIELDS) -> the group its CREATEs join
+    for i, indi in enumerate(statements):
+        if indi.verb != 'CREATE':
+            groups.append([i])
+            if ordered:
+                open_groups = {}
+            continue
+
+        group_key = (indi.table, indi.fields)
+        if group_key in open_groups:
+            open_groups[group_key].append(i)
+        else:
+            if ordered:
+                open_groups = {}
+            open_groups[group_key] = [i]
+            groups.append(open_groups[group_key])
+
+    return groups
+
+def execute_indi_batch(statements, caches, stores=None, ordered=True, \
+                       which_store='all'):
+    """
+    Execute and cache a list of INDI statements. Returns a list of results.
+
+    The first argument is the list of INDI statements (strings or
+    IndiStatements), the second is the cache dictionary. The third is the
+    stores dictionary, by default borrowed once for the whole batch (unless
+    every statement is a cached READ). The fourth is whether the statements
+    must be evaluated in the order given, and the fifth is the same as
+    execute_then_cache_indi(). The result holds the result of each statement,
+    in the order given.
+
+    Every statement is parsed before any is evaluated, so an invalid batch
+    raises ValueError without evaluating anything. CREATEs into the same
+    table with the same FIELDS are evaluated together, by
+    execute_indi_bulk_create(): when ordered, only those following one
+    another, otherwise all of them, in the place of the first. The others
+    are evaluated by execute_then_cache_indi(), one after another.
+    """
+    statements = [parse_indi(c) for c in statements]
+    for indi in statements:
+        if not is_indi_fields_and_values_alike(indi):
+            raise ValueError('FIELDS and VALUES differ in quantity: ' \
+                             + indi.text)
+
+    # the leading READs which the cache answers do not need any stores, the
+    # stores are borrowed once for the rest of the batch
+    if stores == None:
+        results = []
+        for indi in statements:
+            cache = caches[indi.table]
+            if indi.verb != 'READ' or cache_get(cache, cache_key(indi), \
+                                                True) is None:
+                break
+            result = cache_get(cache, cache_key(indi))
+            if result is None: # it was dropped since the peek
+                break
+            LOG__CACHE.debug('+ Cache hit! Query is %s', indi.text)
+            results.append(result)
+        if len(results) < len(statements):
+            results.extend(call_with_borrowed_stores(execute_indi_batch, \
+                statements[len(results):], caches, ordered=ordered, \
+                which_store=which_store))
+        return results
+
+    results = [None] * len(statements)
+    for group in execute_indi_batch__plan(statements, ordered):
+        indi = statements[group[0]]
+        if indi.verb != 'CREATE':
+            results[group[0]] = \
+                execute_then_cache_indi(indi, caches, stores, which_store)
+            continue
+
+        these_results = execute_then_cache_indi_bulk_create( \
+            [statements[i] for i in group], caches, stores, which_store)
+        for i, this_result in pairlis(group, these_results):
+            results[i] = this_result
 
-    # close the stores if necessary
-    if stores_was_none:
-        close_stores(stores)
+    return results
 
+def execute_then_cache_indi__miss(indi, cache, stores, which_store='all'):
+    """
+    Evaluate a READ which missed the cache, then cache it. Returns a list.
+    """
+    epoch = cache_epoch(cache)
+    # the DQL is an "ALL RECORDS" query to dump the entire table
+    if indi.all_records:
+        affected_pk_tuple = (0,) # the entire table 
+    else:
+        affected_pk_tuple = \
+            find_affected_primary_keys(indi, stores, which_store)
+    result = execute_indi(indi, stores, which_store)
+    cache_put(cache, cache_key(indi), affected_pk_tuple, result, epoch)
     return result
 
-# is statement likely to be an INDI statement?
-# this does not verify 100% that the syntax is valid.
+# the generator-based READ of each store, see stream_indi()
+STREAM__DRIVERS = {
+    'mysql': execute_mysql__stream,
+    'postgres': execute_postgres__stream,
+    'sqlite3': execute_sqlite3__stream,
+    'mongodb': execute_mongo__stream,
+    'redis': execute_redis__stream }
+
+def stream_indi(statement, stores=None, which_store='all'):
+    """
+    Read the rows of an INDI READ from the stores. Returns a generator.
+
+    The arguments are the same as execute_indi(), and the rows are the same
+    as in its result, but each row is read from the stores when the generator
+    reaches it, so a large READ is never all held at once.
+
+    When reading from 'all' stores, each store is read one row at a time in
+    turn, and AssertionError is raised at the first row which is not the same
+    in every store. The rows before it have already been generated. The
+    'timeout' of the stores does not apply. If the stores are borrowed, they
+    are held until the generator finishes or is closed.
+    """
+    if stores == None:
+        pools = get_global_pools()
+        stores = borrow_stores(pools)
+        try:
+            yield from stream_indi(statement, stores, which_store)
+        except BaseException:
+            # closed part way through, the cursors may still hold rows
+            return_stores(pools, stores, discard=True)
+            raise
+        return_stores(pools, stores)
+        return
+
+    indi = parse_indi(statement)
+    if indi.verb != 'READ':
+        raise ValueError('Only a READ may be streamed: ' + indi.text)
+
+    if which_store.lower() == 'all':
+        store_names = [k for k in stores.keys() if k.lower() != 'info']
+    elif which_store.lower() in STREAM__DRIVERS:
+        store_names = [which_store.lower()]
+    else:
+        raise ValueError('invalid store specified in stream_indi()')
+
+    metrics_count('cindi_statements_total', (indi.verb, indi.table))
+    streams = [STREAM__DRIVERS[k](indi, stores) for k in store_names]
+    try:
+        for rows in itertools.zip_longest(*streams):
+            # a good time to check if any of the data stores are corrupted
+            if not is_all_list_elements_equal(rows):
+                LOG.error('stream_indi> rows before AssertionError: %s', \
+                          dict(pairlis(store_names, rows)))
+                metrics_count('cindi_consistency_failures_total', \
+                              ('stream_indi',))
+                raise AssertionError(\
+                    "A result from one store is not like the others.")
+            yield rows[0]
+    finally:
+        # each store's cursor is closed before its connection is returned
+        for stream in streams:
+            stream.close()
+
+# is statement an INDI statement? the parse is cached, so when the statement
+# is evaluated right afterwards it will not be parsed a second time.
 def is_indi_statement(statement):
     """
-    Does the passed argument string resemble an INDI? Returns a boolean.
+    Does the passed argument string follow the INDI grammar? Returns a boolean.
+
+    This does not check whether the table or fields exist in any store.
+    """
+    try:
+        parse_indi(statement)
+        return True
+    except ValueError:
+        return False
+
+def is_indi_fields_and_values_alike(indi):
+    """
+    Does each VALUES have as many values as FIELDS? Returns a boolean.
+
+    The argument is an IndiStatement. Every row of a CREATE is checked, as
+    are the VALUES of an UPDATE, other statements have no VALUES.
+    """
+    if indi.verb == 'CREATE':
+        return all(len(indi.fields) == len(row) for row in indi.rows)
+    elif indi.verb == 'UPDATE':
+        return len(indi.fields) == len(indi.values)
+    return True
+
+def replay_journal(which_store, stores=None, directory=None, after_seq=None, \
+                   checkpoint_path=None):
+    """
+    Evaluate the writes in the journal on one store. Returns a sequence number.
+
+    The first argument is the store to write to, such as 'redis', the second
+    is the stores dictionary, by default borrowed from the process-wide
+    connection pools. The third is the journal directory, by default the
+    'journal_directory' setting. The result is the sequence number of the
+    last record evaluated, or of the checkpoint if there was none to evaluate.
+
+    The records are evaluated in order, from the one after after_seq, or by
+    default after the checkpoint, a JSON file at checkpoint_path, by default
+    'replay_<store>.json' in the journal directory. A record is skipped if it
+    failed in every store. Up to REPLAY__BATCH_SIZE records are evaluated at
+    a time, CREATEs into the same table with the same FIELDS which follow one
+    another in bulk (see execute_indi_bulk_create()). The checkpoint is saved
+    once each bulk CREATE or other record is committed, since a CREATE which
+    is evaluated twice creates its rows twice. So if a record fails, or the
+    process dies, calling this again resumes with the first record which was
+    not committed.
+
+    A store which is behind is brought up to date from the sequence number
+    of the last write it saw, and a new (empty) store is rebuilt from the
+    beginning of the journal. The other stores are not written, and nothing
+    is journaled, so no other writes should be evaluated meanwhile. Raises
+    ValueError if which_store is 'all'.
+    """
+    if which_store.lower() == 'all':
+        raise ValueError('A journal is replayed on one store at a time.')
+    if stores == None:
+        return call_with_borrowed_stores(replay_journal, which_store, \
+                                         directory=directory, \
+                                         after_seq=after_seq, \
+                                         checkpoint_path=checkpoint_path)
+    if directory is None:
+        directory = global_settings['journal_directory']
+    if checkpoint_path is None:
+        checkpoint_path = os.path.join(directory, \
+                                       'replay_' + which_store + '.json')
+    if after_seq is None:
+        after_seq = replay_journal__checkpoint(checkpoint_path)
+
+    last_seq = after_seq
+    records = read_journal(directory, after_seq)
+    try:
+        while True:
+            these_records = list(itertools.islice(records, REPLAY__BATCH_SIZE))
+            if len(these_records) == 0:
+                break
+            batch = [record for record in these_records \
+                     if 'ok' in record['stores'].values()]
+            statements = [parse_indi(record['statement']) for record in batch]
+            for group in execute_indi_batch__plan(statements):
+                # the group is committed before it is checkpointed
+                with hold_write_lock():
+                    if len(group) > 1:
+                        execute_indi_bulk_create( \
+                            [statements[i] for i in group], stores, \
+                            which_store)
+                    else:
+                        execute_indi(statements[group[0]], stores, \
+                                     which_store)
+                last_seq = batch[group[-1]]['seq']
+                replay_journal__save_checkpoint(checkpoint_path, \
+                                                which_store, last_seq)
+            if these_records[-1]['seq'] != last_seq:
+                # the batch ends with records which failed in every store
+                last_seq = these_records[-1]['seq']
+                replay_journal__save_checkpoint(checkpoint_path, \
+                                                which_store, last_seq)
+            LOG.info('Replayed the journal on %s up to %s', which_store, \
+                     last_seq)
+    finally:
+        records.close()
+    return last_seq
+
+def replay_journal__checkpoint(checkpoint_path):
+    """
+    Read the checkpoint of replay_journal(). Returns a sequence number.
 
-    Warning, this is a cheap test, it does not perfectly identify whether a
-    string is an INDI statement or not.
+    Returns 0 if there is no checkpoint yet.
     """
-    c_array = statement.split()
-    return (c_array[0].upper() == 'READ' \
-            or c_array[0].upper() == 'CREATE' \
-            or c_array[0].upper() == 'UPDATE' \
-            or c_array[0].upper() == 'DELETE') \
-            and c_array[1].upper() == 'IN'
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            return json.load(f)['seq']
+    except FileNotFoundError:
+        return 0
+
+def replay_journal__save_checkpoint(checkpoint_path, which_store, seq):
+    """
+    Save the checkpoint of replay_journal(). Returns void.
+
+    The file is replaced at once, so it is never left half-written.
+    """
+    with open(checkpoint_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'store': which_store, 'seq': seq}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(checkpoint_path + '.tmp', checkpoint_path)
 
 # end higher-order functions
 # ------------------------------------------------------------------------------
@@ -1362,6 +4936,123 @@ def read_tables_dot_txt():
         exit(61) # "common exit code 61: no data available"
     return tables
 
+# settings.txt tunes CINDI itself, rather than the stores. unlike the other
+# two files, it is optional, and any setting it omits keeps its default.
+def read_settings_dot_txt():
+    """
+    Read the optional 'config/settings.txt' file. Returns a dictionary.
+
+    The result is SETTINGS__DEFAULTS, updated with whatever the file defines.
+    Warning, this will exit if the file exists but can not be parsed.
+    """
+    settings = dict(SETTINGS__DEFAULTS)
+    try:
+        settings_dot_txt = open('config/settings.txt', 'r', encoding='utf-8')
+        file_settings = eval(settings_dot_txt.read())
+        settings_dot_txt.close()
+        if not isinstance(file_settings, dict):
+            raise TypeError('config/settings.txt not a dictionary.')
+        settings.update(file_settings)
+    except FileNotFoundError:
+        pass # every setting keeps its default
+    except (SyntaxError, TypeError, BaseException):
+        print('config/settings.txt not a dictionary, check the CINDI README.')
+        exit(61) # "common exit code 61: no data available"
+    return settings
+
+def connect_store(store_name, conns):
+    """
+    Open a new connection to one store in stores.txt. Returns a connection.
+
+    The first argument is the store name (such as 'mysql' or 'sqlite3'), and
+    the second argument is the dictionary read from 'config/stores.txt'.
+
+    Raises BaseException if the driver library for the store is not
+    installed, or whichever exception the driver library raises if the
+    connection could not be established.
+    """
+    store_info = conns[store_name]
+
+    if store_name == 'postgres':
+        if not DRIVER_AVAILABLE_POSTGRESQL:
+            raise BaseException('PostgreSQL library not installed.')
+        postgres_string = \
+            "host=" + store_info['host'] + " " + \
+            "dbname=" + store_info['db'] + " " + \
+            "user=" + store_info['user'] + " " + \
+            "password= " + store_info['password'] + " "
+        connection = psycopg.connect(postgres_string)
+        connection.prepared_max = SQL__PREPARED_STATEMENTS
+        return connection
+    elif store_name == 'mysql':
+        if not DRIVER_AVAILABLE_MYSQL:
+            raise BaseException('MySQL library not installed.')
+        return mysql.connector.connect( \
+                    host=store_info['host'], \
+                    user=store_info['user'], \
+                    password=store_info['password'], \
+                    database=store_info['db'])
+    elif store_name == 'sqlite3':
+        filename = store_info['sqlite3_file_prefix'] + store_info['db'] + '.db'
+        pragmas = []
+        for pragma, allowed in (('journal_mode', SQLITE3__JOURNAL_MODES), \
+                                ('synchronous', SQLITE3__SYNCHRONOUS_LEVELS)):
+            if not pragma in store_info:
+                continue # the file (or SQLite3) keeps its own
+            if not str(store_info[pragma]).lower() in allowed:
+                raise BaseException('Unsupported sqlite3 ' + pragma + ' ' \
+                                    + str(store_info[pragma]) + '.')
+            pragmas.append('PRAGMA ' + pragma + ' = ' \
+                           + str(store_info[pragma]).lower())
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        # pooled connections are handed to whichever thread borrows them
+        connection = sqlite3.connect(filename, check_same_thread=False, \
+                                     cached_statements=SQL__PREPARED_STATEMENTS)
+        # 'wal' lets READs go on while a write is being committed, and with
+        # it, 'normal' only syncs the disk at checkpoints rather than at every
+        # commit (a crash may lose the last commits, but never corrupts)
+        for pragma in pragmas:
+            connection.execute(pragma)
+        return connection
+    elif store_name == 'mongodb':
+        if not DRIVER_AVAILABLE_MONGODB:
+            raise BaseException('MongoDB library not installed.')
+        if not store_info.get('layout', 'cell') in MONGO__LAYOUTS:
+            raise BaseException('Unsupported mongodb layout ' \
+                                + str(store_info['layout']) + '.')
+        mongo_uri = "mongodb://" + store_info['user'] + \
+            ":" + urllib.parse.quote(store_info['password']) + \
+            "@" + store_info['host'] + \
+            ":" + str(store_info['port']) + \
+            "/" + store_info['db']
+        # the MongoClient is thread-safe and pools its own sockets
+        return pymongo.MongoClient(mongo_uri, \
+            minPoolSize=get_pool_setting(conns, store_name, 'pool_min_size'), \
+            maxPoolSize=get_pool_setting(conns, store_name, 'pool_max_size'), \
+            maxIdleTimeMS=1000 * get_pool_setting(conns, store_name, \
+                                                  'pool_idle_seconds'))
+    elif store_name == 'redis':
+        if not DRIVER_AVAILABLE_REDIS:
+            raise BaseException('Redis library not installed.')
+        if not store_info.get('layout', 'cell') in REDIS__LAYOUTS:
+            raise BaseException('Unsupported redis layout ' \
+                                + str(store_info['layout']) + '.')
+        # the Redis client is thread-safe and pools its own sockets. once
+        # every socket is in use, a borrower waits up to 'pool_timeout' for
+        # one to free up, rather than failing with 'Too many connections'.
+        return redis.Redis(connection_pool=redis.BlockingConnectionPool( \
+                    host=store_info['host'], \
+                    port=store_info['port'], \
+                    db=store_info['redisDb'], \
+                    max_connections=get_pool_setting(conns, store_name, \
+                                                     'pool_max_size'), \
+                    timeout=get_pool_setting(conns, store_name, \
+                                             'pool_timeout'), \
+                    health_check_interval=get_pool_setting(conns, store_name, \
+                                                     'pool_check_seconds')))
+    else:
+        raise BaseException('Unsupported store ' + store_name + '.')
+
 def initialize_stores(exit_on_failure=True):
     """
     Initialize the database stores dictionary. Returns a dictionary.
@@ -1373,6 +5064,9 @@ def initialize_stores(exit_on_failure=True):
     server/store it points to. If a supported store is ommited in the file,
     that's okay, it will not be initialized. If an unsupported store is
     referenced, that's okay too, it will not know to try to initialize it.
+
+    Each call opens brand new connections, which the caller must close with
+    close_stores(). To share connections between calls, see borrow_stores().
     """
     result = {}
     
@@ -1384,78 +5078,15 @@ def initialize_stores(exit_on_failure=True):
     # export stores.txt since most functions need the actual used db name 
     result['info'] = conns
 
-    # postgres 
-    try:
-        if DRIVER_AVAILABLE_POSTGRESQL and 'postgres' in conns:
-            postgres_string = \
-                "host=" + conns['postgres']['host'] + " " + \
-                "dbname=" + conns['postgres']['db'] + " " + \
-                "user=" + conns['postgres']['user'] + " " + \
-                "password= " + conns['postgres']['password'] + " "
-            result['postgres'] =  psycopg.connect(postgres_string)
-        elif not DRIVER_AVAILABLE_POSTGRESQL and 'postgres' in conns:
-            raise BaseException('PostgreSQL library not installed.')
-    except BaseException:
-        print('Failed to initialize PostgreSQL connection.')
-        if exit_on_failure:
-            exit(49) # 'common error 49: protocol not attached'
-
-    # mysql
-    try:
-        if DRIVER_AVAILABLE_MYSQL and 'mysql' in conns:
-            result['mysql'] = mysql.connector.connect( \
-                    host=conns['mysql']['host'], \
-                    user=conns['mysql']['user'], \
-                    password=conns['mysql']['password'], \
-                    database=conns['mysql']['db'])
-        elif not DRIVER_AVAILABLE_MYSQL and 'mysql' in conns:
-            raise BaseException('MySQL library not installed.')
-    except BaseException:
-        print('Failed to initialize MySQL connection.')
-        if exit_on_failure:
-            exit(49) # 'common error 49: protocol not attached'
-
-    # sqlite3
-    try:
-        if 'sqlite3' in conns:
-            filename = conns['sqlite3']['sqlite3_file_prefix'] \
-                + conns['sqlite3']['db'] + '.db'
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-            result['sqlite3'] = sqlite3.connect(filename)
-    except BaseException:
-        print('Failed to initialize sqlite3 connection, file not found?')
-        if exit_on_failure:
-            exit(49) # 'common error 49: protocol not attached'
-        
-    # mongo
-    try:
-        if DRIVER_AVAILABLE_MONGODB and 'mongodb' in conns:
-            mongo_uri = "mongodb://" + conns['mongodb']['user'] + \
-                ":" + urllib.parse.quote(conns['mongodb']['password']) + \
-                "@" + conns['mongodb']['host'] + \
-                ":" + str(conns['mongodb']['port']) + \
-                "/" + conns['mongodb']['db']
-            result['mongodb'] = pymongo.MongoClient(mongo_uri)
-        elif not DRIVER_AVAILABLE_MONGODB and 'mongodb' in conns:
-            raise BaseException('MongoDB library not installed.')
-    except BaseException:
-        print('Failed to initialize MongoDB connection.')
-        if exit_on_failure:
-            exit(49) # 'common error 49: protocol not attached'
-
-    # redis
-    try:
-        if DRIVER_AVAILABLE_REDIS and 'redis' in conns:
-            result['redis'] = redis.Redis( \
-                            host=conns['redis']['host'], \
-                            port=conns['redis']['port'], \
-                            db=conns['redis']['redisDb'])
-        elif not DRIVER_AVAILABLE_REDIS and 'redis' in conns:
-            raise BaseException('Redis library not installed.')
-    except BaseException:
-        print('Failed to initialize redis connection.')
-        if exit_on_failure:
-            exit(49) # 'common error 49: protocol not attached'
+    for store_name in SUPPORTED_STORES:
+        if not store_name in conns:
+            continue
+        try:
+            result[store_name] = connect_store(store_name, conns)
+        except BaseException:
+            LOG.error(ERROR__STORE_CONNECTION_FAILED[store_name])
+            if exit_on_failure:
+                exit(49) # 'common error 49: protocol not attached'
 
     # all desired connections initialized!
     return result
@@ -1468,12 +5099,12 @@ def close_stores(stores, which_store='all'):
     The second optional argument specifies which store to close.
     """
     if stores == None:
-        print('WARNING: Invoked close_stores when stores=None !')
+        LOG.warning('Invoked close_stores when stores=None !')
         return
     
     if which_store.lower() == 'all':
         for k in stores.keys():
-            if k.lower() == 'info':
+            if k.lower() == 'info' or stores[k] is None: # None if abandoned
                 continue
             else:
                 close_stores(stores, k.lower())
@@ -1488,24 +5119,478 @@ def close_stores(stores, which_store='all'):
     elif which_store.lower() == 'sqlite3':
         stores[which_store].close()
     else:
-        print('invalid store ' + which_store + ' specified in close_stores()')  
+        LOG.warning('invalid store %s specified in close_stores()', \
+                    which_store)  
+
+# initialize the cache after checking config/tables.txt
+def initialize_cache(settings=None, table_names=None):
+    """
+    Returns a dictionary, for using with execute_then_cache_indi().
+
+    The dictionary will have a slot for each INDI table specified in the
+    configuration 'config/tables.txt' file. Each slot is the table's own
+    cache partition, as described at the beginning of the READ cache section.
+    The first optional argument is the settings dictionary, by default the
+    settings read from 'config/settings.txt', the second is the list of INDI
+    tables, by default the one read from 'config/tables.txt'.
+
+    Warning, this will exit if the cache settings are not valid.
+    """
+    if settings is None:
+        settings = global_settings
+    if not settings['cache_policy'] in CACHE__POLICIES:
+        print('cache_policy must be one of ' + str(CACHE__POLICIES) \
+              + ', check the CINDI README.')
+        exit(61) # "common exit code 61: no data available"
+
+    cache_settings = {k: v for k, v in settings.items() \
+                      if k.startswith('cache_')}
+    budget = {'entries': 0, 'bytes': 0, 'partitions': [], \
+              'lock': threading.Lock()}
+    result = {}
+    if table_names is None:
+        table_names = read_tables_dot_txt()
+    for table_name in table_names:
+        result[table_name] = { \
+            'table': table_name, \
+            'entries': collections.OrderedDict(), \
+            'by_pk': {}, \
+            'all_records': set(), \
+            'by_predicate': {}, \
+            'bytes': 0, \
+            'stats': {'hits': 0, 'misses': 0, 'projections': 0, \
+                      'evictions': 0, 'expirations': 0, 'invalidations': 0}, \
+            'settings': cache_settings, \
+            'epoch': 0, \
+            'shared_epoch': None, \
+            'budget': budget, \
+            'lock': threading.RLock()}
+        budget['partitions'].append(result[table_name])
+    return result
+
+# the thread which formats and writes out the records of every logger, see
+# initialize_logging()
+global_log_listener = None
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    A QueueHandler which leaves the formatting to the QueueListener.
+
+    The records never leave this process, so unlike with QueueHandler, their
+    messages need not be formatted before they are queued. The arguments of
+    a message are formatted as they are once the record is written, so they
+    must not be changed after they are logged.
+    """
+    def prepare(self, record):
+        return record
+
+def initialize_logging(settings=None):
+    """
+    Set the levels of the loggers, and where they log to. Returns void.
+
+    The optional argument is the settings dictionary, by default the settings
+    read from 'config/settings.txt'. Every logger under 'cindi' is set to the
+    'log_level' setting, then each logger named in 'log_levels' to its own
+    level. With the 'log_queue' setting, the thread which logs a record only
+    puts it on a queue, and the record is formatted with 'log_format' and
+    written to stdout by the thread of a QueueListener, so a statement never
+    waits on stdout. Otherwise the records are handed to the handlers of the
+    application, as configured with the logging module.
+
+    Warning, this will exit if a level is not valid.
+    """
+    global global_log_listener
+    if settings is None:
+        settings = global_settings
+    try:
+        LOG.setLevel(settings['log_level'])
+        for logger in LOG__SUBSYSTEMS:
+            logger.setLevel(logging.NOTSET) # the same as 'cindi'
+        for name, level in settings['log_levels'].items():
+            logging.getLogger(name).setLevel(level)
+    except (ValueError, TypeError, AttributeError):
+        print('log_level and log_levels must be logging levels, check the ' \
+              + 'CINDI README.')
+        exit(61) # "common exit code 61: no data available"
+
+    stop_logging()
+    if not settings['log_queue']:
+        LOG.propagate = True
+        return
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(settings['log_format']))
+    global_log_listener = logging.handlers.QueueListener(records, handler)
+    global_log_listener.start()
+    LOG.addHandler(LogQueueHandler(records))
+    LOG.propagate = False
+
+def stop_logging():
+    """
+    Write out the queued records, and stop logging to stdout. Returns void.
+    """
+    global global_log_listener
+    for handler in list(LOG.handlers):
+        if isinstance(handler, LogQueueHandler):
+            LOG.removeHandler(handler)
+    if global_log_listener is not None:
+        global_log_listener.stop()
+        global_log_listener = None
+
+# end database and cache initialization section
+# ------------------------------------------------------------------------------
+# begin connection pool section
+# initialize_stores() opens a fresh connection to every store, and
+# close_stores() tears them down again. doing that for every INDI statement
+# costs more than most statements do, so quick_cindi() borrows connections
+# from process-wide pools instead. a borrowed stores dictionary has the same
+# shape as the result of initialize_stores(), so the drivers do not know the
+# difference.
+
+def get_pool_setting(conns, store_name, setting):
+    """
+    Look up a pool setting for a store in stores.txt. Returns a number.
+
+    The first argument is the dictionary read from 'config/stores.txt', the
+    second is the store name, and the third is the setting name, which must be
+    a key in POOL__DEFAULT_SETTINGS. The default is used if stores.txt does not
+    override the setting for the store.
+    """
+    return conns[store_name].get(setting, POOL__DEFAULT_SETTINGS[setting])
+
+def is_store_connection_healthy(store_name, connection):
+    """
+    Check whether a pooled connection is still usable. Returns a boolean.
+
+    The first argument is the store name, the second is the connection (as
+    returned by connect_store()) to check. A cheap round-trip is made to the
+    store, so this should not be called for every borrow.
+    """
+    try:
+        if store_name == 'mysql':
+            return connection.is_connected()
+        elif store_name == 'postgres':
+            if connection.closed or connection.broken:
+                return False
+            connection.execute('SELECT 1').fetchall()
+            connection.rollback()
+        elif store_name == 'sqlite3':
+            connection.execute('SELECT 1').fetchall()
+        elif store_name == 'mongodb':
+            connection.admin.command('ping')
+        elif store_name == 'redis':
+            connection.ping()
+        return True
+    except BaseException:
+        return False
+
+def reset_store_connection(store_name, connection):
+    """
+    Discard any open transaction before a connection is re-pooled. Returns void.
+
+    A SELECT without a COMMIT leaves a transaction open on the SQL stores, and
+    under MySQL's REPEATABLE READ the next borrower would be handed a stale
+    snapshot. The client libraries of the shared stores need no reset.
+    """
+    if store_name in ('mysql', 'postgres', 'sqlite3'):
+        connection.rollback()
+
+def close_store_connection(store_name, connection):
+    """
+    Close one connection, ignoring any error while doing so. Returns void.
+    """
+    try:
+        connection.close()
+    except BaseException:
+        LOG.warning('Failed to cleanly close a %s connection.', store_name)
+
+def initialize_pool(store_name, conns):
+    """
+    Initialize the connection pool for one store. Returns a dictionary.
+
+    The first argument is the store name, the second is the dictionary read
+    from 'config/stores.txt'. The pool opens 'pool_min_size' connections
+    right away, any exception raised by connect_store() is left to the caller.
+    """
+    pool = {
+        'store': store_name,
+        'info': conns,
+        'condition': threading.Condition(),
+        'shared': store_name in POOL__SHARED_STORES,
+        'idle': [], # (connection, last returned, last checked), oldest first
+        'size': 0, # quantity of open connections, both idle and borrowed
+        'closed': False }
+
+    for setting in POOL__DEFAULT_SETTINGS.keys():
+        pool[setting] = get_pool_setting(conns, store_name, setting)
+
+    # a shared client is lent to every borrower, so one is always enough
+    min_size = 1 if pool['shared'] else pool['pool_min_size']
+    for i in range(0, min_size):
+        now = time.monotonic()
+        pool['idle'].append((connect_store(store_name, conns), now, now))
+        pool['size'] += 1
+
+    return pool
+
+def pool_evict_idle(pool):
+    """
+    Close the pool's connections which idled for too long. Returns void.
+
+    The pool's condition must already be held by the caller. Connections are
+    only evicted while there are more than 'pool_min_size' of them open.
+    """
+    now = time.monotonic()
+    while len(pool['idle']) > 0 and pool['size'] > pool['pool_min_size'] \
+          and now - pool['idle'][0][1] > pool['pool_idle_seconds']:
+        connection = pool['idle'].pop(0)[0]
+        pool['size'] -= 1
+        close_store_connection(pool['store'], connection)
+
+def pool_borrow(pool):
+    """
+    Borrow a connection from a pool. Returns a connection.
+
+    Idle connections are lent out most-recently-used first, and a connection
+    which idled longer than 'pool_check_seconds' is health-checked before it
+    is lent. If all 'pool_max_size' connections are already borrowed, wait up
+    to 'pool_timeout' seconds for one to be returned, then raise TimeoutError.
+    The one client of a shared store (see POOL__SHARED_STORES) is lent to
+    every borrower as-is.
+
+    Every connection borrowed must be handed back with pool_return().
+    """
+    deadline = time.monotonic() + pool['pool_timeout']
+    condition = pool['condition']
+
+    while True:
+        connection = None
+        must_check = False
+        must_open = False
+
+        with condition:
+            if pool['closed']:
+                raise BaseException('Borrowed from a closed ' \
+                                    + pool['store'] + ' pool.')
+            if pool['shared'] and len(pool['idle']) > 0:
+                # every borrower may use the one client at the same time, so
+                # it is never checked nor discarded while others may be using
+                # it, the client library reconnects its own sockets instead.
+                return pool['idle'][-1][0]
+            elif not pool['shared'] and len(pool['idle']) > 0:
+                # the most recently used connection is the warmest
+                connection, last_used, last_checked = pool['idle'].pop()
+                must_check = \
+                    time.monotonic() - last_checked > pool['pool_check_seconds']
+                pool_evict_idle(pool)
+            elif pool['size'] < pool['pool_max_size']:
+                pool['size'] += 1
+                must_open = True
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not condition.wait(remaining):
+                    raise TimeoutError('Timed out waiting for a ' \
+                                       + pool['store'] + ' connection.')
+                continue
+
+        # the network round-trips happen without holding the condition
+        if must_open:
+            try:
+                connection = connect_store(pool['store'], pool['info'])
+            except BaseException:
+                with condition:
+                    pool['size'] -= 1
+                    condition.notify()
+                raise
+            if pool['shared']:
+                now = time.monotonic()
+                with condition:
+                    pool['idle'].append((connection, now, now))
+            return connection
+
+        if must_check:
+            if is_store_connection_healthy(pool['store'], connection):
+                return connection
+            pool_return(pool, connection, discard=True)
+            continue # try again with another connection
+
+        return connection
+
+def pool_return(pool, connection, discard=False):
+    """
+    Return a borrowed connection to its pool. Returns void.
+
+    The first argument is the pool, the second is the connection from
+    pool_borrow(). If the optional third argument is True, or the connection
+    can not be reset, then the connection is closed instead of re-pooled
+    (except for the client of a shared store). A None connection is
+    accepted, and releases the connection's slot.
+    """
+    condition = pool['condition']
+
+    if pool['shared']:
+        # the client was never taken out of the pool, and is not closed even
+        # if discarded, since other borrowers may be using it at this moment.
+        # it reconnects by itself, and is closed along with the pool.
+        return
+
+    if connection is not None and not discard:
+        try:
+            reset_store_connection(pool['store'], connection)
+        except BaseException:
+            discard = True
+
+    with condition:
+        if connection is None or discard or pool['closed']:
+            pool['size'] -= 1
+        else:
+            now = time.monotonic()
+            # the reset round-trip succeeded, so it counts as a health check
+            pool['idle'].append((connection, now, now))
+            connection = None
+            pool_evict_idle(pool)
+        condition.notify()
+
+    if connection is not None:
+        close_store_connection(pool['store'], connection)
+
+def close_pool(pool):
+    """
+    Close every idle connection in the pool, and the pool itself. Returns void.
+
+    Connections which are borrowed at the time are closed when returned.
+    """
+    with pool['condition']:
+        pool['closed'] = True
+        idle = pool['idle']
+        pool['idle'] = []
+        pool['size'] -= len(idle)
+        pool['condition'].notify_all()
+
+    for connection, last_used, last_checked in idle:
+        close_store_connection(pool['store'], connection)
+
+def initialize_pools(exit_on_failure=True):
+    """
+    Initialize a connection pool for every store. Returns a dictionary.
+
+    The optional boolean argument, set to True by default, determines if the
+    process should exit if any of the pools fail to initialize.
+
+    The result has an 'info' key just like initialize_stores(), plus a pool
+    for each store defined in 'config/stores.txt'. Pool sizes and timeouts
+    may be set per store in stores.txt, see POOL__DEFAULT_SETTINGS.
+    """
+    result = {}
+
+    conns = read_stores_dot_txt()
+    if not len(conns.keys()) > 0:
+        print('No stores defined in config/stores.txt! Check CINDI README.')
+        exit(61)
+
+    result['info'] = conns
+
+    for store_name in SUPPORTED_STORES:
+        if not store_name in conns:
+            continue
+        try:
+            result[store_name] = initialize_pool(store_name, conns)
+        except BaseException:
+            LOG.error(ERROR__STORE_CONNECTION_FAILED[store_name])
+            if exit_on_failure:
+                exit(49) # 'common error 49: protocol not attached'
+
+    return result
+
+def borrow_stores(pools):
+    """
+    Borrow one connection from each pool. Returns a stores dictionary.
+
+    The argument is the dictionary from initialize_pools(). The result has the
+    same shape as the result of initialize_stores(), so it may be passed to
+    execute_indi() and friends, but it must be handed back with
+    return_stores() rather than closed with close_stores().
+    """
+    result = {'info': pools['info']}
+
+    try:
+        for store_name in pools.keys():
+            if store_name == 'info':
+                continue
+            result[store_name] = pool_borrow(pools[store_name])
+    except BaseException:
+        return_stores(pools, result)
+        raise
+
+    return result
+
+def return_stores(pools, stores, discard=False):
+    """
+    Return the connections in a borrowed stores dictionary. Returns void.
+
+    The first argument is the dictionary from initialize_pools(), the second
+    is the stores dictionary from borrow_stores(). If the optional third
+    argument is True, the connections are closed instead of re-pooled, which
+    should be done if a statement failed part way through.
+    """
+    for store_name in stores.keys():
+        if store_name == 'info':
+            continue
+        pool_return(pools[store_name], stores[store_name], discard)
+
+def close_pools(pools):
+    """
+    Close every pool in the dictionary from initialize_pools(). Returns void.
+    """
+    for store_name in pools.keys():
+        if store_name == 'info':
+            continue
+        close_pool(pools[store_name])
+
+def call_with_borrowed_stores(function, *args, **kwargs):
+    """
+    Call a function with stores borrowed from the global pools. Returns any.
 
-# initialize the cache after checking config/tables.txt
-def initialize_cache():
+    The first argument is the function to call, such as execute_indi(), and
+    the rest of the arguments are passed through to it. The borrowed stores
+    dictionary is passed as the 'stores' keyword argument, and is returned to
+    the pools once the function returns. If the function raises, then the
+    connections are discarded, since they may be part way through a statement.
     """
-    Returns a dictionary, for using with execute_then_cache_indi().
+    pools = get_global_pools()
+    with trace_span('borrow_stores'):
+        stores = borrow_stores(pools)
+    try:
+        result = function(*args, stores=stores, **kwargs)
+    except BaseException:
+        return_stores(pools, stores, discard=True)
+        raise
+    return_stores(pools, stores)
+    return result
 
-    The dictionary will have a slot for each INDI table specified in the
-    configuration 'config/tables.txt' file. 
+# the process-wide pools are only opened once the first statement needs them
+global_pools = None
+global_pools_lock = threading.Lock()
+
+def get_global_pools():
+    """
+    Initialize the process-wide pools, if needed. Returns a dictionary.
     """
-    table_list = read_tables_dot_txt()
-    return dict.fromkeys(table_list, {})
+    global global_pools
+    with global_pools_lock:
+        if global_pools is None:
+            global_pools = initialize_pools()
+    return global_pools
 
-# end database and cache initialization section
+# end connection pool section
 # ------------------------------------------------------------------------------
 # begin highest-level-execution section
 
-# initialize / instantiate the global cache
+# read the optional settings, then initialize / instantiate the global cache
+global_settings = read_settings_dot_txt()
+initialize_logging()
+atexit.register(stop_logging) # the queued records are written out on exit
+atexit.register(close_journal)
 global_caches = initialize_cache()
 
 # quickly execute and cache an INDI statement against all stores
@@ -1515,7 +5600,8 @@ def quick_cindi(statement, \
     Evaluate an INDI statement through cache. Returns a multi-dimensional list.
 
     The first argument is the INDI statement (as a string) to evaluate.
-    The second optional argument, a stores dictionary from initialize_stores().
+    The second optional argument, a stores dictionary from initialize_stores(),
+    by default the stores are borrowed from the process-wide connection pools.
     The third optional argument, a cache dictionary from initialize_cache().
     The fourth optional argument determines if a database connection failure
     will cause the system to exit, default behavior is True, because default
@@ -1535,38 +5621,648 @@ def quick_cindi(statement, \
     """
     result = []
     try:
-        result = execute_then_cache_indi(statement, caches, stores)
+        with trace_span('quick_cindi', root=True):
+            result = execute_then_cache_indi(statement, caches, stores)
     except AssertionError:
-        print('Corrupted store, please file a bug. Check the CINDI README.')
+        LOG.error('Corrupted store, please file a bug. Check the CINDI README.')
         if exit_on_fail:
             exit(117) # 'common linux error 117: structure needs cleaning'
     except Exception as err:
-        print('High level error: {}'.format(err))
+        LOG.error('High level error: %s', err)
         if exit_on_fail:
             exit(131) #' common linux error 131: state not recoverable'
     except BaseException as err:
-        print('Low level error: {}'.format(err))
+        LOG.error('Low level error: %s', err)
         if exit_on_fail:
             exit(22) # 'common linux error 22: invalid argument'
-
-    # docker compose needs some help nudging out the stdout buffer...
-    sys.stdout.flush()
     
     return result
 
+def quick_cindi_stream(statement, \
+                       stores=None, caches=global_caches, exit_on_fail=True):
+    """
+    Read the rows of an INDI READ through cache. Returns a generator.
+
+    The arguments are the same as quick_cindi(). If the READ is cached, the
+    cached rows are generated, otherwise they are read by stream_indi(), and
+    are not cached, since the point is not to hold them all at once. The
+    errors are handled the same as quick_cindi(), when they are raised while
+    generating. The rows are the same as in the result of quick_cindi(), not
+    wrapped in another list.
+    """
+    try:
+        indi = parse_indi(statement)
+        result = None
+        if indi.verb == 'READ':
+            result = cache_get(caches[indi.table], cache_key(indi))
+        if result is not None:
+            LOG__CACHE.debug('+ Cache hit! Query is %s', indi.text)
+            yield from result[0]
+        else:
+            LOG__CACHE.debug('+ Streaming READ. Query is %s', indi.text)
+            yield from stream_indi(indi, stores)
+    except GeneratorExit:
+        raise # the reader stopped early, which is not an error
+    except AssertionError:
+        LOG.error('Corrupted store, please file a bug. Check the CINDI README.')
+        if exit_on_fail:
+            exit(117) # 'common linux error 117: structure needs cleaning'
+    except Exception as err:
+        LOG.error('High level error: %s', err)
+        if exit_on_fail:
+            exit(131) #' common linux error 131: state not recoverable'
+    except BaseException as err:
+        LOG.error('Low level error: %s', err)
+        if exit_on_fail:
+            exit(22) # 'common linux error 22: invalid argument'
+
+def quick_cindi_batch(statements, ordered=True, \
+                      stores=None, caches=global_caches, exit_on_fail=True):
+    """
+    Evaluate a list of INDI statements through cache. Returns a list.
+
+    The first argument is the list of INDI statements (as strings) to
+    evaluate, the second optional argument is whether they must be evaluated
+    in the order given, by default True. The other optional arguments are the
+    same as quick_cindi(). The result holds the result of each statement, in
+    the order given, see execute_indi_batch().
+    """
+    result = []
+    try:
+        with trace_span('quick_cindi_batch', {'cindi.statements': \
+                                              len(statements)}, True):
+            result = execute_indi_batch(statements, caches, stores, ordered)
+    except AssertionError:
+        LOG.error('Corrupted store, please file a bug. Check the CINDI README.')
+        if exit_on_fail:
+            exit(117) # 'common linux error 117: structure needs cleaning'
+    except Exception as err:
+        LOG.error('High level error: %s', err)
+        if exit_on_fail:
+            exit(131) #' common linux error 131: state not recoverable'
+    except BaseException as err:
+        LOG.error('Low level error: %s', err)
+        if exit_on_fail:
+            exit(22) # 'common linux error 22: invalid argument'
+
+    return result
+
+def quick_cindi_bulk_create(table_name, fields, rows, \
+                            stores=None, caches=global_caches, \
+                            exit_on_fail=True):
+    """
+    Create many rows in an INDI table, through cache. Returns a list.
+
+    The first argument is the INDI table name, the second is the list of
+    FIELDS, and the third is a list of rows, each a list of VALUES. The
+    optional arguments are the same as quick_cindi(). This is the same as
+    evaluating `CREATE IN <table> FIELDS (...) VALUES (...), (...), ...` but
+    the rows are never written out and parsed, see compose_indi_create() and
+    execute_indi_bulk_create().
+    """
+    result = []
+    try:
+        with trace_span('quick_cindi_bulk_create', {'cindi.rows': len(rows)}, \
+                        True):
+            result = execute_then_cache_indi_bulk_create( \
+                [compose_indi_create(table_name, fields, rows)], caches, \
+                stores)[0]
+    except AssertionError:
+        LOG.error('Corrupted store, please file a bug. Check the CINDI README.')
+        if exit_on_fail:
+            exit(117) # 'common linux error 117: structure needs cleaning'
+    except Exception as err:
+        LOG.error('High level error: %s', err)
+        if exit_on_fail:
+            exit(131) #' common linux error 131: state not recoverable'
+    except BaseException as err:
+        LOG.error('Low level error: %s', err)
+        if exit_on_fail:
+            exit(22) # 'common linux error 22: invalid argument'
+
+    return result
+
+# gunicorn (see start_cindi_production()) forks the worker processes from
+# the process which imported cindi, the following two functions make the
+# global state safe to share with, and to inherit in, the worker processes.
+def prepare_for_worker_processes(caches=global_caches, lock_file_path=None, \
+                                 metrics_directory=None):
+    """
+    Share the write lock and cache epochs with forked processes. Returns void.
+
+    The first optional argument is the caches dictionary, by default the
+    global caches. The second is the path of the lock file, by default one in
+    the temporary directory named after this process. This must be called
+    before forking. Afterwards, writes from every process are evaluated one
+    at a time, and invalidate the cached READs of every process.
+
+    The third is the directory the processes share their measurements in, by
+    default one in the temporary directory named after this process, whose
+    earlier files are removed. Once reset_after_fork() is called, a process
+    writes its measurements there, and compose_metrics() sums them all.
+
+    The write lock is a FileWriteLock, so a process which dies while writing
+    does not stop the others from writing. Where flock() is not available,
+    a multiprocessing.RLock is used instead, which is never released if its
+    holder dies, so the server must then be restarted.
+
+    Group commits are turned off, since a process would see another's writes
+    to the other stores before their SQL commit.
+    """
+    global global_write_lock, global_group_commit_allowed
+    global global_metrics_sharing
+    if is_group_commit_enabled():
+        LOG.warning('sql_group_commit_seconds is ignored by worker ' \
+                    + 'processes, each SQL write is committed on its own.')
+    global_group_commit_allowed = False
+    if LOCK_AVAILABLE_FCNTL:
+        if lock_file_path is None:
+            lock_file_path = os.path.join(tempfile.gettempdir(), \
+                                          'cindi-' + str(os.getpid()) + '.lock')
+        global_write_lock = FileWriteLock(lock_file_path)
+    else:
+        LOG.warning('flock() is not available, a worker process which dies ' \
+                    + 'while writing will stop every write.')
+        global_write_lock = multiprocessing.RLock()
+    # every write is counted while the write lock is already held
+    share_cache_between_processes(caches, global_write_lock)
+
+    if metrics_directory is None:
+        metrics_directory = os.path.join(tempfile.gettempdir(), \
+            'cindi-' + str(os.getpid()) + '-metrics')
+    os.makedirs(metrics_directory, exist_ok=True)
+    for file_name in os.listdir(metrics_directory):
+        if file_name.endswith('.json'):
+            os.remove(os.path.join(metrics_directory, file_name))
+    global_metrics_sharing = {'directory': metrics_directory, \
+                              'caches': caches}
+
+def reset_after_fork():
+    """
+    Forget the connection pools and threads of the parent process. Returns void.
+
+    Connections must not be shared between processes, and threads do not
+    survive a fork, so each process opens its own when they are needed. If
+    the measurements are shared, this process begins sharing its own.
+    """
+    global global_pools, global_pools_lock
+    global global_fan_out_executor, global_fan_out_executor_lock
+    global global_async_executor, global_async_executor_lock
+    global global_group_commits_lock, global_log_listener
+    global global_journal, global_journal_lock, global_metrics_lock
+    global global_trace_export_lock, global_metrics_sharing
+    global_pools = None
+    global_pools_lock = threading.Lock()
+    global_fan_out_executor = None
+    global_fan_out_executor_lock = threading.Lock()
+    global_async_executor = None
+    global_async_executor_lock = threading.Lock()
+    global_async_borrow_semaphores.clear()
+    global_group_commits.clear() # their committer threads did not survive
+    global_group_commits_lock = threading.Lock()
+    global_log_listener = None # its thread did not survive either
+    initialize_logging()
+    global_journal = None # opened again, and its sync thread restarted
+    global_journal_lock = threading.Lock()
+    global_metrics.clear() # each process measures its own evaluations
+    global_metrics_lock = threading.Lock()
+    if global_metrics_sharing is not None:
+        # a pid may be used again, by a process with measurements of its own
+        global_metrics_sharing = dict(global_metrics_sharing, \
+            file_name=str(os.getpid()) + '-' + str(time.time_ns()) + '.json', \
+            text=None, lock=threading.Lock())
+        threading.Thread(target=metrics__share_loop, \
+                         args=(global_metrics_sharing,), \
+                         name='cindi-metrics', daemon=True).start()
+    global_trace_export_lock = threading.Lock()
+    if isinstance(global_write_lock, FileWriteLock):
+        global_write_lock.reset_after_fork()
+
 # end highest-level-execution section
 # ------------------------------------------------------------------------------
+# begin asyncio section
+# the store drivers are blocking, and their statement conversions read from
+# the stores part way through (to emulate sub-queries), so the coroutines
+# below hand each driver call to a thread and await it, rather than holding
+# the event loop. a request waiting on the stores costs a coroutine, and
+# only the store evaluations themselves occupy threads.
+#
+# the threads are not taken from the fan-out executor, since a write is
+# handed to a thread as a whole, and it fans out from there.
+global_async_executor = None
+global_async_executor_lock = threading.Lock()
+
+def get_async_executor():
+    """
+    Start the thread pool for the coroutines, if needed. Returns it.
+    """
+    global global_async_executor
+    with global_async_executor_lock:
+        if global_async_executor is None:
+            global_async_executor = concurrent.futures.ThreadPoolExecutor( \
+                max_workers=global_settings['async_max_workers'], \
+                thread_name_prefix='cindi-async')
+    return global_async_executor
+
+async def run_blocking(function, *args, **kwargs):
+    """
+    Await a blocking function, called in another thread. Returns its result.
+    """
+    loop = asyncio.get_running_loop()
+    # the function's spans are children of the coroutine's span
+    return await loop.run_in_executor(get_async_executor(), \
+                                      functools.partial( \
+                                          contextvars.copy_context().run, \
+                                          function, *args, **kwargs))
+
+async def execute_mysql_async(statement, stores):
+    """
+    Await execute_mysql() in a thread, by execute_indi(). Returns a list.
+    """
+    return (await run_blocking(execute_indi, statement, stores, 'mysql'))[0]
+
+async def execute_postgres_async(statement, stores):
+    """
+    Await execute_postgres() in a thread, by execute_indi(). Returns a list.
+    """
+    return (await run_blocking(execute_indi, statement, stores, 'postgres'))[0]
+
+async def execute_sqlite3_async(statement, stores):
+    """
+    Await execute_sqlite3() in a thread, by execute_indi(). Returns a list.
+    """
+    return (await run_blocking(execute_indi, statement, stores, 'sqlite3'))[0]
+
+async def execute_mongo_async(statement, stores):
+    """
+    Await execute_mongo() in a thread, by execute_indi(). Returns a list.
+    """
+    return (await run_blocking(execute_indi, statement, stores, 'mongodb'))[0]
+
+async def execute_redis_async(statement, stores):
+    """
+    Await execute_redis() in a thread, by execute_indi(). Returns a list.
+    """
+    return (await run_blocking(execute_indi, statement, stores, 'redis'))[0]
+
+ASYNC__DRIVERS = {
+    'mysql': execute_mysql_async,
+    'postgres': execute_postgres_async,
+    'sqlite3': execute_sqlite3_async,
+    'mongodb': execute_mongo_async,
+    'redis': execute_redis_async }
+
+# a coroutine waiting for a pooled connection must not hold one of the
+# threads which the coroutines holding connections need in order to finish,
+# so the borrowers queue on the event loop first, as many at a time as the
+# smallest pool can lend to.
+global_async_borrow_semaphores = weakref.WeakKeyDictionary()
+
+def get_async_borrow_semaphore(pools):
+    """
+    Find the running event loop's queue for borrowing. Returns a Semaphore.
+    """
+    loop = asyncio.get_running_loop()
+    with global_async_executor_lock:
+        if not loop in global_async_borrow_semaphores:
+            size = global_settings['async_max_workers']
+            for store_name, pool in pools.items():
+                if store_name != 'info' and not pool['shared']:
+                    size = min(size, pool['pool_max_size'])
+            global_async_borrow_semaphores[loop] = asyncio.Semaphore(size)
+        return global_async_borrow_semaphores[loop]
+
+async def call_with_borrowed_stores_async(function, *args, **kwargs):
+    """
+    Await a coroutine function with borrowed stores. Returns its result.
+
+    The same as call_with_borrowed_stores(), except that the function is a
+    coroutine function, and waiting for a free connection does not hold the
+    event loop.
+    """
+    pools = await run_blocking(get_global_pools)
+    async with get_async_borrow_semaphore(pools):
+        with trace_span('borrow_stores'):
+            stores = await run_blocking(borrow_stores, pools)
+        try:
+            result = await function(*args, stores=stores, **kwargs)
+        except BaseException:
+            return_stores(pools, stores, discard=True)
+            raise
+        return_stores(pools, stores)
+    return result
+
+async def execute_indi_async(statement, stores=None, which_store='all'):
+    """
+    Execute an INDI statement without blocking. Returns a list of results.
+
+    The arguments and the result are the same as execute_indi(). A READ is
+    evaluated on every store at the same time, each store being given up to
+    its 'timeout' from stores.txt from when the READ was sent to the stores,
+    so the READ fails after the longest timeout at most. A write is handed
+    to execute_indi() in another thread, so that the stores still see the
+    writes one at a time.
+    """
+    if stores == None:
+        return await call_with_borrowed_stores_async(execute_indi_async, \
+                                                     statement, \
+                                                     which_store=which_store)
+
+    statement = parse_indi(statement)
+    if statement.verb != 'READ':
+        return await run_blocking(execute_indi, statement, stores, which_store)
+
+    if which_store.lower() != 'all':
+        if not which_store.lower() in ASYNC__DRIVERS:
+            return ['invalid store specified in execute_indi()']
+        return [await ASYNC__DRIVERS[which_store.lower()](statement, stores)]
+
+    with trace_span('execute_indi'):
+        result = await execute_indi_async__all(statement, stores)
+
+    # this is a good time to check if any of the data stores are corrupted
+    if not compare_store_results(result):
+        LOG.error('execute_indi_async> result before AssertionError: %s', \
+                  result)
+        metrics_count('cindi_consistency_failures_total', \
+                      ('execute_indi_async',))
+        raise AssertionError(\
+            "A result from one store is not like the others.")
+
+    # verified that all stores returned the same data, so return one copy
+    return result[0]
+
+async def execute_indi_async__all(statement, stores):
+    """
+    Evaluate an IndiStatement READ on every store at once. Returns a list.
+
+    The result holds each store's result, in the order of stores.keys(), see
+    execute_indi_async().
+    """
+    store_names = [k for k in stores.keys() if k.lower() != 'info']
+    start = time.monotonic()
+    futures = []
+    for k in store_names:
+        futures.append(asyncio.ensure_future( \
+            ASYNC__DRIVERS[k](statement, stores)))
+
+    result = []
+    first_error = None
+    late_stores = []
+    for k, future in pairlis(store_names, futures):
+        # each store's timeout counts from when every store was dispatched,
+        # as in fan_out_stores(), rather than from when it is awaited
+        timeout = stores['info'][k].get('timeout', STORE__DEFAULT_TIMEOUT)
+        if timeout is not None:
+            timeout = max(0, start + timeout - time.monotonic())
+        try:
+            result.append([await asyncio.wait_for(asyncio.shield(future), \
+                                                  timeout)])
+        except asyncio.TimeoutError:
+            late_stores.append(k)
+            abandon_store_connection(stores, k, future)
+        except BaseException as err:
+            if first_error is None:
+                first_error = err
+
+    if len(late_stores) > 0:
+        raise TimeoutError('No answer in time from ' + ', '.join(late_stores) \
+                           + ' for ' + statement.text)
+    if first_error is not None:
+        raise first_error
+
+    return result
+
+async def execute_then_cache_indi_async(statement, caches, stores=None, \
+                                        which_store='all'):
+    """
+    Execute and cache an INDI statement without blocking. Returns a list.
+
+    The arguments and the result are the same as execute_then_cache_indi().
+    A cache hit is answered without leaving the event loop, and without
+    borrowing any stores.
+    """
+    with trace_span('parse'):
+        indi = parse_indi(statement)
+    if indi.verb != 'READ':
+        if stores == None:
+            return await call_with_borrowed_stores_async( \
+                execute_then_cache_indi_async, indi, caches, \
+                which_store=which_store)
+        return await run_blocking(execute_then_cache_indi, indi, caches, \
+                                  stores, which_store)
+
+    with measure_statement(indi), \
+         trace_span('execute_then_cache_indi', {'cindi.statement': indi.text, \
+                                                'cindi.verb': indi.verb, \
+                                                'cindi.table': indi.table}):
+        cache = caches[indi.table]
+        key = cache_key(indi)
+        with trace_span('cache_get') as span:
+            result = cache_get(cache, key)
+            if span is not None:
+                span['attributes']['cindi.cache_hit'] = result is not None
+        if result is not None:
+            LOG__CACHE.debug('+ Cache hit! Query is %s', indi.text)
+            return result
+        LOG__CACHE.debug('+ Cache miss. Query is %s', indi.text)
+
+        if stores == None:
+            return await call_with_borrowed_stores_async( \
+                execute_then_cache_indi_async__miss, indi, cache, \
+                which_store=which_store)
+        return await execute_then_cache_indi_async__miss(indi, cache, \
+                                                         stores, which_store)
+
+async def execute_then_cache_indi_async__miss(indi, cache, stores, \
+                                              which_store='all'):
+    """
+    Evaluate a READ which missed the cache, then cache it. Returns a list.
+    """
+    epoch = cache_epoch(cache)
+    # the DQL is an "ALL RECORDS" query to dump the entire table
+    if indi.all_records:
+        affected_pk_tuple = (0,) # the entire table
+    else:
+        affected_pk_tuple = await run_blocking(find_affected_primary_keys, \
+                                               indi, stores, which_store)
+    result = await execute_indi_async(indi, stores, which_store)
+    cache_put(cache, cache_key(indi), affected_pk_tuple, result, epoch)
+    return result
+
+async def quick_cindi_async(statement, \
+                            stores=None, caches=global_caches, \
+                            exit_on_fail=True):
+    """
+    Evaluate an INDI statement without blocking. Returns a list.
+
+    The arguments and the result are the same as quick_cindi().
+    """
+    result = []
+    try:
+        with trace_span('quick_cindi_async', root=True):
+            result = await execute_then_cache_indi_async(statement, caches, \
+                                                         stores)
+    except AssertionError:
+        LOG.error('Corrupted store, please file a bug. Check the CINDI README.')
+        if exit_on_fail:
+            exit(117) # 'common linux error 117: structure needs cleaning'
+    except Exception as err:
+        LOG.error('High level error: %s', err)
+        if exit_on_fail:
+            exit(131) # 'common linux error 131: state not recoverable'
+    except asyncio.CancelledError:
+        raise # the request went away, which is not an error
+    except BaseException as err:
+        LOG.error('Low level error: %s', err)
+        if exit_on_fail:
+            exit(22) # 'common linux error 22: invalid argument'
+    
+    return result
+
+async def execute_indi_batch_async(statements, caches, stores=None, \
+                                   ordered=True, which_store='all'):
+    """
+    Execute and cache INDI statements without blocking. Returns a list.
+
+    The arguments and the result are the same as execute_indi_batch(). The
+    stores are borrowed without holding the event loop, then the batch is
+    handed to execute_indi_batch() in another thread.
+    """
+    statements = [parse_indi(c) for c in statements]
+    if stores == None:
+        return await call_with_borrowed_stores_async( \
+            execute_indi_batch_async, statements, caches, ordered=ordered, \
+            which_store=which_store)
+    return await run_blocking(execute_indi_batch, statements, caches, \
+                              stores, ordered, which_store)
+
+async def quick_cindi_batch_async(statements, ordered=True, \
+                                  stores=None, caches=global_caches, \
+                                  exit_on_fail=True):
+    """
+    Evaluate a list of INDI statements without blocking. Returns a list.
+
+    The arguments and the result are the same as quick_cindi_batch().
+    """
+    result = []
+    try:
+        with trace_span('quick_cindi_batch_async', {'cindi.statements': \
+                                                    len(statements)}, True):
+            result = await execute_indi_batch_async(statements, caches, \
+                                                    stores, ordered)
+    except AssertionError:
+        LOG.error('Corrupted store, please file a bug. Check the CINDI README.')
+        if exit_on_fail:
+            exit(117) # 'common linux error 117: structure needs cleaning'
+    except Exception as err:
+        LOG.error('High level error: %s', err)
+        if exit_on_fail:
+            exit(131) # 'common linux error 131: state not recoverable'
+    except asyncio.CancelledError:
+        raise # the request went away, which is not an error
+    except BaseException as err:
+        LOG.error('Low level error: %s', err)
+        if exit_on_fail:
+            exit(22) # 'common linux error 22: invalid argument'
+    
+    return result
+
+# end asyncio section
+# ------------------------------------------------------------------------------
 # begin Flask HTTP end point section
 
-def start_cindi_flask(tcp_port=36963, host_name='0.0.0.0', enable_ssl=False):
+HTTP__HOMEPAGE = """<html>
+    <head><title>POST an INDI statement!</title></head><body>
+    <h3>Hello! Thank you for visiting CINDI!</h3><hr />
+    <p>Please 'POST' an INDI statement to /evaluate!</p></body</html>"""
+
+# in case a user uploads a binary file, the submitted INDI statement is
+# probably not longer than 100k characters...
+HTTP__MAX_CONTENT_LENGTH = 100000
+HTTP__TOO_LONG_ERROR = """The submitted request is too long,
+            and probably not a valid INDI statement."""
+
+# a batch for /evaluate-batch may hold many statements, such as an import
+HTTP__MAX_BATCH_CONTENT_LENGTH = 10000000
+
+# the Prometheus text format served by /metrics
+HTTP__METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def read_indi_batch_request(request_body):
     """
-    Start a Flask HTTPS end-point on /evaluate to process INDI over the web!
+    Read the INDI statements POSTed to /evaluate-batch. Returns 2 values.
 
-    The optional argument allows the user to specify a tcp_port to listen on.
+    The argument is the request body, as bytes. It is either a JSON array of
+    INDI statement strings, or a JSON object with that array under
+    "statements" and optionally a boolean under "ordered". The first value
+    returned is the list of statements, or None if the body is not a valid
+    batch, the second is whether they are ordered (by default True).
 
-    The SSL context is 'adhoc' which means it will generate a new certificate
-    each time the server is restarted. The default development Flask server
-    is used. 
+    A batch is not valid if any statement is not valid INDI, or if any of
+    its VALUES differ in quantity from its FIELDS, so that nothing in it is
+    evaluated.
+    """
+    try:
+        batch = json.loads(request_body.decode('ASCII'))
+    except ValueError:
+        return None, True
+
+    ordered = True
+    if isinstance(batch, dict):
+        ordered = batch.get('ordered', True)
+        batch = batch.get('statements')
+    if not isinstance(batch, list) or not isinstance(ordered, bool):
+        return None, True
+    for statement in batch:
+        if not isinstance(statement, str) or not is_indi_statement(statement):
+            return None, True
+        if not is_indi_fields_and_values_alike(parse_indi(statement)):
+            return None, True
+
+    return batch, ordered
+
+def read_indi_stream_request(request_body):
+    """
+    Read the INDI READ POSTed to /evaluate-stream. Returns a string or None.
+
+    The argument is the request body, as bytes. The result is the statement,
+    or None if it is not a valid INDI READ.
+    """
+    string_request = request_body.decode('ASCII')
+    if not is_indi_statement(string_request) \
+       or parse_indi(string_request).verb != 'READ':
+        LOG__HTTP.warning('cindi> invalid INDI READ submitted for ' \
+                          + 'streaming! %s', string_request)
+        return None
+    LOG__HTTP.debug('cindi> streaming %s', string_request)
+    return string_request
+
+def compose_ndjson_chunks(rows):
+    """
+    Write rows as newline-delimited JSON. Returns a generator of strings.
+
+    The argument is an iterable of rows, such as from quick_cindi_stream().
+    Each row is one line of JSON, and each string generated holds up to
+    STREAM__BATCH_SIZE lines, so that a response is not sent a row at a time.
+    """
+    rows = iter(rows)
+    while True:
+        these_rows = list(itertools.islice(rows, STREAM__BATCH_SIZE))
+        if len(these_rows) == 0:
+            return
+        yield ''.join([json.dumps(row) + '\n' for row in these_rows])
+
+def create_cindi_flask_app():
+    """
+    Create the Flask app serving /, /evaluate and /evaluate-batch. Returns it.
+
+    /evaluate-stream is also served, which answers a READ with one line of
+    JSON per row (NDJSON), sent as the rows are read from the stores.
+    /metrics is also served, which answers with compose_metrics().
+
+    The application may be served by start_cindi_flask() while developing,
+    by start_cindi_production(), or by any other WSGI server.
     """
     # change later to a proper name as per
     #https://flask.palletsprojects.com/en/2.0.x/api/
@@ -1575,41 +6271,104 @@ def start_cindi_flask(tcp_port=36963, host_name='0.0.0.0', enable_ssl=False):
 
     @app.route('/', methods=['GET'])
     def homepage():
-        return """<html>
-    <head><title>POST an INDI statement!</title></head><body>
-    <h3>Hello! Thank you for visiting CINDI!</h3><hr />
-    <p>Please 'POST' an INDI statement to /evaluate!</p></body</html>"""
+        return HTTP__HOMEPAGE
 
     @app.route('/evaluate', methods=['POST'])
     def evaluate():
         # they warned in the Flask api, in case a user uploads a binary file,
         # you'd better check the content_length. The submitted INDI statement
         # is probably not longer than 100k characters...
-        if request.content_length > 100000:
-            print('cindi> trashing '
-                  + str(request.content_length) + ' long INDI!')
-            too_long_error = """The submitted request is too long,
-            and probably not a valid INDI statement."""
-            return jsonify(too_long_error)
+        if request.content_length > HTTP__MAX_CONTENT_LENGTH:
+            LOG__HTTP.warning('cindi> trashing %s long INDI!', \
+                              request.content_length)
+            return jsonify(HTTP__TOO_LONG_ERROR)
 
         string_request = request.get_data().decode('ASCII')
         string_respons = None
         cindi_response = None
     
         if is_indi_statement(string_request):
-            print('cindi> ' + str(string_request))
-            cindi_response = quick_cindi(string_request)
-            print('cindi> ' + str(cindi_response))
-            string_respons = json.dumps(cindi_response)
+            LOG__HTTP.debug('cindi> %s', string_request)
+            with trace_span('POST /evaluate', {'http.route': '/evaluate'}, \
+                            True, TRACE__KIND_SERVER):
+                cindi_response = quick_cindi(string_request)
+                LOG__HTTP.debug('cindi> %s', cindi_response)
+                with trace_span('serialize'):
+                    string_respons = json.dumps(cindi_response)
+        else:
+            LOG__HTTP.warning('cindi> invalid INDI statement submitted! %s', \
+                              string_request)
+            string_respons = 'error, see server log for more detail'
+
+        response = jsonify(string_respons)
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response
+
+    @app.route('/evaluate-batch', methods=['POST'])
+    def evaluate_batch():
+        if request.content_length > HTTP__MAX_BATCH_CONTENT_LENGTH:
+            LOG__HTTP.warning('cindi> trashing %s long INDI batch!', \
+                              request.content_length)
+            return jsonify(HTTP__TOO_LONG_ERROR)
+
+        statements, ordered = read_indi_batch_request(request.get_data())
+        string_respons = None
+        cindi_response = None
+
+        if statements is not None:
+            LOG__HTTP.debug('cindi> batch of %s statements', len(statements))
+            with trace_span('POST /evaluate-batch', \
+                            {'http.route': '/evaluate-batch'}, True, \
+                            TRACE__KIND_SERVER):
+                cindi_response = quick_cindi_batch(statements, ordered)
+                with trace_span('serialize'):
+                    string_respons = json.dumps(cindi_response)
         else:
-            print('cindi> invalid INDI statement submitted!\n'
-                  + string_request)
+            LOG__HTTP.warning('cindi> invalid INDI batch submitted!')
             string_respons = 'error, see server log for more detail'
 
         response = jsonify(string_respons)
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response
 
+    @app.route('/evaluate-stream', methods=['POST'])
+    def evaluate_stream():
+        if request.content_length > HTTP__MAX_CONTENT_LENGTH:
+            LOG__HTTP.warning('cindi> trashing %s long INDI!', \
+                              request.content_length)
+            return jsonify(HTTP__TOO_LONG_ERROR)
+
+        string_request = read_indi_stream_request(request.get_data())
+        if string_request is not None:
+            chunks = compose_ndjson_chunks(quick_cindi_stream(string_request))
+        else:
+            chunks = [json.dumps('error, see server log for more detail') \
+                      + '\n']
+
+        # the response is sent as the chunks are generated
+        response = Response(chunks, mimetype='application/x-ndjson')
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(compose_metrics(global_caches), \
+                        content_type=HTTP__METRICS_CONTENT_TYPE)
+
+    return app
+
+def start_cindi_flask(tcp_port=36963, host_name='0.0.0.0', enable_ssl=False):
+    """
+    Start a Flask HTTPS end-point on /evaluate to process INDI over the web!
+
+    The optional argument allows the user to specify a tcp_port to listen on.
+
+    The SSL context is 'adhoc' which means it will generate a new certificate
+    each time the server is restarted. The default development Flask server
+    is used, please see start_cindi_production() for anything else.
+    """
+    app = create_cindi_flask_app()
+
     # another option is ssl_context='adhoc'
     if enable_ssl:
         app.run(debug=True, \
@@ -1617,6 +6376,215 @@ def start_cindi_flask(tcp_port=36963, host_name='0.0.0.0', enable_ssl=False):
     else:
         app.run(debug=True, host=host_name, port=tcp_port)  
 
+def start_cindi_production(tcp_port=36963, host_name='0.0.0.0'):
+    """
+    Serve /evaluate with gunicorn, in several processes. Returns on shutdown.
+
+    The optional arguments are the same as start_cindi_flask(). The quantity
+    of processes and threads, the HTTP keep-alive, and the time given to
+    finish the statements in flight on shutdown (SIGTERM) are the 'server_...'
+    keys in settings.txt.
+
+    Each process has its own connection pools and cached READs, the caches
+    are kept coherent across the processes, and writes from every process are
+    still evaluated one at a time. Requires the 'production' optional
+    dependency (gunicorn), this will exit if it is not installed.
+    """
+    if not SERVER_AVAILABLE_GUNICORN:
+        print('gunicorn not installed, please install cindi[production].')
+        exit(2) # "common exit code 2: no such file or directory"
+
+    app = create_cindi_flask_app()
+    prepare_for_worker_processes()
+
+    def post_fork(server, worker):
+        reset_after_fork()
+
+    def worker_exit(server, worker):
+        share_metrics() # the last measurements of this process
+        if global_pools is not None:
+            close_pools(global_pools)
+
+    options = {
+        'bind': host_name + ':' + str(tcp_port),
+        'worker_class': 'gthread',
+        'workers': global_settings['server_workers'],
+        'threads': global_settings['server_threads'],
+        'keepalive': global_settings['server_keepalive_seconds'],
+        'timeout': global_settings['server_timeout_seconds'],
+        'graceful_timeout': global_settings['server_graceful_timeout_seconds'],
+        'post_fork': post_fork,
+        'worker_exit': worker_exit }
+
+    # gunicorn is configured by sub-classing, rather than with arguments
+    class CindiServer(gunicorn.app.base.BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    CindiServer().run()
+
+async def read_asgi_body(receive, max_content_length):
+    """
+    Receive the body of an ASGI HTTP request. Returns bytes.
+
+    The first argument is the ASGI receive coroutine function, the second is
+    the longest body to receive. A longer body is cut short once it is
+    longer, so check the length of the result.
+    """
+    request_body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        request_body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if len(request_body) > max_content_length:
+            break
+    return request_body
+
+async def send_asgi_stream(statement, send):
+    """
+    Send the rows of an INDI READ as an NDJSON response. Returns void.
+
+    The first argument is the INDI READ, the second is the ASGI send
+    coroutine function. Each chunk of compose_ndjson_chunks() is read from
+    the stores in another thread, and sent before the next is read.
+    """
+    pools = await run_blocking(get_global_pools)
+    async with get_async_borrow_semaphore(pools):
+        chunks = compose_ndjson_chunks(quick_cindi_stream(statement))
+        try:
+            await send({'type': 'http.response.start', 'status': 200, \
+                        'headers': [(b'content-type', \
+                                     b'application/x-ndjson'), \
+                                    (b'access-control-allow-origin', b'*')]})
+            while True:
+                chunk = await run_blocking(next, chunks, None)
+                if chunk is None:
+                    break
+                await send({'type': 'http.response.body', \
+                            'body': chunk.encode('utf-8'), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            # a client which went away leaves the stores part way through
+            await run_blocking(chunks.close)
+
+async def cindi_asgi_app(scope, receive, send):
+    """
+    Serve /, /evaluate and /evaluate-batch as an ASGI application. Returns void.
+
+    The end-points answer the same as those of create_cindi_flask_app(), but
+    each statement is evaluated by quick_cindi_async(), so a request waiting
+    on the stores does not hold a thread, and /evaluate-stream is sent by
+    send_asgi_stream(). /metrics is also served. Serve it with
+    start_cindi_async(), or any other ASGI server.
+    """
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    status = 200
+    content_type = b'application/json'
+    if scope['method'] == 'POST' and scope['path'] == '/evaluate-stream':
+        request_body = await read_asgi_body(receive, HTTP__MAX_CONTENT_LENGTH)
+        if len(request_body) > HTTP__MAX_CONTENT_LENGTH:
+            LOG__HTTP.warning('cindi> trashing %s+ long INDI!', \
+                              len(request_body))
+            body = json.dumps(HTTP__TOO_LONG_ERROR) + '\n'
+        else:
+            statement = read_indi_stream_request(request_body)
+            if statement is not None:
+                await send_asgi_stream(statement, send)
+                return
+            content_type = b'application/x-ndjson'
+            body = json.dumps('error, see server log for more detail') + '\n'
+    elif scope['method'] == 'GET' and scope['path'] == '/':
+        content_type = b'text/html; charset=utf-8'
+        body = HTTP__HOMEPAGE
+    elif scope['method'] == 'GET' and scope['path'] == '/metrics':
+        content_type = HTTP__METRICS_CONTENT_TYPE.encode('ASCII')
+        body = compose_metrics(global_caches)
+    elif scope['method'] == 'POST' and \
+         scope['path'] in ('/evaluate', '/evaluate-batch'):
+        max_content_length = HTTP__MAX_CONTENT_LENGTH
+        if scope['path'] == '/evaluate-batch':
+            max_content_length = HTTP__MAX_BATCH_CONTENT_LENGTH
+        request_body = await read_asgi_body(receive, max_content_length)
+
+        if len(request_body) > max_content_length:
+            LOG__HTTP.warning('cindi> trashing %s+ long INDI!', \
+                              len(request_body))
+            string_respons = HTTP__TOO_LONG_ERROR
+        elif scope['path'] == '/evaluate-batch':
+            statements, ordered = read_indi_batch_request(request_body)
+            if statements is not None:
+                LOG__HTTP.debug('cindi> batch of %s statements', \
+                                len(statements))
+                with trace_span('POST /evaluate-batch', \
+                                {'http.route': '/evaluate-batch'}, True, \
+                                TRACE__KIND_SERVER):
+                    cindi_response = await quick_cindi_batch_async( \
+                        statements, ordered)
+                    with trace_span('serialize'):
+                        string_respons = json.dumps(cindi_response)
+            else:
+                LOG__HTTP.warning('cindi> invalid INDI batch submitted!')
+                string_respons = 'error, see server log for more detail'
+        else:
+            string_request = request_body.decode('ASCII')
+            if is_indi_statement(string_request):
+                LOG__HTTP.debug('cindi> %s', string_request)
+                with trace_span('POST /evaluate', \
+                                {'http.route': '/evaluate'}, True, \
+                                TRACE__KIND_SERVER):
+                    cindi_response = await quick_cindi_async(string_request)
+                    LOG__HTTP.debug('cindi> %s', cindi_response)
+                    with trace_span('serialize'):
+                        string_respons = json.dumps(cindi_response)
+            else:
+                LOG__HTTP.warning('cindi> invalid INDI statement ' \
+                                  + 'submitted! %s', string_request)
+                string_respons = 'error, see server log for more detail'
+        body = json.dumps(string_respons) + '\n' # the same as jsonify()
+    else:
+        status = 404
+        content_type = b'text/plain; charset=utf-8'
+        body = 'Not Found'
+
+    await send({'type': 'http.response.start', 'status': status, \
+                'headers': [(b'content-type', content_type), \
+                            (b'access-control-allow-origin', b'*')]})
+    await send({'type': 'http.response.body', 'body': body.encode('utf-8')})
+
+def start_cindi_async(tcp_port=36963, host_name='0.0.0.0'):
+    """
+    Serve /evaluate with uvicorn, from one event loop. Returns on shutdown.
+
+    The optional arguments are the same as start_cindi_flask(). The HTTP
+    keep-alive, and the time given to finish the statements in flight on
+    shutdown, are the same 'server_...' keys in settings.txt as
+    start_cindi_production(). Requires the 'asgi' optional dependency
+    (uvicorn), this will exit if it is not installed.
+    """
+    if not SERVER_AVAILABLE_UVICORN:
+        print('uvicorn not installed, please install cindi[asgi].')
+        exit(2) # "common exit code 2: no such file or directory"
+
+    uvicorn.run(cindi_asgi_app, host=host_name, port=tcp_port, \
+        timeout_keep_alive=global_settings['server_keepalive_seconds'], \
+        timeout_graceful_shutdown= \
+            global_settings['server_graceful_timeout_seconds'])
+
 # https://kracekumar.com/post/54437887454/ssl-for-flask-local-development/
 # https://www.codegrepper.com/code-examples/python/change+port+flask
 
@@ -50,8 +50,56 @@ EXAMPLE15 = """UPDATE IN nonsense nonsense_a \"yeah, right\" FIELDS (nonsense_a,
 EXAMPLE_DML_LIST__UPDATE_AND_DELETE = [
     EXAMPLE10, EXAMPLE11, EXAMPLE12, EXAMPLE13, EXAMPLE14, EXAMPLE15 ]
 
+# quoting and multi-row examples ('CREATE' and 'READ')
+EXAMPLE16 = """CREATE IN nonsense FIELDS (nonsense_a, nonsense_b) VALUES (\"first of many\", \"row\"), (\"second of many\", 'it\\'s a row')"""
+EXAMPLE17 = """CREATE IN nonsense FIELDS (nonsense_c) VALUES (\"a \\\"quoted\\\" word, isn't it\")"""
+EXAMPLE18 = """READ IN nonsense nonsense_b 'it\\'s a row' FIELDS (id, nonsense_a)"""
+EXAMPLE19 = """READ IN nonsense nonsense_c \"a \\\"quoted\\\" word, isn't it\" FIELDS id"""
+EXAMPLE_LIST__QUOTES_AND_ROWS = [ EXAMPLE16, EXAMPLE17, EXAMPLE18, EXAMPLE19 ]
+
+# DQL examples of pages ('READ')
+EXAMPLE20 = """READ IN nonsense ALL RECORDS FIELDS (id, nonsense_a) LIMIT 2"""
+EXAMPLE21 = """READ IN nonsense ALL RECORDS FIELDS (nonsense_b) AFTER id 2 LIMIT 1 OFFSET 1"""
+EXAMPLE22 = """READ IN nonsense nonsense_b skare FIELDS (id, nonsense_c) AFTER id 1"""
+EXAMPLE23 = """READ IN nonsense ALL RECORDS FIELDS nonsense_a OFFSET 1"""
+EXAMPLE_DQL_LIST__PAGES = [ EXAMPLE20, EXAMPLE21, EXAMPLE22, EXAMPLE23 ]
+
 EXAMPLE_LIST = [ EXAMPLE_DML_LIST__CREATE,
-                 EXAMPLE_DQL_LIST, EXAMPLE_DML_LIST__UPDATE_AND_DELETE ]
+                 EXAMPLE_DQL_LIST, EXAMPLE_DML_LIST__UPDATE_AND_DELETE,
+                 EXAMPLE_LIST__QUOTES_AND_ROWS, EXAMPLE_DQL_LIST__PAGES ]
+
+# pairs of INDI statements which must parse the same, other than their text
+EXAMPLE_EQUIVALENT_PAIRS = [
+    ("READ IN nonsense id 1 FIELDS nonsense_a",
+     "read  in nonsense id '1' fields (nonsense_a)"),
+    ("""READ IN nonsense nonsense_a \"yeah, right\" FIELDS (nonsense_b)""",
+     """READ IN nonsense nonsense_a 'yeah, right' FIELDS nonsense_b"""),
+    ("""CREATE IN nonsense FIELDS (nonsense_a) VALUES (\"it's\")""",
+     """CREATE IN nonsense FIELDS nonsense_a VALUES 'it\\'s'"""),
+    ("READ IN nonsense ALL RECORDS FIELDS id AFTER id 2 LIMIT 10 OFFSET 0",
+     "read in nonsense all records fields (id) after ID 2 limit 10 offset 0") ]
+
+# statements which must not parse
+EXAMPLE_INVALID_LIST = [
+    "READ IN nonsense",
+    "DELETE nonsense id 1",
+    """READ IN nonsense nonsense_a \"unterminated FIELDS id""",
+    "UPDATE IN nonsense id 1 FIELDS (nonsense_a) VALUES (one), (two)",
+    "READ IN nonsense id 1 FIELDS (nonsense_a,)",
+    "READ IN nonsense ALL RECORDS FIELDS id LIMIT -1",
+    "READ IN nonsense ALL RECORDS FIELDS id LIMIT 1 AFTER id 2",
+    "READ IN nonsense ALL RECORDS FIELDS id AFTER nonsense_a 2",
+    "DELETE IN nonsense id 1 LIMIT 1",
+    "READ IN nonsense;nonsense ALL RECORDS FIELDS id",
+    "READ IN nonsense id 1 FIELDS (id, nonsense_a-1)",
+    "DELETE IN nonsense 1nonsense_a one",
+    "UPDATE IN nonsense id 1 FIELDS (nonsense.a) VALUES (one)" ]
+
+# statements which parse, but whose FIELDS and VALUES differ in quantity
+EXAMPLE_UNALIKE_LIST = [
+    "CREATE IN nonsense FIELDS (nonsense_a, nonsense_b) VALUES (one)",
+    "CREATE IN nonsense FIELDS (nonsense_a) VALUES (one), (two, three)",
+    "UPDATE IN nonsense id 1 FIELDS (nonsense_a) VALUES (one, two)" ]
 
 # end examples delcarations section
 # ------------------------------------------------------------------------------
@@ -123,6 +171,278 @@ def quick_unit_tests():
     
     return boolean_result
 
+# these tests need no stores, they check the parser and the cache keys.
+def quick_parser_tests():
+    """
+    Check the INDI parser and READ cache keys, without any stores. Returns bool.
+    """
+    failures = []
+
+    def check(condition, description):
+        if not condition:
+            failures.append(description)
+
+    for a, b in EXAMPLE_EQUIVALENT_PAIRS:
+        check(parse_indi(a)[:-1] == parse_indi(b)[:-1], 'parse: ' + b)
+    for example in EXAMPLE_INVALID_LIST:
+        check(not is_indi_statement(example), 'invalid: ' + example)
+    for example_class in EXAMPLE_LIST:
+        for example in example_class:
+            check(is_indi_statement(example), 'valid: ' + example)
+            check(is_indi_fields_and_values_alike(parse_indi(example)), \
+                  'alike: ' + example)
+
+    # such a batch is refused before any of it is evaluated
+    for example in EXAMPLE_UNALIKE_LIST:
+        check(not is_indi_fields_and_values_alike(parse_indi(example)), \
+              'unalike: ' + example)
+        batch = json.dumps([EXAMPLE1, example]).encode('ASCII')
+        check(read_indi_batch_request(batch) == (None, True), \
+              'batch: ' + example)
+
+    # the escapes are removed, and each VALUES list is one row
+    indi = parse_indi(EXAMPLE16)
+    check(indi.rows == (('first of many', 'row'), \
+                        ('second of many', "it's a row")), 'rows: ' + EXAMPLE16)
+    check(indi.values == indi.rows[0], 'values: ' + EXAMPLE16)
+    check(parse_indi(EXAMPLE19).value == 'a "quoted" word, isn\'t it', \
+          'escapes: ' + EXAMPLE19)
+    composed = compose_indi_create('nonsense', indi.fields, indi.rows)
+    check(parse_indi(composed.text)[:-1] == composed[:-1], \
+          'compose: ' + composed.text)
+
+    # a page is read as whole numbers, and each page has its own cache key
+    indi = parse_indi(EXAMPLE21)
+    check((indi.after, indi.limit, indi.offset) == (2, 1, 1), \
+          'page: ' + EXAMPLE21)
+    check(cache_key(EXAMPLE20) != cache_key(EXAMPLE20 + ' OFFSET 2'), \
+          'cache key: pages')
+
+    # equivalent READs share one cache key, and FIELDS order matters
+    check(cache_key(EXAMPLE_EQUIVALENT_PAIRS[0][0]) \
+          == cache_key(EXAMPLE_EQUIVALENT_PAIRS[0][1]), 'cache key: equal')
+    check(cache_key("READ IN nonsense id 1 FIELDS (nonsense_a, nonsense_b)") \
+          != cache_key("READ IN nonsense id 1 FIELDS (nonsense_b, nonsense_a)"),
+          'cache key: FIELDS order')
+    check(cache_key("READ IN nonsense ALL RECORDS FIELDS id") \
+          != cache_key("READ IN nonsense id 1 FIELDS id"), \
+          'cache key: ALL RECORDS')
+
+    for failure in failures:
+        print("!!! Parser test failed: " + failure)
+    if len(failures) == 0:
+        print("*** All parser tests passed! ***")
+
+    return len(failures) == 0
+
+# these tests need no stores either, they check the READ cache on its own,
+# and the measurements of /metrics.
+def quick_cache_tests():
+    """
+    Check the READ cache evictions, partitions and more. Returns bool.
+    """
+    failures = []
+
+    def check(condition, description):
+        if not condition:
+            failures.append(description)
+
+    def new_caches(**cache_settings):
+        settings = dict(global_settings, cache_max_entries=None, \
+                        cache_max_bytes=None, cache_policy='lru', \
+                        cache_ttl_seconds=None, cache_table_quotas={})
+        settings.update(cache_settings)
+        return initialize_cache(settings, ['nonsense', 'other'])
+
+    key_a = cache_key("READ IN nonsense id 1 FIELDS (nonsense_a)")
+    key_b = cache_key("READ IN nonsense id 2 FIELDS (nonsense_a)")
+    key_c = cache_key("READ IN nonsense id 3 FIELDS (nonsense_a)")
+
+    # a was used twice and b once, but b more recently
+    for policy, victim, survivor in (('lru', key_a, key_b), \
+                                     ('lfu', key_b, key_a)):
+        partition = new_caches(cache_max_entries=2, \
+                               cache_policy=policy)['nonsense']
+        cache_put(partition, key_a, (1,), [[['a']]])
+        cache_put(partition, key_b, (2,), [[['b']]])
+        cache_get(partition, key_a)
+        cache_get(partition, key_a)
+        cache_get(partition, key_b)
+        cache_put(partition, key_c, (3,), [[['c']]])
+        check(cache_get(partition, victim, peek=True) is None \
+              and cache_get(partition, survivor, peek=True) is not None \
+              and partition['stats']['evictions'] == 1, 'evict: ' + policy)
+
+    # a READ expires once its TTL has passed, a TTL of 0 at once
+    partition = new_caches(cache_ttl_seconds=0)['nonsense']
+    cache_put(partition, key_a, (1,), [[['a']]])
+    check(cache_get(partition, key_a) is None \
+          and partition['stats']['expirations'] == 1, 'expire: TTL')
+
+    # the byte budget holds two of these READs, but not one much larger
+    entry_bytes = cache_sizeof(key_a) + cache_sizeof([[['a']]])
+    partition = new_caches(cache_max_bytes=2 * entry_bytes)['nonsense']
+    for i, key in enumerate((key_a, key_b, key_c)):
+        cache_put(partition, key, (i + 1,), [[['a']]])
+    check(cache_get(partition, key_a, peek=True) is None \
+          and partition['bytes'] <= 2 * entry_bytes, 'bytes: evict')
+    check(not cache_put(partition, key_a, (1,), [[['a'] * 100]]), \
+          'bytes: too large')
+
+    # a write to one table leaves the other's cached READs, but the limits
+    # are shared, and the least recently used READ of either is evicted
+    caches = new_caches(cache_max_entries=2, \
+                        cache_table_quotas={'other': 1})
+    key_other = cache_key("READ IN other id 1 FIELDS (other_a)")
+    cache_put(caches['other'], key_other, (1,), [[['o']]])
+    cache_put(caches['nonsense'], key_a, (1,), [[['a']]])
+    cache_invalidate(caches['nonsense'], (1,))
+    check(cache_get(caches['other'], key_other, peek=True) is not None \
+          and caches['nonsense']['stats']['invalidations'] == 1, \
+          'partition: invalidate')
+    cache_put(caches['other'], \
+              cache_key("READ IN other id 2 FIELDS (other_a)"), (2,), [[['p']]])
+    check(len(caches['other']['entries']) == 1, 'partition: quota')
+    cache_put(caches['nonsense'], key_a, (1,), [[['a']]])
+    cache_put(caches['nonsense'], key_b, (2,), [[['b']]])
+    check(len(caches['other']['entries']) == 0 \
+          and len(caches['nonsense']['entries']) == 2, 'partition: budget')
+    stats = get_cache_stats(caches)
+    check(stats['entries'] == 2 and stats['tables']['other']['entries'] == 0, \
+          'partition: stats')
+
+    # fewer FIELDS are selected from a cached READ of more FIELDS
+    partition = new_caches()['nonsense']
+    cache_put(partition, \
+              cache_key("READ IN nonsense ALL RECORDS " \
+                        + "FIELDS (nonsense_a, nonsense_b)"), \
+              (0,), [[['a', 'b'], ['c', None]]])
+    projected = cache_get(partition, cache_key( \
+        "READ IN nonsense ALL RECORDS FIELDS (nonsense_b, nonsense_a)"))
+    check(projected == [[['b', 'a'], [None, 'c']]], 'project: FIELDS order')
+    projected = cache_get(partition, cache_key( \
+        "READ IN nonsense ALL RECORDS FIELDS (nonsense_b)"))
+    check(projected == [[['b']]] and partition['stats']['projections'] == 2, \
+          'project: all None rows')
+    check(cache_get(partition, cache_key( \
+        "READ IN nonsense ALL RECORDS FIELDS (nonsense_c)")) is None, \
+          'project: missing FIELDS')
+
+    # measured under a table of its own, which is forgotten afterwards
+    if global_settings['metrics']:
+        labels = ('READ', 'quick_cache_tests')
+        metrics_count('cindi_statements_total', labels, 3)
+        metrics_observe('cindi_statement_seconds', labels, 0.003)
+        text = compose_metrics(caches)
+        with global_metrics_lock:
+            for name in ('cindi_statements_total', 'cindi_statement_seconds'):
+                global_metrics.pop((name, labels), None)
+        for line in ( \
+            'cindi_statements_total{verb="READ",table="quick_cache_tests"} 3',
+            'cindi_statement_seconds_bucket{verb="READ",' \
+            + 'table="quick_cache_tests",le="0.0025"} 0',
+            'cindi_statement_seconds_bucket{verb="READ",' \
+            + 'table="quick_cache_tests",le="+Inf"} 1',
+            'cindi_statement_seconds_count{verb="READ",' \
+            + 'table="quick_cache_tests"} 1',
+            '# TYPE cindi_cache_entries gauge',
+            'cindi_cache_entries{table="nonsense"} 2'):
+            check(line in text.split('\n'), 'metrics: ' + line)
+
+    for failure in failures:
+        print("!!! Cache test failed: " + failure)
+    if len(failures) == 0:
+        print("*** All cache tests passed! ***")
+
+    return len(failures) == 0
+
+# these tests need no stores either, the journal is kept in a temporary
+# directory, and replayed on an SQLite3 database in memory.
+def quick_journal_tests():
+    """
+    Check the journal, its segments and replay_journal(). Returns bool.
+    """
+    failures = []
+
+    def check(condition, description):
+        if not condition:
+            failures.append(description)
+
+    directory = tempfile.mkdtemp(prefix='cindi-journal-tests-')
+    settings = dict(global_settings, journal_fsync='always', \
+                    journal_segment_bytes=300)
+    ok = {'sqlite3': 'ok'}
+    statements = [parse_indi(example) for example in EXAMPLE_DML_LIST__CREATE]
+
+    # each record is read back as appended, across several segments
+    journal = open_journal(directory, settings)
+    check(append_journal(statements[:3], ok, journal) == 3, 'append: seq')
+    check(append_journal(statements[3:4], {'sqlite3': 'failed'}, journal) \
+          == 4, 'append: failed')
+    close_journal(journal)
+    journal = open_journal(directory, settings) # carries on from the end
+    check(append_journal(statements[4:], ok, journal) == 5, 'append: reopen')
+    close_journal(journal)
+    records = list(read_journal(directory, 0))
+    check([record['seq'] for record in records] == [1, 2, 3, 4, 5] \
+          and [record['statement'] for record in records] \
+          == [indi.text for indi in statements], 'read: round-trip')
+    check(len(journal_segments(directory)) > 1, 'segments: rollover')
+    check([record['seq'] for record in read_journal(directory, 3)] == [4, 5], \
+          'read: after_seq')
+
+    # a record cut short by a crash is skipped, and not appended to
+    with open(journal_segments(directory)[-1][1], 'ab') as f:
+        f.write(b'{"seq": 6, "statem')
+    journal = open_journal(directory, settings)
+    check(append_journal(statements[:1], ok, journal) == 6, 'torn: seq')
+    close_journal(journal)
+    check([record['seq'] for record in read_journal(directory, 4)] == [5, 6], \
+          'torn: skipped')
+
+    # the failed record is skipped, and a replay resumes at its checkpoint
+    connection = sqlite3.connect(':memory:', check_same_thread=False)
+    connection.execute('CREATE TABLE nonsense (id INTEGER NOT NULL ' \
+                       + 'PRIMARY KEY, nonsense_a TEXT, nonsense_b TEXT, ' \
+                       + 'nonsense_c TEXT)')
+    stores = {'sqlite3': connection}
+    check(replay_journal('sqlite3', stores, directory, after_seq=2) == 6, \
+          'replay: after_seq')
+    check(connection.execute('SELECT COUNT(*) FROM nonsense').fetchone()[0] \
+          == 3, 'replay: skipped')
+    check(replay_journal__checkpoint(os.path.join( \
+        directory, 'replay_sqlite3.json')) == 6, 'replay: checkpoint')
+    check(replay_journal('sqlite3', stores, directory) == 6 \
+          and connection.execute('SELECT COUNT(*) FROM nonsense') \
+          .fetchone()[0] == 3, 'replay: no duplicates')
+
+    # a record which fails stops the replay, before its checkpoint
+    journal = open_journal(directory, settings)
+    append_journal([parse_indi('CREATE IN nonsense FIELDS (nonsense_d) ' \
+                               + 'VALUES ("d")'), statements[1]], ok, journal)
+    close_journal(journal)
+    try:
+        replay_journal('sqlite3', stores, directory)
+        check(False, 'replay: failure')
+    except sqlite3.Error:
+        check(replay_journal__checkpoint(os.path.join( \
+            directory, 'replay_sqlite3.json')) == 6, 'replay: failure')
+    connection.execute('ALTER TABLE nonsense ADD COLUMN nonsense_d TEXT')
+    check(replay_journal('sqlite3', stores, directory) == 8 \
+          and connection.execute('SELECT COUNT(*) FROM nonsense') \
+          .fetchone()[0] == 5, 'replay: resume')
+    connection.close()
+    for file_name in os.listdir(directory):
+        os.remove(os.path.join(directory, file_name))
+    os.rmdir(directory)
+
+    for failure in failures:
+        print("!!! Journal test failed: " + failure)
+    if len(failures) == 0:
+        print("*** All journal tests passed! ***")
+
+    return len(failures) == 0
+
 # end test section
 # ------------------------------------------------------------------------------
 # end of file cindi_tests.py